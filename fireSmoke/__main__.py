@@ -0,0 +1,294 @@
+import argparse
+import sys
+
+from fireSmoke.constant.application import (APP_DEVICE,
+                                            APP_HOST,
+                                            APP_MODEL_PATH,
+                                            APP_PORT,
+                                            BENCHMARK_BASELINE_FILE,
+                                            BENCHMARK_FRAMES,
+                                            BENCHMARK_MODEL,
+                                            BENCHMARK_TOLERANCE,
+                                            BENCHMARK_WARMUP_FRAMES,
+                                            BATCH_DECODE_WORKERS,
+                                            BATCH_INFERENCE_CHECKPOINT_EVERY,
+                                            BATCH_INFERENCE_MASK_FORMAT,
+                                            BATCH_INFERENCE_SIZE,
+                                            IMPORT_TIME_BUDGET_FILE,
+                                            IMPORT_TIME_RUNS,
+                                            KEYFRAME_ENABLED,
+                                            MULTI_CAMERA_BATCH_SIZE,
+                                            MODEL_WARMUP_IMG_SIZE,
+                                            MULTI_CAMERA_CONFIG_FILE)
+
+
+def detect(args: argparse.Namespace) -> None:
+    """
+    Runs headless batch inference over an image folder or a video file.
+    """
+    from fireSmoke.entity.config_entity import BatchInferenceConfig
+    from fireSmoke.pipeline.batch_inference_pipeline import BatchInferencePipeline
+
+    config = BatchInferenceConfig(source=args.source,
+                                  weight_path=args.weights,
+                                  device=args.device,
+                                  conf=args.conf,
+                                  frame_stride=args.stride,
+                                  batch_size=args.batch_size,
+                                  workers=args.workers,
+                                  checkpoint_every=args.checkpoint_every,
+                                  mask_format=None if args.mask_format == "none" else args.mask_format)
+    if args.output:
+        config.output_file_path = args.output
+
+    artifact = BatchInferencePipeline(config).run(restart=args.restart)
+    print(f"Processed {artifact.frames_processed} frames at {artifact.frames_per_second:.1f} frames/s "
+          f"-> {artifact.output_file_path}")
+
+
+def parse_camera(value: str) -> tuple:
+    """
+    Parses a "<id>=<source>" camera argument; numeric sources are webcam indices.
+    """
+    camera_id, sep, source = value.partition("=")
+    if not sep or not camera_id or not source:
+        raise argparse.ArgumentTypeError(f"Expected <id>=<source>, got {value!r}")
+    return camera_id, int(source) if source.isdigit() else source
+
+
+def serve(args: argparse.Namespace) -> None:
+    """
+    Serves MJPEG streams, snapshots and detections for the given cameras over HTTP.
+    """
+    from fireSmoke.inference.engine import InferenceEngine
+    from fireSmoke.inference.metrics import get_stage_metrics
+    from fireSmoke.inference.multi_camera import CameraSource, load_camera_sources
+    from fireSmoke.inference.server import MJPEGServer
+
+    if args.camera:
+        cameras = [CameraSource(camera_id=camera_id, source=source) for camera_id, source in args.camera]
+    else:
+        cameras = load_camera_sources(args.cameras)
+
+    get_stage_metrics().enabled = not args.no_metrics
+    engine = InferenceEngine(args.weights, device=args.device)
+    MJPEGServer(cameras, engine=engine, host=args.host, port=args.port, batch_size=args.batch_size,
+                motion_gate=not args.no_motion_gate, keyframes=args.keyframes).run()
+
+
+def train(args: argparse.Namespace) -> None:
+    """
+    Runs the training pipeline, skipping stages whose inputs did not change.
+    """
+    from fireSmoke.pipeline.training_pipeline import TrainPipeline
+
+    pipeline = TrainPipeline(force_stages=args.force_stage)
+    pipeline.run_pipeline()
+    print(pipeline.summary())
+
+
+def sweep(args: argparse.Namespace) -> None:
+    """
+    Searches training settings with a hyperparameter sweep and writes a leaderboard.
+    """
+    from fireSmoke.entity.config_entity import HyperparameterSweepConfig
+    from fireSmoke.pipeline.training_pipeline import TrainPipeline
+    from fireSmoke.utils.main_utils import read_yaml_file
+
+    config = HyperparameterSweepConfig()
+    if args.space:
+        space_config = read_yaml_file(args.space)
+        config.search_space = space_config.get("space", config.search_space)
+        config.method = space_config.get("method", config.method)
+        config.max_trials = space_config.get("trials", config.max_trials)
+    for name in ("method", "max_trials", "workers", "min_metric"):
+        if getattr(args, name) is not None:
+            setattr(config, name, getattr(args, name))
+
+    artifact = TrainPipeline().run_sweep(config)
+    print(f"{artifact.trials_completed} trials completed, {artifact.trials_pruned} pruned, "
+          f"{artifact.trials_failed} failed -> {artifact.leaderboard_file_path}")
+    if artifact.best_trial_id:
+        print(f"Fastest trial reaching {config.metric} >= {config.min_metric}: "
+              f"{artifact.best_trial_id} ({artifact.best_model_file_path})")
+    else:
+        print(f"No trial reached {config.metric} >= {config.min_metric}")
+
+
+def parse_frame_size(value: str) -> tuple:
+    """
+    Parses a "<width>x<height>" frame size argument.
+    """
+    width, sep, height = value.lower().partition("x")
+    if not sep or not width.isdigit() or not height.isdigit():
+        raise argparse.ArgumentTypeError(f"Expected <width>x<height>, got {value!r}")
+    return int(width), int(height)
+
+
+def bench(args: argparse.Namespace) -> int:
+    """
+    Times every stage of serving a frame and compares the timings with the stored baseline.
+
+    :return: 1 if a stage regressed beyond the tolerance, otherwise 0.
+    """
+    from fireSmoke.entity.config_entity import BenchmarkConfig
+    from fireSmoke.pipeline.benchmark_pipeline import BenchmarkPipeline
+
+    config = BenchmarkConfig(model=args.model, source=args.source, baseline_file_path=args.baseline,
+                             frames=args.frames, warmup_frames=args.warmup, imgsz=args.imgsz,
+                             num_threads=args.threads, tolerance=args.tolerance)
+    if args.frame_size:
+        config.frame_size = args.frame_size
+    if args.output:
+        config.output_file_path = args.output
+
+    pipeline = BenchmarkPipeline(config)
+    artifact = pipeline.run()
+    print(f"{'stage':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'frames/s':>11}")
+    for stage, summary in artifact.stages.items():
+        print(f"{stage:<26}{summary['p50']:>10.2f}{summary['p95']:>10.2f}{summary['p99']:>10.2f}{summary['fps']:>11.1f}")
+    print(f"-> {artifact.output_file_path}")
+
+    if args.update_baseline:
+        pipeline.update_baseline()
+        print(f"Stored as baseline {config.baseline_file_path}")
+        return 0
+    for regression in artifact.regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if artifact.regressions else 0
+
+
+def importtime(args: argparse.Namespace) -> int:
+    """
+    Profiles the import time of the package entry points and checks it against the stored budget.
+
+    :return: 1 if a target is over its budget or loads a forbidden package, otherwise 0.
+    """
+    from fireSmoke.entity.config_entity import ImportTimeConfig
+    from fireSmoke.pipeline.import_time_pipeline import ImportTimePipeline
+
+    config = ImportTimeConfig(runs=args.runs, budget_file_path=args.budget)
+    if args.target:
+        config.targets = args.target
+    if args.output:
+        config.output_file_path = args.output
+
+    pipeline = ImportTimePipeline(config)
+    artifact = pipeline.run()
+    budget = pipeline.load_budget()
+    print(f"{'target':<40}{'median ms':>11}{'budget ms':>11}  heavy packages")
+    for target, profile in artifact.targets.items():
+        limit = budget.get(target, {}).get("max_ms")
+        print(f"{target:<40}{profile['median_ms']:>11.1f}{limit if limit is not None else '-':>11}  "
+              f"{', '.join(profile['heavy_packages']) or '-'}")
+    print(f"-> {artifact.output_file_path}")
+
+    if args.update_budget:
+        pipeline.update_budget()
+        print(f"Stored as time budget {config.local_budget_file_path}")
+        return 0
+    for regression in artifact.regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if artifact.regressions else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line parser of the fireSmoke package.
+    """
+    parser = argparse.ArgumentParser(prog="python -m fireSmoke", description="Fire smoke segmentation tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    detect_parser = subparsers.add_parser("detect", help="Run detection over an image folder or a video file")
+    detect_parser.add_argument("source", help="Folder of images or path to a video file")
+    detect_parser.add_argument("--output", help="JSONL output file (default: artifacts/batch_inference/detections.jsonl)")
+    detect_parser.add_argument("--weights", default=APP_MODEL_PATH, help="Model weights")
+    detect_parser.add_argument("--device", default=APP_DEVICE, help="Inference device (auto, cpu, cuda)")
+    detect_parser.add_argument("--conf", type=float, default=0.25, help="Confidence threshold")
+    detect_parser.add_argument("--stride", type=int, default=1, help="Process every n-th frame")
+    detect_parser.add_argument("--batch-size", type=int, default=BATCH_INFERENCE_SIZE, help="Frames per inference batch")
+    detect_parser.add_argument("--workers", type=int, default=BATCH_DECODE_WORKERS, help="Image decode threads")
+    detect_parser.add_argument("--checkpoint-every", type=int, default=BATCH_INFERENCE_CHECKPOINT_EVERY,
+                               help="Frames between checkpoints")
+    detect_parser.add_argument("--mask-format", choices=["rle", "polygon", "none"], default=BATCH_INFERENCE_MASK_FORMAT,
+                               help="Encoding of the segmentation masks in the output")
+    detect_parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    detect_parser.set_defaults(func=detect)
+
+    serve_parser = subparsers.add_parser("serve", help="Serve live camera streams over HTTP")
+    serve_parser.add_argument("--cameras", default=MULTI_CAMERA_CONFIG_FILE,
+                              help="YAML file listing the cameras (used when no --camera is given)")
+    serve_parser.add_argument("--camera", type=parse_camera, action="append",
+                              help="Camera as <id>=<source>, e.g. lobby=0 or yard=rtsp://...; repeatable")
+    serve_parser.add_argument("--host", default=APP_HOST, help="Address to bind")
+    serve_parser.add_argument("--port", type=int, default=APP_PORT, help="Port to bind")
+    serve_parser.add_argument("--weights", default=APP_MODEL_PATH, help="Model weights")
+    serve_parser.add_argument("--device", default=APP_DEVICE, help="Inference device (auto, cpu, cuda)")
+    serve_parser.add_argument("--batch-size", type=int, default=MULTI_CAMERA_BATCH_SIZE,
+                              help="Maximum camera frames per inference batch")
+    serve_parser.add_argument("--no-motion-gate", action="store_true",
+                              help="Run inference on every frame, even when the scene did not change")
+    serve_parser.add_argument("--keyframes", action="store_true", default=KEYFRAME_ENABLED,
+                              help="Run the model on keyframes only and propagate their masks in between")
+    serve_parser.add_argument("--no-metrics", action="store_true",
+                              help="Turn off the per-stage latency spans; /metrics then stays empty")
+    serve_parser.set_defaults(func=serve)
+
+    train_parser = subparsers.add_parser("train", help="Run the training pipeline")
+    train_parser.add_argument("--force-stage", action="append", default=[],
+                              choices=["data_ingestion", "data_validation", "data_sharding", "model_trainer",
+                                       "model_optimizer", "all"],
+                              help="Run a stage even if its config and inputs are unchanged, e.g. to pick up "
+                                   "a new version of the dataset; repeatable")
+    train_parser.set_defaults(func=train)
+
+    sweep_parser = subparsers.add_parser("sweep", help="Search training settings for the fastest accurate model")
+    sweep_parser.add_argument("--space", help="YAML file with the search space (method, trials and a space of "
+                                              "weight_name, img_size, batch_size and no_epochs values)")
+    sweep_parser.add_argument("--method", choices=["grid", "random"], help="Search method")
+    sweep_parser.add_argument("--trials", dest="max_trials", type=int, help="Maximum number of trials")
+    sweep_parser.add_argument("--workers", type=int, help="Trials trained concurrently")
+    sweep_parser.add_argument("--min-metric", type=float,
+                              help="Accuracy bar; trials reaching it are ranked by inference latency")
+    sweep_parser.set_defaults(func=sweep)
+
+    bench_parser = subparsers.add_parser("bench", help="Benchmark the inference stages on CPU against a baseline")
+    bench_parser.add_argument("--model", default=BENCHMARK_MODEL,
+                              help="Architecture YAML (seeded random weights, no download) or a local weight file")
+    bench_parser.add_argument("--source", help="Folder of images or video with recorded frames (default: synthetic frames)")
+    bench_parser.add_argument("--frames", type=int, default=BENCHMARK_FRAMES, help="Timed frames")
+    bench_parser.add_argument("--warmup", type=int, default=BENCHMARK_WARMUP_FRAMES, help="Untimed warmup frames")
+    bench_parser.add_argument("--frame-size", type=parse_frame_size, help="Synthetic frame size as <width>x<height>")
+    bench_parser.add_argument("--imgsz", type=int, default=MODEL_WARMUP_IMG_SIZE, help="Inference image size")
+    bench_parser.add_argument("--threads", type=int, default=0, help="CPU inference threads (0: runtime default)")
+    bench_parser.add_argument("--output", help="JSON output file (default: artifacts/benchmark/benchmark.json)")
+    bench_parser.add_argument("--baseline", default=BENCHMARK_BASELINE_FILE, help="Baseline JSON file to compare against")
+    bench_parser.add_argument("--tolerance", type=float, default=BENCHMARK_TOLERANCE,
+                              help="Allowed slowdown of p50/p95 against the baseline, e.g. 0.15")
+    bench_parser.add_argument("--update-baseline", action="store_true",
+                              help="Store this run as the new baseline instead of comparing against it")
+    bench_parser.set_defaults(func=bench)
+
+    importtime_parser = subparsers.add_parser("importtime",
+                                              help="Profile the import time of the package against a budget")
+    importtime_parser.add_argument("--target", action="append",
+                                   help="Module to profile, e.g. fireSmoke.utils.main_utils; repeatable "
+                                        "(default: the package entry points)")
+    importtime_parser.add_argument("--runs", type=int, default=IMPORT_TIME_RUNS,
+                                   help="Fresh interpreters per target; the median is reported")
+    importtime_parser.add_argument("--output", help="JSON output file (default: artifacts/import_time/import_time.json)")
+    importtime_parser.add_argument("--budget", default=IMPORT_TIME_BUDGET_FILE, help="Budget JSON file with the packages each target must not load")
+    importtime_parser.add_argument("--update-budget", action="store_true",
+                                   help="Store the measured times plus headroom as this machine's time budget")
+    importtime_parser.set_defaults(func=importtime)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,18 @@
+import hashlib
+import json
 import os
+import shutil
 import sys
-import zipfile
-import gdown
+from fireSmoke.constant.training_pipeline import (DATA_INGESTION_EXTRACTED_MARKER,
+                                                  DATA_INGESTION_ZIP_FILE_NAME)
 from fireSmoke.logger import logging
 from fireSmoke.exception import AppException
 from fireSmoke.entity.config_entity import DataIngestionConfig
 from fireSmoke.entity.artifacts_entity import DataIngestionArtifact
+from fireSmoke.utils.download_utils import (download_with_resume,
+                                            extract_zip_parallel,
+                                            remote_fingerprint,
+                                            sha256_file)
 
 
 class DataIngestion:
@@ -28,24 +35,97 @@ class DataIngestion:
            raise AppException(e, sys)
         
         
+    def _load_cache_index(self) -> dict:
+        """
+        Loads the url -> cached archive index of the download cache.
+        """
+        index_path = os.path.join(self.data_ingestion_config.cache_dir, "index.json")
+        if not os.path.exists(index_path):
+            return {}
+        with open(index_path, "r") as f:
+            return json.load(f)
+        
+        
+    def _save_cache_index(self, index: dict) -> None:
+        """
+        Atomically writes the url -> cached archive index of the download cache.
+        """
+        index_path = os.path.join(self.data_ingestion_config.cache_dir, "index.json")
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, index_path)
+        
+        
+    def _blob_path(self, sha256: str) -> str:
+        """
+        Location of a cached archive; the file keeps the data.zip name so it can be copied as is.
+        """
+        return os.path.join(self.data_ingestion_config.cache_dir, "blobs", sha256, DATA_INGESTION_ZIP_FILE_NAME)
+        
+        
     def download_data(self) -> str:
         """
-        Downloads the dataset from a specified URL to a local directory.
+        Downloads the dataset into the content-addressed cache, unless an up-to-date copy is already there.
+
+        Archives are stored under their SHA-256 and looked up by URL. A cached archive is
+        reused as long as the source still reports the same fingerprint (ETag or size and
+        modification time); partial downloads are resumed instead of restarted.
 
-        :return: Path to the downloaded zip file.
+        :return: Path to the cached zip file.
         :raises AppException: If an error occurs during the download process.
         """
         try:
             dataset_url = self.data_ingestion_config.data_download_url
-            zip_download_dir = self.data_ingestion_config.data_ingestion_dir
-            os.makedirs(zip_download_dir, exist_ok=True)
-            data_file_name = "data.zip"
-            zip_file_path = os.path.join(zip_download_dir, data_file_name)
-            logging.info(f"Downloading data from {dataset_url} into the {zip_file_path}")
-            
-            file_id = dataset_url.split("/")[-2]
-            prefix = "https://drive.google.com/uc?/export=download&id="
-            gdown.download(prefix+file_id, zip_file_path)
+            cache_dir = self.data_ingestion_config.cache_dir
+            os.makedirs(cache_dir, exist_ok=True)
+
+            is_drive = "drive.google.com" in dataset_url
+            fingerprint = None if is_drive else remote_fingerprint(dataset_url)
+
+            index = self._load_cache_index()
+            entry = index.get(dataset_url)
+            if entry and os.path.exists(self._blob_path(entry["sha256"])) \
+                    and (fingerprint is None or entry.get("fingerprint") == fingerprint):
+                logging.info(f"Using cached data {entry['sha256']} for {dataset_url}")
+                return self._blob_path(entry["sha256"])
+
+            url_key = hashlib.sha256(dataset_url.encode("utf-8")).hexdigest()[:16]
+            partial_path = os.path.join(cache_dir, "partial", f"{url_key}.part")
+            partial_meta_path = f"{partial_path}.json"
+            os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+
+            # A partial download of content that has changed since cannot be resumed
+            if os.path.exists(partial_meta_path):
+                with open(partial_meta_path, "r") as f:
+                    if json.load(f).get("fingerprint") != fingerprint and os.path.exists(partial_path):
+                        os.remove(partial_path)
+            with open(partial_meta_path, "w") as f:
+                json.dump({"url": dataset_url, "fingerprint": fingerprint}, f)
+
+            logging.info(f"Downloading data from {dataset_url} into the {partial_path}")
+            if is_drive:
+                import gdown # Only needed for Google Drive links
+                file_id = dataset_url.split("/")[-2]
+                prefix = "https://drive.google.com/uc?/export=download&id="
+                gdown.download(prefix+file_id, partial_path, resume=True)
+            else:
+                download_with_resume(dataset_url, partial_path,
+                                     chunk_size=self.data_ingestion_config.download_chunk_size,
+                                     retries=self.data_ingestion_config.download_retries)
+
+            sha256 = sha256_file(partial_path)
+            zip_file_path = self._blob_path(sha256)
+            os.makedirs(os.path.dirname(zip_file_path), exist_ok=True)
+            if os.path.exists(zip_file_path):
+                os.remove(partial_path) # Same content already cached under another URL
+            else:
+                os.replace(partial_path, zip_file_path)
+            os.remove(partial_meta_path)
+
+            index[dataset_url] = {"sha256": sha256, "fingerprint": fingerprint,
+                                  "size": os.path.getsize(zip_file_path)}
+            self._save_cache_index(index)
             
             logging.info(f"Downloaded data from {dataset_url} into file {zip_file_path}")
             
@@ -58,6 +138,9 @@ class DataIngestion:
     def extract_zip_file(self, zip_file_path: str) -> str:
         """
         Extracts the downloaded zip file into a specified directory.
+
+        The hash of the archive the feature store was extracted from is recorded next to
+        it, so an unchanged archive is not extracted again. Members are extracted in parallel.
         
         :param zip_file_path: Path to the zip file to be extracted.
         :return: Path to the directory where files are extracted.
@@ -65,10 +148,29 @@ class DataIngestion:
         """
         try:
             feature_store_path = self.data_ingestion_config.feature_store_file_path
+            # Kept next to the feature store, whose listing is checked by data validation
+            marker_path = os.path.join(self.data_ingestion_config.data_ingestion_dir, DATA_INGESTION_EXTRACTED_MARKER)
+            sha256 = os.path.basename(os.path.dirname(zip_file_path))
+
+            if os.path.exists(marker_path):
+                with open(marker_path, "r") as f:
+                    if f.read().strip() == sha256:
+                        logging.info(f"Feature store {feature_store_path} is up to date with {sha256}")
+                        return feature_store_path
+
+            # Start from an empty directory so files of an older archive do not linger
+            if os.path.exists(marker_path):
+                os.remove(marker_path)
+            if os.path.exists(feature_store_path):
+                shutil.rmtree(feature_store_path)
             os.makedirs(feature_store_path, exist_ok=True)
-            with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
-                zip_ref.extractall(feature_store_path)
+
             logging.info(f"Extracting zip file: {zip_file_path} into dir: {feature_store_path}")
+            n_files = extract_zip_parallel(zip_file_path, feature_store_path,
+                                           workers=self.data_ingestion_config.extract_workers)
+            with open(marker_path, "w") as f:
+                f.write(sha256)
+            logging.info(f"Extracted {n_files} files into {feature_store_path}")
             
             return feature_store_path
         
@@ -0,0 +1,221 @@
+import os, sys
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from fireSmoke.logger import logging
+from fireSmoke.exception import AppException
+from fireSmoke.constant.training_pipeline import (DATA_SHARDING_INDEX_FILE,
+                                                  DATA_SHARDING_LABELS_FILE,
+                                                  DATA_VALIDATION_IMAGE_EXTENSIONS)
+from fireSmoke.entity.config_entity import DataShardingConfig
+from fireSmoke.entity.artifacts_entity import DataIngestionArtifact, DataShardingArtifact
+from fireSmoke.utils.main_utils import read_yaml_file, resolve_dataset_split, write_yaml_file
+from fireSmoke.utils.shard_utils import letterbox
+
+
+def _load_sample(image_path: str, label_path: str, size: int):
+    """
+    Decodes and letterboxes one image and maps its polygons into letterboxed coordinates.
+
+    :return: (letterboxed image, class ids, list of (n, 2) polygons), or None if the image cannot be read.
+    """
+    image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    height, width = image.shape[:2]
+    boxed, ratio, (pad_x, pad_y) = letterbox(image, size)
+
+    classes, polygons = [], []
+    if os.path.exists(label_path):
+        with open(label_path, "r") as f:
+            for line in f:
+                values = line.split()
+                if len(values) < 7 or len(values) % 2 == 0:
+                    continue
+                points = np.array(values[1:], dtype=np.float32).reshape(-1, 2)
+                points[:, 0] = (points[:, 0] * width * ratio + pad_x) / size
+                points[:, 1] = (points[:, 1] * height * ratio + pad_y) / size
+                classes.append(int(float(values[0])))
+                polygons.append(np.clip(points, 0, 1))
+    return boxed, classes, polygons
+
+
+class DataSharding:
+    """
+    This class converts the feature store into memory-mapped training shards.
+
+    Every image is decoded and letterboxed to the training size once, and stored in
+    fixed-size `.npy` shard files next to a compact label array and an offset index.
+    Training then copies images out of the page cache instead of decoding JPEGs on
+    every epoch. A split whose source files have not changed is not rewritten.
+    """
+
+    def __init__(self,
+                 data_sharding_config: DataShardingConfig,
+                 data_ingestion_artifact: DataIngestionArtifact):
+        """
+        Constructor for the DataSharding class.
+
+        :param data_sharding_config: Configuration for sharding, including image size and shard size.
+        :param data_ingestion_artifact: Artifact pointing to the extracted feature store.
+        """
+        try:
+            self.data_sharding_config = data_sharding_config
+            self.data_ingestion_artifact = data_ingestion_artifact
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    @staticmethod
+    def _list_samples(images_dir: str) -> list:
+        """
+        Lists the (image path, label path) pairs of a split in sorted order.
+        """
+        labels_dir = os.path.join(os.path.dirname(images_dir), "labels")
+        names = sorted(name for name in os.listdir(images_dir)
+                       if name.lower().endswith(DATA_VALIDATION_IMAGE_EXTENSIONS))
+        return [(os.path.join(images_dir, name), os.path.join(labels_dir, os.path.splitext(name)[0] + ".txt"))
+                for name in names]
+
+
+    def _fingerprint(self, samples: list) -> str:
+        """
+        Identity of a split's source files and the shard settings.
+        """
+        digest = hashlib.sha256(f"{self.data_sharding_config.img_size}:"
+                                f"{self.data_sharding_config.images_per_shard}".encode())
+        for image_path, label_path in samples:
+            for path in (image_path, label_path):
+                try:
+                    stat = os.stat(path)
+                    digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+                except FileNotFoundError:
+                    digest.update(f"{path}:-;".encode())
+        return digest.hexdigest()
+
+
+    def shard_split(self, images_dir: str, split_dir: str) -> int:
+        """
+        Writes the shards, labels and index of one split.
+
+        :param images_dir: Image directory of the split in the feature store.
+        :param split_dir: Directory the shards are written to.
+        :return: Number of images stored.
+        :raises AppException: If the split cannot be sharded.
+        """
+        try:
+            size = self.data_sharding_config.img_size
+            per_shard = self.data_sharding_config.images_per_shard
+            samples = self._list_samples(images_dir)
+            fingerprint = self._fingerprint(samples)
+
+            index_path = os.path.join(split_dir, DATA_SHARDING_INDEX_FILE)
+            if os.path.exists(index_path):
+                with open(index_path, "r") as f:
+                    index = json.load(f)
+                if index.get("fingerprint") == fingerprint and all(
+                        os.path.exists(os.path.join(split_dir, shard)) for shard in index["shards"]):
+                    logging.info(f"Shards of {images_dir} are up to date, skipping")
+                    return index["num_images"]
+                # The index is written last, so removing it first marks the split incomplete
+                os.remove(index_path)
+
+            os.makedirs(split_dir, exist_ok=True)
+            for name in os.listdir(split_dir):
+                os.remove(os.path.join(split_dir, name))
+
+            files, shards, shard = [], [], None
+            classes, point_offsets, points, image_offsets = [], [0], [], [0]
+            with ThreadPoolExecutor(max_workers=self.data_sharding_config.workers) as executor:
+                loaded = executor.map(lambda sample: _load_sample(*sample, size), samples)
+                for (image_path, _), result in zip(samples, loaded):
+                    if result is None:
+                        logging.info(f"Skipping unreadable image {image_path}")
+                        continue
+                    image, image_classes, polygons = result
+
+                    shard_id, row = divmod(len(files), per_shard)
+                    if row == 0:
+                        if shard is not None:
+                            shard.flush()
+                        shards.append(f"images_{shard_id:05d}.npy")
+                        # Sized for the remaining candidates; rows left by skipped images stay unused
+                        rows = min(per_shard, len(samples) - shard_id * per_shard)
+                        shard = np.lib.format.open_memmap(os.path.join(split_dir, shards[-1]), mode="w+",
+                                                          dtype=np.uint8, shape=(rows, size, size, 3))
+                    shard[row] = image
+
+                    files.append(os.path.basename(image_path))
+                    classes.extend(image_classes)
+                    for polygon in polygons:
+                        points.append(polygon)
+                        point_offsets.append(point_offsets[-1] + len(polygon))
+                    image_offsets.append(len(classes))
+
+            if shard is not None:
+                shard.flush()
+                del shard
+
+            np.savez(os.path.join(split_dir, DATA_SHARDING_LABELS_FILE),
+                     image_offsets=np.array(image_offsets, dtype=np.int64),
+                     classes=np.array(classes, dtype=np.int16),
+                     point_offsets=np.array(point_offsets, dtype=np.int64),
+                     points=np.concatenate(points) if points else np.zeros((0, 2), dtype=np.float32))
+            with open(index_path, "w") as f:
+                json.dump({"fingerprint": fingerprint, "img_size": size, "images_per_shard": per_shard,
+                           "num_images": len(files), "shards": shards, "files": files}, f)
+
+            logging.info(f"Sharded {len(files)} images of {images_dir} into {len(shards)} shards at {split_dir}")
+            return len(files)
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def initiate_data_sharding(self) -> DataShardingArtifact:
+        """
+        Shards every split listed in the dataset's data.yaml and writes a data.yaml
+        pointing at the shard directories.
+
+        :return: DataShardingArtifact with the generated data.yaml and the shard directories.
+        :raises AppException: If any split cannot be sharded.
+        """
+        logging.info("Entered initiate_data_sharding method of DataSharding class")
+        try:
+            feature_store_path = self.data_ingestion_artifact.feature_store_path
+            data_config = read_yaml_file(os.path.join(feature_store_path, "data.yaml"))
+
+            split_dirs, images_sharded = {}, 0
+            for split in ("train", "val", "test"):
+                if split not in data_config:
+                    continue
+                images_dir = resolve_dataset_split(feature_store_path, data_config[split])
+                if not os.path.isdir(images_dir):
+                    if split == "test":
+                        del data_config[split]
+                        continue
+                    raise Exception(f"{split} split {images_dir} not found in the feature store")
+
+                split_dir = os.path.abspath(os.path.join(self.data_sharding_config.data_sharding_dir, split))
+                images_sharded += self.shard_split(images_dir, split_dir)
+                split_dirs[split] = split_dir
+                data_config[split] = split_dir
+            data_config["path"] = os.path.abspath(self.data_sharding_config.data_sharding_dir)
+
+            write_yaml_file(self.data_sharding_config.data_yaml_file_path, data_config, replace=True)
+
+            data_sharding_artifact = DataShardingArtifact(
+                data_yaml_file_path=self.data_sharding_config.data_yaml_file_path,
+                split_dirs=split_dirs,
+                images_sharded=images_sharded
+            )
+
+            logging.info("Exited initiate_data_sharding method of DataSharding class")
+            logging.info(f"Data sharding artifact: {data_sharding_artifact}")
+
+            return data_sharding_artifact
+
+        except Exception as e:
+            raise AppException(e, sys)
@@ -1,18 +1,117 @@
 import os, sys
-import shutil
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from PIL import Image
 from fireSmoke.logger import logging
 from fireSmoke.exception import AppException
 from fireSmoke.entity.config_entity import DataValidationConfig
 from fireSmoke.entity.artifacts_entity import (DataIngestionArtifact,
                                                DataValidationArtifact)
+from fireSmoke.utils.main_utils import read_yaml_file
+
+
+def _check_labels(text: str, num_classes: int) -> list:
+    """
+    Checks the YOLO-seg polygon labels of one image.
+
+    Every line is "<class> x1 y1 ... xn yn" with normalised coordinates. All lines are
+    parsed into one flat array and checked together: class ids, coordinate range,
+    polygons with fewer than 3 points and polygons with no area.
+
+    :param text: Content of the label file.
+    :param num_classes: Number of classes declared in data.yaml.
+    :return: List of error messages; empty when the labels are valid.
+    """
+    lines = [line.split() for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+
+    lengths = np.array([len(line) for line in lines])
+    try:
+        values = np.array([token for line in lines for token in line], dtype=np.float64)
+    except ValueError:
+        return ["non-numeric value"]
+
+    errors = []
+    n_points = (lengths - 1) // 2
+    odd = (lengths - 1) % 2 == 1
+    if np.any(odd):
+        errors.append(f"{int(odd.sum())} polygons with an odd number of coordinates")
+    too_short = n_points < 3
+    if np.any(too_short):
+        errors.append(f"{int(too_short.sum())} polygons with fewer than 3 points")
+
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    class_ids = values[starts]
+    if np.any((class_ids != np.round(class_ids)) | (class_ids < 0) | (class_ids >= num_classes)):
+        errors.append(f"class id outside 0..{num_classes - 1}")
+
+    is_coordinate = np.ones(len(values), dtype=bool)
+    is_coordinate[starts] = False
+    coordinates = values[is_coordinate]
+    if np.any(~np.isfinite(coordinates) | (coordinates < 0) | (coordinates > 1)):
+        errors.append("coordinates outside [0, 1]")
+
+    # Shoelace area of every well-formed polygon in one pass
+    well_formed = ~odd & ~too_short
+    if np.any(well_formed):
+        polygons = [values[start + 1:start + length].reshape(-1, 2)
+                    for start, length in zip(starts[well_formed], lengths[well_formed])]
+        points = np.concatenate(polygons)
+        sizes = np.array([len(polygon) for polygon in polygons])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        following = np.arange(1, len(points) + 1)
+        following[offsets + sizes - 1] = offsets # Close every ring onto its own first point
+        cross = points[:, 0] * points[following, 1] - points[following, 0] * points[:, 1]
+        areas = np.abs(np.add.reduceat(cross, offsets)) / 2
+        degenerate = areas < 1e-8
+        if np.any(degenerate):
+            errors.append(f"{int(degenerate.sum())} degenerate polygons with zero area")
+
+    return errors
+
+
+def _validate_sample(image_path: str, label_path: str, num_classes: int) -> dict:
+    """
+    Validates one image and its label file. Runs in a worker process.
+
+    :param image_path: Path to the image.
+    :param label_path: Path to the label file; a missing one marks a background image.
+    :param num_classes: Number of classes declared in data.yaml.
+    :return: {"errors": [...], "instances": number of labelled polygons}.
+    """
+    errors = []
+    try:
+        with Image.open(image_path) as img:
+            img.verify()
+            is_jpeg = img.format == "JPEG"
+        if is_jpeg:
+            with open(image_path, "rb") as f:
+                f.seek(-2, os.SEEK_END)
+                if f.read() != b"\xff\xd9":
+                    errors.append("truncated JPEG")
+    except Exception as e:
+        errors.append(f"unreadable image: {e}")
+
+    instances = 0
+    if os.path.exists(label_path):
+        with open(label_path, "r") as f:
+            text = f.read()
+        instances = sum(1 for line in text.splitlines() if line.strip())
+        errors.extend(_check_labels(text, num_classes))
+
+    return {"errors": errors, "instances": instances}
 
 
 class DataValidation:
     """
-    This class handles the validation of ingested data by ensuring the required files
-    are present in the specified feature store directory.
+    This class handles the validation of ingested data: the required files must be present
+    in the feature store, and every image/label pair of the splits is checked in a process
+    pool. Per-file results are kept in a manifest so reruns only re-check changed files.
     """
-    
+
     def __init__(
         self,
         data_ingestion_artifact: DataIngestionArtifact,
@@ -29,8 +128,8 @@ class DataValidation:
             self.data_validation_config = data_validation_config
         except Exception as e:
             raise AppException(e, sys)
-        
-        
+
+
     def validate_all_files_exist(self) -> bool:
         """
         Validates if all the required files exist in the feature store directory.
@@ -39,49 +138,147 @@ class DataValidation:
         :raises AppException: If an error occurs during the validation process.
         """
         try:
-            validation_status = None
-            
-            all_files = os.listdir(self.data_ingestion_artifact.feature_store_path)
-            
-            for file in all_files:
-                if file not in self.data_validation_config.required_file_list:
-                    validation_status = False
-                    os.makedirs(self.data_validation_config.data_validation_dir, exist_ok=True)
-                    with open(self.data_validation_config.valid_status_file_dir, 'w') as f:
-                        f.write(f"Validation status: {validation_status}")
-                else:
-                    validation_status = True
-                    os.makedirs(self.data_validation_config.data_validation_dir, exist_ok=True)
-                    with open(self.data_validation_config.valid_status_file_dir, 'w') as f:
-                        f.write(f"Validation status: {validation_status}")
-                        
-            return validation_status
-            
+            all_files = set(os.listdir(self.data_ingestion_artifact.feature_store_path))
+            missing_files = [file for file in self.data_validation_config.required_file_list if file not in all_files]
+            if missing_files:
+                logging.info(f"Required files missing from the feature store: {missing_files}")
+
+            return not missing_files
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def _scan_split(self, split: str) -> list:
+        """
+        Lists the images of a split with the size and mtime of each image and its label file.
+
+        :param split: Name of the split directory.
+        :return: List of (path relative to the feature store, image path, label path, stat key).
+        """
+        feature_store_path = self.data_ingestion_artifact.feature_store_path
+        images_dir = os.path.join(feature_store_path, split, "images")
+        labels_dir = os.path.join(feature_store_path, split, "labels")
+        if not os.path.isdir(images_dir):
+            return []
+
+        samples = []
+        with os.scandir(images_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(tuple(self.data_validation_config.image_extensions)):
+                    continue
+                label_path = os.path.join(labels_dir, os.path.splitext(entry.name)[0] + ".txt")
+                image_stat = entry.stat()
+                try:
+                    label_stat = os.stat(label_path)
+                    label_key = [label_stat.st_size, label_stat.st_mtime_ns]
+                except FileNotFoundError:
+                    label_key = None
+                key = [image_stat.st_size, image_stat.st_mtime_ns, label_key]
+                samples.append((f"{split}/images/{entry.name}", entry.path, label_path, key))
+        return samples
+
+
+    def validate_samples(self) -> dict:
+        """
+        Validates every image/label pair of the splits in a process pool. Pairs whose
+        image and label size and mtime match the manifest of the previous run are not
+        re-checked.
+
+        :return: Summary with the number of samples, re-checked samples, instances and the
+                 errors of every invalid sample keyed by its relative path.
+        :raises AppException: If an error occurs during the validation process.
+        """
+        try:
+            data_config = read_yaml_file(os.path.join(self.data_ingestion_artifact.feature_store_path, "data.yaml"))
+            num_classes = int(data_config.get("nc", len(data_config.get("names", []))))
+
+            manifest_path = self.data_validation_config.manifest_file_path
+            manifest = {}
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r") as f:
+                    manifest = json.load(f)
+            # Class ids were checked against the class count, so a new count invalidates every entry
+            entries = manifest.get("samples", {}) if manifest.get("num_classes") == num_classes else {}
+
+            samples = [sample for split in self.data_validation_config.splits for sample in self._scan_split(split)]
+            stale = [sample for sample in samples if entries.get(sample[0], {}).get("key") != sample[3]]
+            logging.info(f"Validating {len(stale)} of {len(samples)} samples, the rest are unchanged since the last run")
+
+            if stale:
+                workers = self.data_validation_config.workers
+                chunksize = max(1, min(64, len(stale) // (workers * 4)))
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = executor.map(_validate_sample,
+                                           [image_path for _, image_path, _, _ in stale],
+                                           [label_path for _, _, label_path, _ in stale],
+                                           repeat(num_classes),
+                                           chunksize=chunksize)
+                    for (rel_path, _, _, key), result in zip(stale, results):
+                        entries[rel_path] = dict(result, key=key)
+
+            # Files removed since the last run drop out of the manifest
+            entries = {sample[0]: entries[sample[0]] for sample in samples}
+
+            os.makedirs(self.data_validation_config.data_validation_dir, exist_ok=True)
+            tmp_path = f"{manifest_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"num_classes": num_classes, "samples": entries}, f)
+            os.replace(tmp_path, manifest_path)
+
+            return {
+                "samples": len(samples),
+                "rechecked": len(stale),
+                "instances": sum(entry["instances"] for entry in entries.values()),
+                "invalid": {rel_path: entry["errors"] for rel_path, entry in entries.items() if entry["errors"]},
+            }
+
         except Exception as e:
             raise AppException(e, sys)
-        
-        
+
+
     def initiate_data_validation(self) -> DataValidationArtifact:
         """
-        Orchestrates the data validation process by checking the presence of required files.
+        Orchestrates the data validation process by checking the presence of required files
+        and the content of every image/label pair.
 
         :return: DataValidationArtifact containing the validation status.
         :raises AppException: If an error occurs during the validation process.
         """
         logging.info("Entered initiate_data_validation method of DataValidation class")
         try:
-            status = self.validate_all_files_exist()
+            files_exist = self.validate_all_files_exist()
+            summary = (self.validate_samples() if files_exist
+                       else {"samples": 0, "rechecked": 0, "instances": 0, "invalid": {}})
+
+            invalid = summary["invalid"]
+            invalid_fraction = len(invalid) / summary["samples"] if summary["samples"] else 1.0
+            status = files_exist and invalid_fraction <= self.data_validation_config.max_invalid_fraction
+
+            # Written once, after every check has run
+            os.makedirs(self.data_validation_config.data_validation_dir, exist_ok=True)
+            with open(self.data_validation_config.valid_status_file_dir, 'w') as f:
+                f.write(f"Validation status: {status}\n")
+                f.write(f"Required files present: {files_exist}\n")
+                f.write(f"Samples: {summary['samples']} ({summary['rechecked']} re-checked), "
+                        f"instances: {summary['instances']}, invalid samples: {len(invalid)}\n")
+                for rel_path, errors in sorted(invalid.items()):
+                    f.write(f"{rel_path}: {'; '.join(errors)}\n")
+
+            if invalid:
+                logging.info(f"{len(invalid)} invalid samples, see {self.data_validation_config.valid_status_file_dir}")
+
             data_validation_artifact = DataValidationArtifact(
-                validation_status=status
+                validation_status=status,
+                manifest_file_path=self.data_validation_config.manifest_file_path,
+                samples_checked=summary["samples"],
+                invalid_samples=len(invalid)
             )
-            
+
             logging.info("Exited initiate_data_validation method of DataValidation class")
             logging.info(f"Data Validation artifact: {data_validation_artifact}")
-            
-            if status:
-                shutil.copy(self.data_ingestion_artifact.data_zip_file_path, os.getcwd())
-                
+
             return data_validation_artifact
-        
+
         except Exception as e:
-            raise AppException(e, sys)
\ No newline at end of file
+            raise AppException(e, sys)
@@ -0,0 +1,351 @@
+import os, sys
+import itertools
+import json
+import multiprocessing
+import random
+import shutil
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, replace
+from typing import List, Optional
+
+import cv2
+import numpy as np
+from ultralytics.utils.downloads import attempt_download_asset
+
+from fireSmoke.logger import logging
+from fireSmoke.exception import AppException
+from fireSmoke.components.model_trainer import ModelTrainer
+from fireSmoke.constant.training_pipeline import (DATA_VALIDATION_IMAGE_EXTENSIONS,
+                                                  SWEEP_WEIGHTS_DIR_NAME)
+from fireSmoke.entity.config_entity import HyperparameterSweepConfig, ModelTrainerConfig
+from fireSmoke.entity.artifacts_entity import (DataIngestionArtifact,
+                                               DataShardingArtifact,
+                                               HyperparameterSweepArtifact)
+from fireSmoke.inference.engine import InferenceEngine, configure_threads, measure_latency
+from fireSmoke.utils.main_utils import read_yaml_file, resolve_dataset_split
+
+SWEEP_PARAMETERS = ("weight_name", "img_size", "batch_size", "no_epochs")
+
+
+class TrialPruned(Exception):
+    """
+    Raised inside the training loop of a trial whose metric lags behind the other trials.
+    """
+
+
+def should_prune(value: float, others: List[float], epoch: int, warmup_epochs: int, min_trials: int) -> bool:
+    """
+    Median stopping rule: a trial is pruned when its metric at an epoch is below the median
+    of what the other trials reached at the same epoch.
+
+    :param value: Metric of the trial at `epoch`.
+    :param others: Metrics of the other trials at `epoch`.
+    :param epoch: 1-based epoch number.
+    :param warmup_epochs: Epochs a trial always runs before it can be pruned.
+    :param min_trials: Reports of other trials needed before the median is trusted.
+    :return: Whether to stop the trial.
+    """
+    if epoch < warmup_epochs or len(others) < min_trials:
+        return False
+    return value < statistics.median(others)
+
+
+def _init_worker(num_threads: int) -> None:
+    """
+    Limits a trial process to its share of the CPU threads, so concurrent trials
+    do not oversubscribe the cores.
+    """
+    configure_threads(num_threads)
+    cv2.setNumThreads(num_threads)
+
+
+def run_trial(trial_id: str, params: dict, model_trainer_config: ModelTrainerConfig,
+              data_ingestion_artifact: DataIngestionArtifact,
+              data_sharding_artifact: Optional[DataShardingArtifact],
+              metric: str, warmup_epochs: int, min_trials: int, reports, reports_lock) -> dict:
+    """
+    Trains one trial in a pool process and reports its metric after every epoch.
+
+    :param trial_id: Id of the trial.
+    :param params: ModelTrainerConfig settings of the trial.
+    :param model_trainer_config: Config of the trial, with its own directory.
+    :param data_ingestion_artifact: Artifact pointing to the extracted feature store.
+    :param data_sharding_artifact: Artifact pointing to the training shards, if they were built.
+    :param metric: Validation metric used for pruning.
+    :param warmup_epochs: Epochs a trial always runs before it can be pruned.
+    :param min_trials: Reports of other trials needed before pruning at an epoch.
+    :param reports: Shared dict of epoch -> {trial_id: metric} across all trials.
+    :param reports_lock: Lock guarding `reports`.
+    :return: Result row of the trial.
+    """
+    history, final = [], {}
+
+    def on_fit_epoch_end(trainer):
+        value = float((trainer.metrics or {}).get(metric, 0.0))
+        epoch = trainer.epoch + 1
+        if epoch > trainer.epochs: # Final validation of best.pt after the last epoch
+            final["metric"] = value
+            return
+        history.append(round(value, 5))
+        with reports_lock:
+            at_epoch = dict(reports.get(epoch, {}))
+            at_epoch[trial_id] = value
+            reports[epoch] = at_epoch
+        others = [other for other_id, other in at_epoch.items() if other_id != trial_id]
+        if should_prune(value, others, epoch, warmup_epochs, min_trials):
+            final["pruned_at"] = epoch
+            raise TrialPruned(f"{metric}={value:.4f} below the median {statistics.median(others):.4f} at epoch {epoch}")
+
+    result = {"trial_id": trial_id, "params": params, "status": "completed", "epochs_run": 0,
+              "metric": None, "history": history, "train_seconds": 0.0,
+              "trained_model_file_path": None, "latency_ms": None, "error": None}
+    start = time.perf_counter()
+    try:
+        model_trainer = ModelTrainer(model_trainer_config=model_trainer_config,
+                                     data_ingestion_artifact=data_ingestion_artifact,
+                                     data_sharding_artifact=data_sharding_artifact,
+                                     callbacks={"on_fit_epoch_end": on_fit_epoch_end})
+        artifact = model_trainer.initiate_model_trainer()
+        result["trained_model_file_path"] = artifact.trained_model_file_path
+        result["metric"] = round(final.get("metric", history[-1] if history else 0.0), 5)
+    except Exception as e:
+        if "pruned_at" in final:
+            result["status"] = "pruned"
+            result["metric"] = history[-1]
+        else:
+            result["status"], result["error"] = "failed", str(e)
+    result["epochs_run"] = len(history)
+    result["train_seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+class HyperparameterSweep:
+    """
+    This class searches ModelTrainer settings (weights, image size, batch size, epochs)
+    for the fastest model that is accurate enough.
+
+    Trials are trained concurrently in a pool of "spawn" processes, each limited to its
+    share of the CPU threads. After every epoch a trial reports its validation metric to
+    the other trials, and a trial that falls below their median is stopped early. The CPU
+    inference latency of every finished trial is then measured one trial at a time, so the
+    measurement is not disturbed by training, and all trials are written to a leaderboard.
+    """
+
+    def __init__(self,
+                 sweep_config: HyperparameterSweepConfig,
+                 model_trainer_config: ModelTrainerConfig,
+                 data_ingestion_artifact: DataIngestionArtifact,
+                 data_sharding_artifact: Optional[DataShardingArtifact] = None):
+        """
+        Constructor for the HyperparameterSweep class.
+
+        :param sweep_config: Configuration of the sweep.
+        :param model_trainer_config: Base training settings that trials override.
+        :param data_ingestion_artifact: Artifact pointing to the extracted feature store.
+        :param data_sharding_artifact: Artifact pointing to the training shards, if they were built.
+        """
+        self.sweep_config = sweep_config
+        self.model_trainer_config = model_trainer_config
+        self.data_ingestion_artifact = data_ingestion_artifact
+        self.data_sharding_artifact = data_sharding_artifact
+
+
+    def trial_params(self) -> List[dict]:
+        """
+        Builds the settings of every trial from the search space.
+
+        :return: One dict of ModelTrainerConfig settings per trial.
+        :raises AppException: If the search space names an unknown setting or method.
+        """
+        try:
+            space = self.sweep_config.search_space
+            unknown = set(space) - set(SWEEP_PARAMETERS)
+            if unknown:
+                raise Exception(f"Unknown sweep parameters {sorted(unknown)}, expected any of {SWEEP_PARAMETERS}")
+
+            names = [name for name in SWEEP_PARAMETERS if name in space]
+            values = [space[name] if isinstance(space[name], (list, tuple)) else [space[name]] for name in names]
+            grid = [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+            if self.sweep_config.method == "grid":
+                return grid[:self.sweep_config.max_trials]
+            if self.sweep_config.method == "random":
+                return random.Random(self.sweep_config.seed).sample(grid, min(self.sweep_config.max_trials, len(grid)))
+            raise Exception(f"Unknown sweep method {self.sweep_config.method!r}, expected 'grid' or 'random'")
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def _fetch_weights(self, trials: List[dict]) -> dict:
+        """
+        Downloads every pre-trained weight of the search space once, so concurrent trials
+        do not download the same file.
+
+        :return: Mapping of weight name to local path.
+        """
+        weights_dir = os.path.join(self.sweep_config.sweep_dir, SWEEP_WEIGHTS_DIR_NAME)
+        os.makedirs(weights_dir, exist_ok=True)
+        weight_names = {trial.get("weight_name", self.model_trainer_config.weight_name) for trial in trials}
+        return {name: str(attempt_download_asset(os.path.join(weights_dir, name))) for name in weight_names}
+
+
+    def _trial_config(self, trial_id: str, params: dict, weight_path: str, num_threads: int) -> ModelTrainerConfig:
+        """
+        ModelTrainerConfig of a trial, writing into the trial's own directory.
+        """
+        trial_dir = os.path.join(self.sweep_config.sweep_dir, trial_id)
+        os.makedirs(trial_dir, exist_ok=True)
+        config = replace(self.model_trainer_config,
+                         model_trainer_dir=trial_dir,
+                         data_yaml_file_path=os.path.join(trial_dir, os.path.basename(self.model_trainer_config.data_yaml_file_path)),
+                         runs_dir=os.path.join(trial_dir, os.path.basename(self.model_trainer_config.runs_dir)),
+                         dataloader_workers=min(self.model_trainer_config.dataloader_workers, num_threads),
+                         export_formats=[],
+                         publish_model=False,
+                         **params)
+        trial_weight_path = os.path.join(trial_dir, config.weight_name)
+        if not os.path.exists(trial_weight_path):
+            shutil.copy2(weight_path, trial_weight_path)
+        return config
+
+
+    def _latency_image(self) -> Optional[np.ndarray]:
+        """
+        First validation image of the feature store, used for the latency measurement.
+        """
+        feature_store_path = self.data_ingestion_artifact.feature_store_path
+        data_config = read_yaml_file(os.path.join(feature_store_path, "data.yaml"))
+        split_dir = resolve_dataset_split(feature_store_path, data_config.get("val", "valid/images"))
+        if os.path.isdir(split_dir):
+            for name in sorted(os.listdir(split_dir)):
+                if name.lower().endswith(DATA_VALIDATION_IMAGE_EXTENSIONS):
+                    return cv2.imread(os.path.join(split_dir, name))
+        return None
+
+
+    def measure_latency(self, weight_path: str, img_size: int, image: Optional[np.ndarray]) -> dict:
+        """
+        Measures the CPU inference latency of a trained model the way the app runs it.
+
+        :param weight_path: Path to best.pt of the trial.
+        :param img_size: Inference image size of the trial.
+        :param image: Image to run; a blank image of `img_size` when None.
+        :return: Median, 95th percentile and mean latency in milliseconds.
+        """
+        if image is None:
+            image = np.full((img_size, img_size, 3), 114, dtype=np.uint8)
+        engine = InferenceEngine(weight_path, device="cpu", imgsz=img_size)
+        return measure_latency(engine, image, self.sweep_config.latency_runs)
+
+
+    def rank(self, results: List[dict]) -> List[dict]:
+        """
+        Orders the trials: those reaching the accuracy bar by latency, then the other
+        completed trials by metric, then pruned and failed trials.
+        """
+        min_metric = self.sweep_config.min_metric
+
+        def key(result):
+            if result["status"] != "completed":
+                return (2, {"pruned": 0, "failed": 1}[result["status"]], -(result["metric"] or 0.0))
+            if result["metric"] >= min_metric and result["latency_ms"] is not None:
+                return (0, result["latency_ms"]["p50"], -result["metric"])
+            return (1, -result["metric"], 0.0)
+
+        return sorted(results, key=key)
+
+
+    def initiate_sweep(self) -> HyperparameterSweepArtifact:
+        """
+        Orchestrates the sweep, including:
+        - Building the trials from the search space
+        - Training them concurrently with median pruning
+        - Measuring the CPU inference latency of the finished trials
+        - Writing the leaderboard
+
+        :return: HyperparameterSweepArtifact with the leaderboard and the best trial.
+        :raises AppException: If the sweep cannot be run.
+        """
+        logging.info("Entered initiate_sweep method of HyperparameterSweep class")
+
+        try:
+            config = self.sweep_config
+            trials = self.trial_params()
+            if not trials:
+                raise Exception("The search space has no trials")
+            weight_paths = self._fetch_weights(trials)
+
+            workers = max(1, min(config.workers, len(trials)))
+            num_threads = max(1, (os.cpu_count() or 1) // workers)
+            logging.info(f"Running {len(trials)} trials, {workers} at a time with {num_threads} threads each")
+
+            context = multiprocessing.get_context("spawn")
+            results = []
+            with context.Manager() as manager:
+                reports, reports_lock = manager.dict(), manager.Lock()
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                         initializer=_init_worker, initargs=(num_threads,)) as executor:
+                    futures = {}
+                    for number, params in enumerate(trials):
+                        trial_id = f"trial_{number:03d}"
+                        weight_name = params.get("weight_name", self.model_trainer_config.weight_name)
+                        trial_config = self._trial_config(trial_id, params, weight_paths[weight_name], num_threads)
+                        future = executor.submit(run_trial, trial_id, params, trial_config,
+                                                 self.data_ingestion_artifact, self.data_sharding_artifact,
+                                                 config.metric, config.prune_warmup_epochs, config.prune_min_trials,
+                                                 reports, reports_lock)
+                        futures[future] = (trial_id, params)
+
+                    for future in as_completed(futures):
+                        trial_id, params = futures[future]
+                        try:
+                            result = future.result()
+                        except Exception as e: # The trial process died
+                            result = {"trial_id": trial_id, "params": params, "status": "failed", "epochs_run": 0,
+                                      "metric": None, "history": [], "train_seconds": 0.0,
+                                      "trained_model_file_path": None, "latency_ms": None, "error": str(e)}
+                        logging.info(f"{trial_id} {result['status']} after {result['epochs_run']} epochs: "
+                                     f"{config.metric}={result['metric']}")
+                        results.append(result)
+
+            # Latency is measured after training, one trial at a time on an idle CPU
+            image = self._latency_image()
+            for result in results:
+                if result["status"] == "completed":
+                    img_size = result["params"].get("img_size", self.model_trainer_config.img_size)
+                    result["latency_ms"] = self.measure_latency(result["trained_model_file_path"], img_size, image)
+
+            leaderboard = self.rank(results)
+            best = leaderboard[0] if leaderboard and leaderboard[0]["status"] == "completed" \
+                and leaderboard[0]["metric"] >= config.min_metric else None
+
+            os.makedirs(os.path.dirname(config.leaderboard_file_path), exist_ok=True)
+            tmp_path = f"{config.leaderboard_file_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"metric": config.metric,
+                           "min_metric": config.min_metric,
+                           "best_trial_id": best["trial_id"] if best else None,
+                           "sweep_config": asdict(config),
+                           "trials": leaderboard}, f, indent=2)
+            os.replace(tmp_path, config.leaderboard_file_path)
+
+            statuses = [result["status"] for result in results]
+            sweep_artifact = HyperparameterSweepArtifact(
+                leaderboard_file_path=config.leaderboard_file_path,
+                best_trial_id=best["trial_id"] if best else None,
+                best_model_file_path=best["trained_model_file_path"] if best else None,
+                trials_completed=statuses.count("completed"),
+                trials_pruned=statuses.count("pruned"),
+                trials_failed=statuses.count("failed")
+            )
+
+            logging.info("Exited initiate_sweep method of HyperparameterSweep class")
+            logging.info(f"Hyperparameter sweep artifact: {sweep_artifact}")
+
+            return sweep_artifact
+
+        except Exception as e:
+            raise AppException(e, sys)
@@ -0,0 +1,270 @@
+import os, sys
+import json
+import shutil
+import time
+from typing import List
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from fireSmoke.logger import logging
+from fireSmoke.exception import AppException
+from fireSmoke.constant.application import APP_DEPLOYMENT_RECORD
+from fireSmoke.constant.training_pipeline import DATA_VALIDATION_IMAGE_EXTENSIONS
+from fireSmoke.entity.config_entity import ModelOptimizerConfig
+from fireSmoke.entity.artifacts_entity import (DataIngestionArtifact,
+                                               ModelOptimizerArtifact,
+                                               ModelTrainerArtifact)
+from fireSmoke.inference.engine import InferenceEngine, export_model, measure_latency
+from fireSmoke.utils.main_utils import read_yaml_file, write_feature_store_data_yaml
+from fireSmoke.utils.shard_utils import letterbox
+
+
+class CalibrationImages:
+    """
+    onnxruntime CalibrationDataReader over validation images, preprocessed the way
+    ultralytics feeds the exported model: letterboxed, RGB, CHW and scaled to [0, 1].
+    """
+
+    def __init__(self, image_paths: List[str], img_size: int, input_name: str):
+        """
+        Constructor for the CalibrationImages class.
+
+        :param image_paths: Images used for calibration.
+        :param img_size: Model input size.
+        :param input_name: Name of the model's image input.
+        """
+        self.image_paths = image_paths
+        self.img_size = img_size
+        self.input_name = input_name
+        self._paths = iter(image_paths)
+
+
+    def get_next(self):
+        for path in self._paths:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            image = letterbox(image, self.img_size)[0][:, :, ::-1].transpose(2, 0, 1)
+            return {self.input_name: np.ascontiguousarray(image[None], dtype=np.float32) / 255.0}
+        return None
+
+
+    def rewind(self) -> None:
+        self._paths = iter(self.image_paths)
+
+
+class ModelOptimizer:
+    """
+    This class makes quantized variants of the trained model and picks the one to deploy.
+
+    The model is exported to ONNX (FP32) and quantized to INT8, with dynamic quantization
+    (activation ranges computed at run time) and with static quantization calibrated on a
+    sample of the validation split. Every variant is benchmarked for CPU latency and mask
+    mAP50-95 on the held-out split, and the fastest variant whose mAP is within the accuracy
+    budget of the FP32 model is recorded for deployment.
+    """
+
+    def __init__(self,
+                 model_optimizer_config: ModelOptimizerConfig,
+                 data_ingestion_artifact: DataIngestionArtifact,
+                 model_trainer_artifact: ModelTrainerArtifact):
+        """
+        Constructor for the ModelOptimizer class.
+
+        :param model_optimizer_config: Configuration of the variants, calibration and accuracy budget.
+        :param data_ingestion_artifact: Artifact pointing to the extracted feature store.
+        :param model_trainer_artifact: Artifact pointing to the trained best.pt.
+        """
+        self.model_optimizer_config = model_optimizer_config
+        self.data_ingestion_artifact = data_ingestion_artifact
+        self.model_trainer_artifact = model_trainer_artifact
+
+
+    def _split_images(self, data_config: dict, split: str) -> List[str]:
+        """
+        Sorted image paths of a split of the generated data.yaml.
+        """
+        split_dir = data_config.get(split)
+        if not split_dir or not os.path.isdir(split_dir):
+            return []
+        return sorted(os.path.join(split_dir, name) for name in os.listdir(split_dir)
+                      if name.lower().endswith(DATA_VALIDATION_IMAGE_EXTENSIONS))
+
+
+    def quantize(self, fp32_model_path: str, variant: str, calibration_paths: List[str]) -> str:
+        """
+        Writes an INT8 variant of the FP32 ONNX model next to it.
+
+        :param fp32_model_path: Path to the FP32 ONNX model.
+        :param variant: "int8_dynamic" or "int8_static".
+        :param calibration_paths: Validation images used to calibrate the static variant.
+        :return: Path to the quantized model.
+        :raises AppException: If the variant is unknown or quantization fails.
+        """
+        try:
+            from onnxruntime import InferenceSession
+            from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+            from onnxruntime.quantization.shape_inference import quant_pre_process
+
+            stem = os.path.splitext(fp32_model_path)[0]
+            output_path = f"{stem}_{variant}.onnx"
+
+            # Shape inference and graph cleanup give the quantizer more ops it can handle
+            source_path = f"{stem}_preprocessed.onnx"
+            try:
+                quant_pre_process(fp32_model_path, source_path, skip_symbolic_shape=True)
+            except Exception as e:
+                logging.info(f"Quantization pre-processing failed, quantizing the exported model: {e}")
+                source_path = fp32_model_path
+
+            if variant == "int8_dynamic":
+                quantize_dynamic(source_path, output_path, weight_type=QuantType.QUInt8)
+            elif variant == "int8_static":
+                if not calibration_paths:
+                    raise Exception("Static quantization needs calibration images, the validation split is empty")
+                input_name = InferenceSession(fp32_model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+                reader = CalibrationImages(calibration_paths, self.model_optimizer_config.img_size, input_name)
+                quantize_static(source_path, output_path, reader,
+                                quant_format=QuantFormat.QDQ,
+                                per_channel=True,
+                                activation_type=QuantType.QUInt8,
+                                weight_type=QuantType.QInt8)
+            else:
+                raise Exception(f"Unknown quantization variant {variant!r}")
+
+            logging.info(f"Quantized {fp32_model_path} to {output_path}")
+            return output_path
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def benchmark(self, model_path: str, data_yaml_path: str, split: str, image: np.ndarray) -> dict:
+        """
+        Measures the mask mAP and CPU latency of a model variant.
+
+        :param model_path: Path to the model variant.
+        :param data_yaml_path: data.yaml pointing at the feature store.
+        :param split: Held-out split the mAP is measured on.
+        :param image: Image the latency is measured on.
+        :return: Dict with the mask mAP50-95, mAP50 and latency in milliseconds.
+        """
+        img_size = self.model_optimizer_config.img_size
+        metrics = YOLO(model_path, task="segment").val(data=data_yaml_path, split=split, imgsz=img_size, batch=1,
+                                                        device="cpu", plots=False, verbose=False,
+                                                        project=os.path.join(self.model_optimizer_config.model_optimizer_dir, "val"),
+                                                        exist_ok=True)
+        engine = InferenceEngine(model_path, device="cpu", imgsz=img_size)
+        return {"map": round(float(metrics.seg.map), 5),
+                "map50": round(float(metrics.seg.map50), 5),
+                "latency_ms": measure_latency(engine, image, self.model_optimizer_config.latency_runs)}
+
+
+    def select(self, variants: dict) -> str:
+        """
+        Picks the fastest variant whose mAP is within the accuracy budget of the FP32 model.
+
+        :param variants: Benchmark results by variant name, including "fp32".
+        :return: Name of the variant to deploy.
+        """
+        floor = variants["fp32"]["map"] - self.model_optimizer_config.max_accuracy_drop
+        candidates = [name for name, result in variants.items() if result["map"] >= floor]
+        return min(candidates, key=lambda name: variants[name]["latency_ms"]["p50"])
+
+
+    def publish(self, record: dict) -> None:
+        """
+        Copies the deployed variant and its source weights next to the app weights and
+        writes the deployment record the detection pages load the model from.
+        """
+        app_weights_dir = os.path.dirname(APP_DEPLOYMENT_RECORD)
+        os.makedirs(app_weights_dir, exist_ok=True)
+        published = dict(record)
+        for key in ("deployment_model_file_path", "source_model_file_path"):
+            published[key] = os.path.join(app_weights_dir, os.path.basename(record[key]))
+            shutil.copy2(record[key], published[key])
+        tmp_path = f"{APP_DEPLOYMENT_RECORD}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(published, f, indent=2)
+        os.replace(tmp_path, APP_DEPLOYMENT_RECORD)
+        logging.info(f"Published {published['deployment_model_file_path']} for the detection pages")
+
+
+    def initiate_model_optimizer(self) -> ModelOptimizerArtifact:
+        """
+        Orchestrates the optimization of the trained model, including:
+        - Exporting best.pt to FP32 ONNX
+        - Quantizing it to the configured INT8 variants
+        - Benchmarking mAP and CPU latency of every variant on the held-out split
+        - Recording (and publishing) the fastest variant within the accuracy budget
+
+        :return: ModelOptimizerArtifact naming the deployed variant.
+        :raises AppException: If any step of the process fails.
+        """
+        logging.info("Entered initiate_model_optimizer method of ModelOptimizer class")
+
+        try:
+            config = self.model_optimizer_config
+            os.makedirs(config.model_optimizer_dir, exist_ok=True)
+
+            data_yaml_path = write_feature_store_data_yaml(self.data_ingestion_artifact.feature_store_path,
+                                                           config.data_yaml_file_path)
+            data_config = read_yaml_file(data_yaml_path)
+            split = "test" if self._split_images(data_config, "test") else "val"
+            calibration_paths = self._split_images(data_config, "val")[:config.calibration_images]
+            held_out_paths = self._split_images(data_config, split)
+            image = cv2.imread(held_out_paths[0]) if held_out_paths else None
+            if image is None:
+                image = np.full((config.img_size, config.img_size, 3), 114, dtype=np.uint8)
+
+            # Work on a copy of best.pt so the exports land in the optimizer directory
+            source_model_path = os.path.join(config.model_optimizer_dir,
+                                             os.path.basename(self.model_trainer_artifact.trained_model_file_path))
+            shutil.copy2(self.model_trainer_artifact.trained_model_file_path, source_model_path)
+            model_paths = {"fp32": export_model(source_model_path, formats=["onnx"], imgsz=config.img_size)["onnx"]}
+            for variant in config.variants:
+                try:
+                    model_paths[variant] = self.quantize(model_paths["fp32"], variant, calibration_paths)
+                except AppException as e:
+                    logging.warning(f"Skipping variant {variant}: {e}")
+
+            variants = {}
+            for name, model_path in model_paths.items():
+                variants[name] = {"model_file_path": model_path,
+                                  **self.benchmark(model_path, data_yaml_path, split, image)}
+                logging.info(f"Variant {name}: mask mAP50-95 {variants[name]['map']}, "
+                             f"p50 latency {variants[name]['latency_ms']['p50']} ms")
+
+            selected = self.select(variants)
+            record = {"variant": selected,
+                      "deployment_model_file_path": model_paths[selected],
+                      "source_model_file_path": source_model_path,
+                      "img_size": config.img_size,
+                      "held_out_split": split,
+                      "max_accuracy_drop": config.max_accuracy_drop,
+                      "variants": variants,
+                      "created": time.strftime("%Y-%m-%d %H:%M:%S")}
+            tmp_path = f"{config.deployment_record_file_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(record, f, indent=2)
+            os.replace(tmp_path, config.deployment_record_file_path)
+
+            if config.publish_model:
+                self.publish(record)
+
+            model_optimizer_artifact = ModelOptimizerArtifact(
+                deployment_model_file_path=model_paths[selected],
+                variant=selected,
+                deployment_record_file_path=config.deployment_record_file_path,
+                variants=variants
+            )
+
+            logging.info("Exited initiate_model_optimizer method of ModelOptimizer class")
+            logging.info(f"Model optimizer artifact: {model_optimizer_artifact}")
+
+            return model_optimizer_artifact
+
+        except Exception as e:
+            raise AppException(e, sys)
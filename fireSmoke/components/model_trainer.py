@@ -1,35 +1,65 @@
 import os, sys
+import shutil
+from typing import Callable, Dict, Optional
+from ultralytics import YOLO
 from fireSmoke.logger import logging
 from fireSmoke.exception import AppException
+from fireSmoke.constant.application import APP_MODEL_PATH
 from fireSmoke.entity.config_entity import ModelTrainerConfig
-from fireSmoke.entity.artifacts_entity import ModelTrainerArtifact
-from ultralytics import YOLO
+from fireSmoke.entity.artifacts_entity import (DataIngestionArtifact,
+                                               DataShardingArtifact,
+                                               ModelTrainerArtifact)
+from fireSmoke.inference.engine import export_model
+from fireSmoke.utils.main_utils import write_feature_store_data_yaml
+from fireSmoke.utils.shard_utils import ShardedSegmentationTrainer
 
 
 class ModelTrainer:
     """
     This class handles the training of the YOLO model for object detection.
-    It manages data preparation, model training, and cleanup processes.
+    It trains on the memory-mapped shards when they were built, or directly on the extracted
+    feature store otherwise, and saves and exports the best model.
     """
     
     def __init__(self, 
-                 model_trainer_config: ModelTrainerConfig):
+                 model_trainer_config: ModelTrainerConfig,
+                 data_ingestion_artifact: DataIngestionArtifact,
+                 data_sharding_artifact: Optional[DataShardingArtifact] = None,
+                 callbacks: Optional[Dict[str, Callable]] = None):
         """
         Constructor for the ModelTrainer class.
         
         :param model_trainer_config: Configuration object containing training parameters like
                                      weights, batch size, image size, and number of epochs.
+        :param data_ingestion_artifact: Artifact pointing to the extracted feature store.
+        :param data_sharding_artifact: Artifact pointing to the training shards; None trains on the feature store.
+        :param callbacks: Ultralytics trainer callbacks by event name, e.g. "on_fit_epoch_end", to follow progress.
         """
         self.model_trainer_config = model_trainer_config
+        self.data_ingestion_artifact = data_ingestion_artifact
+        self.data_sharding_artifact = data_sharding_artifact
+        self.callbacks = callbacks or {}
+        
+        
+    def prepare_data_yaml(self) -> str:
+        """
+        Writes a data.yaml whose splits point at the feature store with absolute paths,
+        so the extracted dataset is trained on in place instead of being copied.
+
+        :return: Path to the generated data.yaml.
+        :raises AppException: If the dataset's data.yaml is missing or lacks a required split.
+        """
+        return write_feature_store_data_yaml(self.data_ingestion_artifact.feature_store_path,
+                                             self.model_trainer_config.data_yaml_file_path)
         
         
     def initiate_model_trainer(self) -> ModelTrainerArtifact:
         """
         Orchestrates the entire model training process, including:
-        - Unzipping and preparing data
+        - Generating a data.yaml that points at the feature store, unless shards were built
         - Training the YOLO model
         - Saving the best-trained model
-        - Cleaning up temporary files
+        - Exporting it to ONNX/OpenVINO for CPU inference
 
         :return: ModelTrainerArtifact containing the path to the best-trained model.
         :raises AppException: If any step of the process fails.
@@ -37,47 +67,52 @@ class ModelTrainer:
         logging.info("Entered intiate_model_trainer method of ModelTrainer class")
         
         try:
-            # Unzipping and preparing data
-            logging.info("Unzipping data")
-            os.system("unzip data.zip -d yolo_seg_train")
-            os.system("rm data.zip")
-            
-            # Ensure the training directory exists
-            os.makedirs("yolo_seg_train", exist_ok=True)
+            model_trainer_dir = self.model_trainer_config.model_trainer_dir
+            os.makedirs(model_trainer_dir, exist_ok=True)
+            if self.data_sharding_artifact is not None:
+                data_yaml_path = self.data_sharding_artifact.data_yaml_file_path
+            else:
+                data_yaml_path = self.prepare_data_yaml()
             
-            # Path to the data.yaml which should be relative or configured externally
-            data_yaml_path = os.path.abspath("yolo_seg_train/data.yaml")
+            # Pre-trained weights are downloaded once into the trainer directory and reused
+            run_name = self.model_trainer_config.weight_name.split('.')[0]
+            runs_dir = os.path.abspath(self.model_trainer_config.runs_dir)
             
-            # Running the training process
-            os.system(f"cd yolo_seg_train && yolo task=segment mode=train \
-                    model={self.model_trainer_config.weight_name} \
-                    imgsz={self.model_trainer_config.img_size} \
-                    batch={self.model_trainer_config.batch_size} \
-                    epochs={self.model_trainer_config.no_epochs} \
-                    data={data_yaml_path} \
-                    name='{self.model_trainer_config.weight_name.split('.')[0]}'")
+            # Running the training process; the run directory is set explicitly rather than left to ultralytics.
+            # The trainer reads shard directories from memory maps and image folders as usual
+            model = YOLO(os.path.join(model_trainer_dir, self.model_trainer_config.weight_name))
+            for event, callback in self.callbacks.items():
+                model.add_callback(event, callback)
+            model.train(trainer=ShardedSegmentationTrainer,
+                        data=os.path.abspath(data_yaml_path),
+                        imgsz=self.model_trainer_config.img_size,
+                        batch=self.model_trainer_config.batch_size,
+                        epochs=self.model_trainer_config.no_epochs,
+                        workers=self.model_trainer_config.dataloader_workers,
+                        project=runs_dir,
+                        name=run_name,
+                        exist_ok=True)
             
-            # Path for saving the best model
-            best_model_path = f"yolo_seg_train/runs/detect/{self.model_trainer_config.weight_name.split('.')[0]}/weights/best.pt"
-            os.system(f"cp {best_model_path} yolo_seg_train/")
+            # Save the best model into the model trainer directory and next to the app weights
+            best_model_path = os.path.join(runs_dir, run_name, "weights", "best.pt")
+            trained_model_file_path = os.path.join(model_trainer_dir, "best.pt")
+            shutil.copy2(best_model_path, trained_model_file_path)
+            if self.model_trainer_config.publish_model:
+                app_weights_dir = os.path.dirname(APP_MODEL_PATH)
+                os.makedirs(app_weights_dir, exist_ok=True)
+                shutil.copy2(best_model_path, app_weights_dir)
             
-            # Ensure the model trainer directory exists and copy the best model
-            os.makedirs(self.model_trainer_config.model_trainer_dir, exist_ok=True)
-            os.system(f"cp {best_model_path} {self.model_trainer_config.model_trainer_dir}/")
-            
-            # Cleanup to remove unnecessary files and directories
-            os.system(f"rm -rf yolo_seg_train/{self.model_trainer_config.weight_name}")
-            os.system("rm -rf yolo_seg_train/runs") 
-            os.system("rm -rf yolo_seg_train/train")
-            os.system("rm -rf yolo_seg_train/test")
-            os.system("rm -rf yolo_seg_train/valid")
-            os.system("rm -rf yolo_seg_train/data.yaml")
-            os.system("rm -rf yolo_seg_train/README.dataset.txt")
-            os.system("rm -rf yolo_seg_train/README.roboflow.txt")
+            # Export the best model next to best.pt for CPU inference
+            exported_model_file_paths = export_model(
+                trained_model_file_path,
+                formats=self.model_trainer_config.export_formats,
+                imgsz=self.model_trainer_config.img_size
+            )
             
             # Creating artifact object for the trained model
             model_trainer_artifact = ModelTrainerArtifact(
-                trained_model_file_path=os.path.join(self.model_trainer_config.model_trainer_dir, "best.pt")
+                trained_model_file_path=trained_model_file_path,
+                exported_model_file_paths=exported_model_file_paths
             )
             
             logging.info("Exited initiate_model_trainer method of ModelTrainer class")
@@ -1,2 +1,120 @@
+import os
+
 APP_HOST = "0.0.0.0"
-APP_PORT = 8080
\ No newline at end of file
+APP_PORT = 8080
+
+# Weights used by the detection pages
+APP_MODEL_PATH = "yolo_seg_train/yolo12n-seg.pt"
+APP_DEPLOYMENT_RECORD = "yolo_seg_train/deployment.json" # Optimized model picked by the training pipeline for CPU
+APP_DEVICE = "auto" # "auto": CUDA when available, otherwise CPU
+
+# Inference engine: CPU thread count (0: runtime default) and exported-model handling
+INFERENCE_NUM_THREADS = 0
+INFERENCE_AUTO_EXPORT = True
+INFERENCE_EXPORT_FORMATS = ["onnx", "openvino"]
+
+# Model registry: number of models kept resident and warm-up input size
+MODEL_REGISTRY_MAX_MODELS = 2
+MODEL_WARMUP_IMG_SIZE = 640
+
+# Batched image detection
+BATCH_INFERENCE_SIZE = 8
+BATCH_DECODE_WORKERS = 4
+IMAGE_GRID_COLUMNS = 3
+IMAGE_GRID_PAGE_SIZE = 12
+
+# Headless batch inference
+BATCH_INFERENCE_DIR_NAME = "batch_inference"
+BATCH_INFERENCE_OUTPUT_FILE = "detections.jsonl"
+BATCH_INFERENCE_CHECKPOINT_EVERY = 200
+BATCH_INFERENCE_MASK_FORMAT = "rle" # "rle", "polygon" or None to leave masks out
+BATCH_INFERENCE_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# Live camera server
+SERVER_JPEG_QUALITY = 80
+
+# Multi-camera scheduling: frames per batch, post-processing threads, default FPS cap (0: unlimited)
+MULTI_CAMERA_CONFIG_FILE = "cameras.yaml"
+MULTI_CAMERA_BATCH_SIZE = 8
+MULTI_CAMERA_WORKERS = 4
+MULTI_CAMERA_MAX_FPS = 0
+MULTI_CAMERA_IDLE_WAIT = 0.005 # Seconds to wait when no camera has a new frame
+
+# Motion gate: reuse the previous detections while a fixed camera's scene is unchanged
+MOTION_GATE_ENABLED = True
+MOTION_GATE_WIDTH = 160 # Width of the grayscale comparison thumbnail
+MOTION_GATE_PIXEL_THRESHOLD = 12 # Gray-level difference for a pixel to count as changed
+MOTION_GATE_CHANGED_FRACTION = 0.005 # Changed-pixel fraction that triggers inference
+MOTION_GATE_MAX_SKIP = 15 # Inference runs at least every MOTION_GATE_MAX_SKIP + 1 frames
+
+# Keyframe mode (opt-in): the model runs every N frames and masks are carried over the frames in between
+KEYFRAME_ENABLED = False
+KEYFRAME_MIN_INTERVAL = 1 # N never goes below this (1: fast motion runs the model on every frame)
+KEYFRAME_MAX_INTERVAL = 6 # N on a still scene
+KEYFRAME_DRIFT_BUDGET = 3.0 # Scene motion (flow-frame pixels) allowed to build up between keyframes
+KEYFRAME_MIN_TRACK_QUALITY = 0.5 # Fraction of an instance's flow points that must survive, else a keyframe is forced
+KEYFRAME_POINTS_PER_TRACK = 40
+KEYFRAME_FLOW_WIDTH = 320 # Width of the grayscale frames the optical flow runs on
+
+# Tiled inference for high-resolution images (tiles match the engine input size)
+TILING_OVERLAP = 0.2 # Fraction of each tile shared with its neighbours
+TILING_MATCH_THRESHOLD = 0.5 # Intersection over the smaller box above which cross-tile detections merge
+TILING_LATENCY_BUDGET = 10.0 # Seconds per image; remaining tiles are skipped once exceeded
+
+# Result cache of the Image Detection page, keyed by image content, model and settings
+RESULT_CACHE_MEMORY_ENTRIES = 256 # Results kept in memory, least recently used evicted first
+RESULT_CACHE_DIR = os.path.join(os.environ.get("FIRESMOKE_CACHE_DIR",
+                                               os.path.join(os.path.expanduser("~"), ".cache", "fireSmoke")),
+                                "results")
+RESULT_CACHE_MAX_DISK_BYTES = 512 * 1024 * 1024 # Least recently used results are deleted above this size
+
+# Background training jobs started from the app
+TRAINING_JOB_POLL_INTERVAL = 2.0 # Seconds between refreshes of the job panel
+TRAINING_JOB_CANCEL_GRACE = 30.0 # Seconds a cancelled job gets to stop before its process is terminated
+
+# Inference benchmark suite (CPU-only, offline): stage timings compared against a stored baseline
+BENCHMARK_MODEL = "yolo11n-seg.yaml" # Architecture YAML (seeded random weights) or a local weight file
+BENCHMARK_DIR_NAME = "benchmark"
+BENCHMARK_OUTPUT_FILE = "benchmark.json"
+BENCHMARK_BASELINE_FILE = "benchmarks/baseline.json"
+BENCHMARK_FRAMES = 50
+BENCHMARK_WARMUP_FRAMES = 5
+BENCHMARK_FRAME_SIZE = (1280, 720) # (width, height) of the synthetic frames
+BENCHMARK_INSTANCES = 8 # Instances drawn per frame by the annotate stages
+BENCHMARK_TOLERANCE = 0.15 # Allowed slowdown of p50/p95 against the baseline
+BENCHMARK_SEED = 0
+
+# Per-stage latency instrumentation of the streaming path (capture ... display), per camera
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_WINDOW = 300 # Recent samples per camera and stage behind the rolling percentiles
+INSTRUMENTATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5) # Seconds
+INSTRUMENTATION_PANEL_EVERY = 30 # Frames between refreshes of the stats panel of the detection pages
+
+# Logging: written by a background thread to a size-rotated file per process under log/
+LOG_DIR_NAME = "log"
+LOG_FORMAT = os.environ.get("FIRESMOKE_LOG_FORMAT", "text") # "text" or "json" (JSON lines)
+LOG_MAX_BYTES = 10 * 1024 * 1024 # Size at which a log file is rotated
+LOG_BACKUP_COUNT = 3 # Rotated files kept per process
+LOG_MAX_FILES = 20 # Process log files kept in the log directory; older ones are deleted on start
+LOG_QUEUE_SIZE = 10000 # Records waiting for the writer thread; further records are dropped
+LOG_RATE_LIMIT_INTERVAL = 5.0 # Seconds between two messages of the same per-frame event
+LOG_STOP_TIMEOUT = 5.0 # Seconds to wait on exit for room in a full log queue
+
+# Import-time budget: cold-start import cost of the package entry points, measured with -X importtime
+IMPORT_TIME_TARGETS = ["fireSmoke.__main__", # CLI start-up
+                       "fireSmoke.entity.config_entity",
+                       "fireSmoke.utils.main_utils",
+                       "fireSmoke.pipeline.training_pipeline", # Training form of the detection page
+                       "fireSmoke.pipeline.training_jobs",
+                       "fireSmoke.inference.metrics",
+                       "fireSmoke.utils.page_imports", # Top-level imports of the detection page, run on every rerun
+                       "fireSmoke.inference.engine"] # Detection features: torch and ultralytics
+IMPORT_TIME_HEAVY_PACKAGES = ["torch", "ultralytics", "cv2", "supervision", "gdown", "onnxruntime", "openvino"]
+IMPORT_TIME_DIR_NAME = "import_time"
+IMPORT_TIME_OUTPUT_FILE = "import_time.json"
+IMPORT_TIME_BUDGET_FILE = "benchmarks/import_budget.json" # Packages each target must not load; committed
+IMPORT_TIME_LOCAL_BUDGET_FILE = "import_budget.json" # Time limits of this machine, written by --update-budget
+IMPORT_TIME_RUNS = 5 # Fresh interpreters per target; the median is compared against the budget
+IMPORT_TIME_HEADROOM = 0.5 # Budget written by --update-budget: measured time plus this fraction,
+IMPORT_TIME_MIN_HEADROOM_MS = 25.0 # but at least this many milliseconds so fast targets do not flake
+IMPORT_TIME_TOP_MODULES = 15 # Slowest modules listed per target
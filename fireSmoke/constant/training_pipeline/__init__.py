@@ -1,5 +1,9 @@
+import os
+
 ARTIFACTS_DIR: str = "artifacts" 
 
+STAGE_FINGERPRINT_FILE: str = "stage_fingerprint.json"
+
 """
 Data Ingestion related constant start with DATA_INGESTION VAR NAME
 """
@@ -9,6 +13,19 @@ DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 
 DATA_DOWNLOAD_DIR: str = "https://drive.google.com/file/d/14Ny3tUjzcDorsoUgXh3ebBAdx5qZyXQe/view?usp=sharing"
 
+DATA_INGESTION_ZIP_FILE_NAME: str = "data.zip"
+
+DATA_INGESTION_CACHE_DIR: str = os.environ.get("FIRESMOKE_CACHE_DIR",
+                                               os.path.join(os.path.expanduser("~"), ".cache", "fireSmoke"))
+
+DATA_INGESTION_DOWNLOAD_CHUNK_SIZE: int = 1 << 20
+
+DATA_INGESTION_DOWNLOAD_RETRIES: int = 3
+
+DATA_INGESTION_EXTRACT_WORKERS: int = 4
+
+DATA_INGESTION_EXTRACTED_MARKER: str = "feature_store.sha256"
+
 
 """
 Data Validation related constant end with DATA_VALIDATION VAR NAME
@@ -19,6 +36,32 @@ DATA_VALIDATION_STATUS_FILE = "status.txt"
 
 DATA_VALIDATION_ALL_REQUIRED_FILES = ["train", "test", "valid", "data.yaml"]
 
+DATA_VALIDATION_SPLITS = ["train", "valid", "test"]
+
+DATA_VALIDATION_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+DATA_VALIDATION_MANIFEST_FILE = "manifest.json"
+
+DATA_VALIDATION_WORKERS: int = os.cpu_count() or 1
+
+DATA_VALIDATION_MAX_INVALID_FRACTION: float = 0.01
+
+
+"""
+Data Sharding related constant start with DATA_SHARDING VAR NAME
+"""
+DATA_SHARDING_DIR_NAME: str = "data_sharding"
+
+DATA_SHARDING_ENABLED: bool = True
+
+DATA_SHARDING_IMAGES_PER_SHARD: int = 1024
+
+DATA_SHARDING_WORKERS: int = 4
+
+DATA_SHARDING_INDEX_FILE: str = "index.json"
+
+DATA_SHARDING_LABELS_FILE: str = "labels.npz"
+
 
 """
 Model Trainer related constant end with MODEL_TRAINER VAR NAME
@@ -31,4 +74,66 @@ MODEL_TRAINER_NO_EPOCHS: int = 1
 
 MODEL_TRAINER_BATCH_SIZE: int = 16
 
-MODEL_TRAINER_IMG_SIZE: int = 640
\ No newline at end of file
+MODEL_TRAINER_IMG_SIZE: int = 640
+
+MODEL_TRAINER_EXPORT_FORMATS: list = ["onnx", "openvino"]
+
+MODEL_TRAINER_DATA_YAML_NAME: str = "data.yaml"
+
+MODEL_TRAINER_RUNS_DIR_NAME: str = "runs"
+
+MODEL_TRAINER_DATALOADER_WORKERS: int = 8
+
+
+
+"""
+Model Optimizer related constant start with MODEL_OPTIMIZER VAR NAME
+"""
+MODEL_OPTIMIZER_DIR_NAME: str = "model_optimizer"
+
+MODEL_OPTIMIZER_ENABLED: bool = True
+
+MODEL_OPTIMIZER_VARIANTS: list = ["int8_dynamic", "int8_static"]
+
+MODEL_OPTIMIZER_CALIBRATION_IMAGES: int = 64
+
+MODEL_OPTIMIZER_MAX_ACCURACY_DROP: float = 0.01 # Mask mAP50-95 an INT8 variant may lose against FP32
+
+MODEL_OPTIMIZER_LATENCY_RUNS: int = 50
+
+MODEL_OPTIMIZER_DEPLOYMENT_FILE: str = "deployment.json"
+
+
+"""
+Hyperparameter Sweep related constant start with SWEEP VAR NAME
+"""
+SWEEP_DIR_NAME: str = "sweep"
+
+SWEEP_METHOD: str = "grid" # "grid" or "random"
+
+SWEEP_SEARCH_SPACE: dict = {
+    "weight_name": [MODEL_TRAINER_PRETRAINED_WEIGHT_NAME, "yolo11s-seg.pt"],
+    "img_size": [480, MODEL_TRAINER_IMG_SIZE],
+    "batch_size": [MODEL_TRAINER_BATCH_SIZE],
+    "no_epochs": [10],
+}
+
+SWEEP_MAX_TRIALS: int = 8
+
+SWEEP_WORKERS: int = 2
+
+SWEEP_SEED: int = 0
+
+SWEEP_METRIC: str = "metrics/mAP50-95(M)"
+
+SWEEP_MIN_METRIC: float = 0.0
+
+SWEEP_PRUNE_WARMUP_EPOCHS: int = 2
+
+SWEEP_PRUNE_MIN_TRIALS: int = 3
+
+SWEEP_LATENCY_RUNS: int = 20
+
+SWEEP_LEADERBOARD_FILE: str = "leaderboard.json"
+
+SWEEP_WEIGHTS_DIR_NAME: str = "weights"
\ No newline at end of file
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
 
 @dataclass
 class DataIngestionArtifact:
@@ -20,8 +21,29 @@ class DataValidationArtifact:
 
     Attributes:
     - validation_status: Boolean indicating whether the validation passed (True) or failed (False).
+    - manifest_file_path: Path to the per-file validation manifest.
+    - samples_checked: Number of image/label pairs in the dataset.
+    - invalid_samples: Number of image/label pairs that failed validation.
     """
     validation_status: bool
+    manifest_file_path: str = ""
+    samples_checked: int = 0
+    invalid_samples: int = 0
+    
+    
+@dataclass
+class DataShardingArtifact:
+    """
+    Artifact representing the outputs of the Data Sharding process.
+
+    Attributes:
+    - data_yaml_file_path: Path to the data.yaml whose splits point at the shard directories.
+    - split_dirs: Mapping of data.yaml split name to its shard directory.
+    - images_sharded: Number of images stored across all splits.
+    """
+    data_yaml_file_path: str
+    split_dirs: dict = field(default_factory=dict)
+    images_sharded: int = 0
     
     
 @dataclass
@@ -31,5 +53,91 @@ class ModelTrainerArtifact:
 
     Attributes:
     - trained_model_file_path: Path to the file containing the best-trained model.
+    - exported_model_file_paths: Mapping of export format to the exported model path.
+    """
+    trained_model_file_path: str
+    exported_model_file_paths: dict = field(default_factory=dict)
+    
+    
+@dataclass
+class ModelOptimizerArtifact:
+    """
+    Artifact representing the outputs of the Model Optimizer process.
+
+    Attributes:
+    - deployment_model_file_path: Path to the model variant selected for deployment.
+    - variant: Name of the selected variant ("fp32", "int8_dynamic" or "int8_static").
+    - deployment_record_file_path: Path to the JSON record of the selection.
+    - variants: Mask mAP, latency and path of every variant by name.
+    """
+    deployment_model_file_path: str
+    variant: str
+    deployment_record_file_path: str
+    variants: dict = field(default_factory=dict)
+    
+    
+@dataclass
+class HyperparameterSweepArtifact:
+    """
+    Artifact representing the outputs of a hyperparameter sweep.
+
+    Attributes:
+    - leaderboard_file_path: Path to the JSON leaderboard of all trials.
+    - best_trial_id: Fastest trial that reached the accuracy bar, None if no trial did.
+    - best_model_file_path: Path to best.pt of that trial.
+    - trials_completed: Number of trials trained to the end.
+    - trials_pruned: Number of trials stopped early for lagging behind.
+    - trials_failed: Number of trials that raised an error.
+    """
+    leaderboard_file_path: str
+    best_trial_id: Optional[str] = None
+    best_model_file_path: Optional[str] = None
+    trials_completed: int = 0
+    trials_pruned: int = 0
+    trials_failed: int = 0
+    
+    
+@dataclass
+class BatchInferenceArtifact:
+    """
+    Artifact representing the outputs of a headless batch inference run.
+
+    Attributes:
+    - output_file_path: Path to the JSONL file with one line of detections per frame.
+    - frames_processed: Number of frames processed in this run.
+    - frames_per_second: Throughput of this run.
+    """
+    output_file_path: str
+    frames_processed: int
+    frames_per_second: float
+    
+    
+@dataclass
+class BenchmarkArtifact:
+    """
+    Artifact representing the outputs of an inference benchmark run.
+
+    Attributes:
+    - output_file_path: Path to the JSON file with the timings.
+    - stages: p50/p95/p99/mean latency in milliseconds and frames/s per stage.
+    - regressions: Stages that got slower than the baseline allows; empty when none did.
+    """
+    output_file_path: str
+    stages: dict = field(default_factory=dict)
+    regressions: list = field(default_factory=list)
+
+
+
+@dataclass
+class ImportTimeArtifact:
+    """
+    Artifact representing the outputs of an import-time profile.
+
+    Attributes:
+    - output_file_path: Path to the JSON file with the profile.
+    - targets: Median import time, heavy packages loaded and slowest modules per target.
+    - regressions: Targets over their budget or loading a forbidden package; empty when none did.
     """
-    trained_model_file_path: str
\ No newline at end of file
+    output_file_path: str
+    targets: dict = field(default_factory=dict)
+    regressions: list = field(default_factory=list)
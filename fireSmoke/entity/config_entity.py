@@ -1,7 +1,38 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Optional
 from fireSmoke.constant.training_pipeline import *
+from fireSmoke.constant.application import (APP_DEVICE,
+                                            APP_MODEL_PATH,
+                                            BENCHMARK_BASELINE_FILE,
+                                            BENCHMARK_DIR_NAME,
+                                            BENCHMARK_FRAME_SIZE,
+                                            BENCHMARK_FRAMES,
+                                            BENCHMARK_INSTANCES,
+                                            BENCHMARK_MODEL,
+                                            BENCHMARK_OUTPUT_FILE,
+                                            BENCHMARK_SEED,
+                                            BENCHMARK_TOLERANCE,
+                                            BENCHMARK_WARMUP_FRAMES,
+                                            BATCH_DECODE_WORKERS,
+                                            BATCH_INFERENCE_CHECKPOINT_EVERY,
+                                            BATCH_INFERENCE_DIR_NAME,
+                                            BATCH_INFERENCE_MASK_FORMAT,
+                                            BATCH_INFERENCE_OUTPUT_FILE,
+                                            BATCH_INFERENCE_SIZE,
+                                            IMPORT_TIME_BUDGET_FILE,
+                                            IMPORT_TIME_DIR_NAME,
+                                            IMPORT_TIME_HEADROOM,
+                                            IMPORT_TIME_LOCAL_BUDGET_FILE,
+                                            IMPORT_TIME_MIN_HEADROOM_MS,
+                                            IMPORT_TIME_OUTPUT_FILE,
+                                            IMPORT_TIME_RUNS,
+                                            IMPORT_TIME_TARGETS,
+                                            IMPORT_TIME_TOP_MODULES,
+                                            INFERENCE_NUM_THREADS,
+                                            MODEL_WARMUP_IMG_SIZE,
+                                            SERVER_JPEG_QUALITY)
 
 
 @dataclass
@@ -28,8 +59,12 @@ class DataIngestionConfig:
     - data_ingestion_dir: Directory to store data ingestion artifacts.
     - feature_store_file_path: Path to the feature store where processed data is stored.
     - data_download_url: URL to download the dataset.
+    - cache_dir: Content-addressed download cache shared by all runs.
+    - download_chunk_size: Bytes fetched per chunk when downloading.
+    - download_retries: Attempts before a download is given up.
+    - extract_workers: Number of threads extracting the archive.
     """
-    data_ingestion_dir  = os.path.join(
+    data_ingestion_dir: str = os.path.join(
         training_pipeline_config.artifacts_dir,
         DATA_INGESTION_DIR_NAME
     )
@@ -40,6 +75,14 @@ class DataIngestionConfig:
     )
     
     data_download_url: str = DATA_DOWNLOAD_DIR
+
+    cache_dir: str = field(default=DATA_INGESTION_CACHE_DIR, metadata={"fingerprint": False})
+
+    download_chunk_size: int = field(default=DATA_INGESTION_DOWNLOAD_CHUNK_SIZE, metadata={"fingerprint": False})
+
+    download_retries: int = field(default=DATA_INGESTION_DOWNLOAD_RETRIES, metadata={"fingerprint": False})
+
+    extract_workers: int = field(default=DATA_INGESTION_EXTRACT_WORKERS, metadata={"fingerprint": False})
     
 
 @dataclass
@@ -51,6 +94,11 @@ class DataValidationConfig:
     - data_validation_dir: Directory to store data validation artifacts.
     - valid_status_file_dir: Path to the file containing validation status.
     - required_file_list: List of files required for data validation.
+    - splits: Dataset splits whose image/label pairs are checked.
+    - image_extensions: File extensions treated as images.
+    - manifest_file_path: Path to the per-file validation manifest reused across runs.
+    - workers: Number of validation processes.
+    - max_invalid_fraction: Largest fraction of invalid samples that still passes validation.
     """
     data_validation_dir: str = os.path.join(
         training_pipeline_config.artifacts_dir,
@@ -59,7 +107,46 @@ class DataValidationConfig:
     
     valid_status_file_dir: str = os.path.join(data_validation_dir, DATA_VALIDATION_STATUS_FILE)
     
-    required_file_list = DATA_VALIDATION_ALL_REQUIRED_FILES
+    required_file_list: list = field(default_factory=lambda: list(DATA_VALIDATION_ALL_REQUIRED_FILES))
+
+    splits: list = field(default_factory=lambda: list(DATA_VALIDATION_SPLITS))
+
+    image_extensions: tuple = DATA_VALIDATION_IMAGE_EXTENSIONS
+
+    manifest_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_MANIFEST_FILE)
+
+    workers: int = field(default=DATA_VALIDATION_WORKERS, metadata={"fingerprint": False})
+
+    max_invalid_fraction: float = DATA_VALIDATION_MAX_INVALID_FRACTION
+    
+    
+@dataclass
+class DataShardingConfig:
+    """
+    Configuration for converting the feature store into memory-mapped training shards.
+
+    Attributes:
+    - data_sharding_dir: Directory to store the shards of every split.
+    - enabled: Whether the pipeline trains from shards instead of the JPEG files.
+    - img_size: Size images are letterboxed to; matches the training image size.
+    - images_per_shard: Number of images stored in one shard file.
+    - workers: Number of threads decoding and resizing images.
+    - data_yaml_file_path: data.yaml whose splits point at the shard directories.
+    """
+    data_sharding_dir: str = os.path.join(
+        training_pipeline_config.artifacts_dir,
+        DATA_SHARDING_DIR_NAME
+    )
+
+    enabled: bool = DATA_SHARDING_ENABLED
+
+    img_size: int = MODEL_TRAINER_IMG_SIZE
+
+    images_per_shard: int = DATA_SHARDING_IMAGES_PER_SHARD
+
+    workers: int = field(default=DATA_SHARDING_WORKERS, metadata={"fingerprint": False})
+
+    data_yaml_file_path: str = os.path.join(data_sharding_dir, MODEL_TRAINER_DATA_YAML_NAME)
     
     
 @dataclass
@@ -72,16 +159,261 @@ class ModelTrainerConfig:
     - weight_name: Name of the pre-trained weights to be used for training.
     - no_epochs: Number of epochs for model training.
     - batch_size: Batch size for model training.
+    - img_size: Image size for model training and export.
+    - export_formats: Formats the trained model is exported to next to best.pt.
+    - data_yaml_file_path: Generated data.yaml pointing at the feature store.
+    - runs_dir: Directory the training runs are written to.
+    - dataloader_workers: Number of dataloader worker processes.
+    - publish_model: Whether best.pt is also copied next to the app weights.
     """
     model_trainer_dir: str = os.path.join(
         training_pipeline_config.artifacts_dir,
         MODEL_TRAINER_DIR_NAME
     )
     
-    weight_name = MODEL_TRAINER_PRETRAINED_WEIGHT_NAME
+    weight_name: str = MODEL_TRAINER_PRETRAINED_WEIGHT_NAME
+    
+    no_epochs: int = MODEL_TRAINER_NO_EPOCHS
+    
+    batch_size: int = MODEL_TRAINER_BATCH_SIZE
+    
+    img_size: int = MODEL_TRAINER_IMG_SIZE
+    
+    export_formats: list = field(default_factory=lambda: list(MODEL_TRAINER_EXPORT_FORMATS))
+    
+    data_yaml_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_DATA_YAML_NAME)
+    
+    runs_dir: str = os.path.join(model_trainer_dir, MODEL_TRAINER_RUNS_DIR_NAME)
+    
+    dataloader_workers: int = field(default=MODEL_TRAINER_DATALOADER_WORKERS, metadata={"fingerprint": False})
+    
+    publish_model: bool = True
+    
+    
+@dataclass
+class ModelOptimizerConfig:
+    """
+    Configuration for the post-training quantization of the trained model.
+
+    Attributes:
+    - model_optimizer_dir: Directory to store the model variants and their benchmark.
+    - enabled: Whether the pipeline quantizes the trained model.
+    - variants: INT8 variants made next to the FP32 ONNX model ("int8_dynamic", "int8_static").
+    - img_size: Image size the variants are exported, calibrated and benchmarked at.
+    - calibration_images: Number of validation images used to calibrate static quantization.
+    - max_accuracy_drop: Mask mAP50-95 a variant may lose against FP32 and still be deployed.
+    - latency_runs: Timed CPU inferences per variant.
+    - data_yaml_file_path: Generated data.yaml pointing at the feature store, used for evaluation.
+    - deployment_record_file_path: JSON record naming the deployed variant and the benchmark of all variants.
+    - publish_model: Whether the deployed variant is also copied next to the app weights.
+    """
+    model_optimizer_dir: str = os.path.join(
+        training_pipeline_config.artifacts_dir,
+        MODEL_OPTIMIZER_DIR_NAME
+    )
+    
+    enabled: bool = MODEL_OPTIMIZER_ENABLED
+    
+    variants: list = field(default_factory=lambda: list(MODEL_OPTIMIZER_VARIANTS))
+    
+    img_size: int = MODEL_TRAINER_IMG_SIZE
+    
+    calibration_images: int = MODEL_OPTIMIZER_CALIBRATION_IMAGES
+    
+    max_accuracy_drop: float = MODEL_OPTIMIZER_MAX_ACCURACY_DROP
+    
+    latency_runs: int = field(default=MODEL_OPTIMIZER_LATENCY_RUNS, metadata={"fingerprint": False})
+    
+    data_yaml_file_path: str = os.path.join(model_optimizer_dir, MODEL_TRAINER_DATA_YAML_NAME)
+    
+    deployment_record_file_path: str = os.path.join(model_optimizer_dir, MODEL_OPTIMIZER_DEPLOYMENT_FILE)
+    
+    publish_model: bool = True
+    
+    
+@dataclass
+class HyperparameterSweepConfig:
+    """
+    Configuration for the hyperparameter sweep over ModelTrainer settings.
+
+    Attributes:
+    - sweep_dir: Directory holding one sub-directory per trial and the leaderboard.
+    - method: "grid" runs every combination of the search space, "random" samples from it.
+    - search_space: Candidate values per ModelTrainerConfig setting
+                    (weight_name, img_size, batch_size, no_epochs).
+    - max_trials: Maximum number of trials.
+    - workers: Number of trials trained concurrently; the CPU threads are split between them.
+    - seed: Seed of the random search.
+    - metric: Validation metric trials are compared on.
+    - min_metric: Accuracy bar; trials reaching it are ranked by inference latency.
+    - prune_warmup_epochs: Epochs a trial runs before it can be pruned.
+    - prune_min_trials: Trials that must have reported an epoch before it is used for pruning.
+    - latency_runs: Timed CPU inferences per trial.
+    - leaderboard_file_path: JSON file the ranked trials are written to.
+    """
+    sweep_dir: str = os.path.join(
+        training_pipeline_config.artifacts_dir,
+        SWEEP_DIR_NAME
+    )
+    
+    method: str = SWEEP_METHOD
+    
+    search_space: dict = field(default_factory=lambda: {name: list(values) for name, values in SWEEP_SEARCH_SPACE.items()})
+    
+    max_trials: int = SWEEP_MAX_TRIALS
+    
+    workers: int = SWEEP_WORKERS
+    
+    seed: int = SWEEP_SEED
+    
+    metric: str = SWEEP_METRIC
+    
+    min_metric: float = SWEEP_MIN_METRIC
+    
+    prune_warmup_epochs: int = SWEEP_PRUNE_WARMUP_EPOCHS
+    
+    prune_min_trials: int = SWEEP_PRUNE_MIN_TRIALS
+    
+    latency_runs: int = SWEEP_LATENCY_RUNS
+    
+    leaderboard_file_path: str = os.path.join(sweep_dir, SWEEP_LEADERBOARD_FILE)
+    
+    
+@dataclass
+class BatchInferenceConfig:
+    """
+    Configuration for headless batch inference over an image folder or a video file.
+
+    Attributes:
+    - source: Folder of images or path to a video file.
+    - output_file_path: JSONL file the detections are written to.
+    - weight_path: Model weights used for inference.
+    - device: Inference device; "auto" picks CUDA when available.
+    - conf: Confidence threshold.
+    - frame_stride: Process every n-th image or video frame.
+    - batch_size: Number of frames per inference batch.
+    - workers: Number of image decode threads.
+    - checkpoint_every: Number of processed frames between checkpoints.
+    - mask_format: Encoding of the masks in the output ("rle", "polygon" or None).
+    """
+    source: str
+    
+    output_file_path: str = os.path.join(
+        training_pipeline_config.artifacts_dir,
+        BATCH_INFERENCE_DIR_NAME,
+        BATCH_INFERENCE_OUTPUT_FILE
+    )
+    
+    weight_path: str = APP_MODEL_PATH
+    
+    device: str = APP_DEVICE
+    
+    conf: float = 0.25
+    
+    frame_stride: int = 1
+    
+    batch_size: int = BATCH_INFERENCE_SIZE
+    
+    workers: int = BATCH_DECODE_WORKERS
+    
+    checkpoint_every: int = BATCH_INFERENCE_CHECKPOINT_EVERY
+    
+    mask_format: str = BATCH_INFERENCE_MASK_FORMAT
+    
+    
+@dataclass
+class BenchmarkConfig:
+    """
+    Configuration for the end-to-end inference benchmark.
+
+    Attributes:
+    - model: Architecture YAML (built with seeded random weights) or a local weight file.
+    - source: Folder of images or video file with recorded frames; None uses synthetic frames.
+    - output_file_path: JSON file the timings are written to.
+    - baseline_file_path: JSON file with the timings the run is compared against.
+    - frames: Number of timed frames.
+    - warmup_frames: Untimed frames run first.
+    - frame_size: (width, height) of the synthetic frames.
+    - imgsz: Inference image size.
+    - device: Inference device.
+    - num_threads: CPU threads used for inference; 0 keeps the runtime default.
+    - conf: Confidence threshold.
+    - instances: Instances drawn per frame by the annotate stages.
+    - jpeg_quality: Quality of the encode stage.
+    - tolerance: Allowed relative slowdown of p50/p95 against the baseline.
+    - seed: Seed of the synthetic frames and of the random model weights.
+    """
+    model: str = BENCHMARK_MODEL
+    
+    source: Optional[str] = None
+    
+    output_file_path: str = os.path.join(
+        training_pipeline_config.artifacts_dir,
+        BENCHMARK_DIR_NAME,
+        BENCHMARK_OUTPUT_FILE
+    )
+    
+    baseline_file_path: str = BENCHMARK_BASELINE_FILE
+    
+    frames: int = BENCHMARK_FRAMES
+    
+    warmup_frames: int = BENCHMARK_WARMUP_FRAMES
+    
+    frame_size: tuple = BENCHMARK_FRAME_SIZE
+    
+    imgsz: int = MODEL_WARMUP_IMG_SIZE
+    
+    device: str = "cpu"
+    
+    num_threads: int = INFERENCE_NUM_THREADS
+    
+    conf: float = 0.25
+    
+    instances: int = BENCHMARK_INSTANCES
+    
+    jpeg_quality: int = SERVER_JPEG_QUALITY
+    
+    tolerance: float = BENCHMARK_TOLERANCE
+    
+    seed: int = BENCHMARK_SEED
+
+
+
+@dataclass
+class ImportTimeConfig:
+    """
+    Configuration for the import-time profile of the package entry points.
+
+    Attributes:
+    - targets: Modules imported, each in fresh interpreters.
+    - output_file_path: JSON file the profile is written to.
+    - budget_file_path: JSON file with the packages each target must not load; shared by every machine.
+    - local_budget_file_path: JSON file with the time limit of each target, measured on this machine.
+    - runs: Fresh interpreters per target; the median is reported.
+    - headroom: Fraction added to the measured time when the budget is updated.
+    - min_headroom_ms: Minimum milliseconds added to the measured time when the budget is updated.
+    - top_modules: Number of slowest modules listed per target.
+    """
+    targets: list = field(default_factory=lambda: list(IMPORT_TIME_TARGETS))
+    
+    output_file_path: str = os.path.join(
+        training_pipeline_config.artifacts_dir,
+        IMPORT_TIME_DIR_NAME,
+        IMPORT_TIME_OUTPUT_FILE
+    )
+    
+    budget_file_path: str = IMPORT_TIME_BUDGET_FILE
+    
+    local_budget_file_path: str = os.path.join(
+        training_pipeline_config.artifacts_dir,
+        IMPORT_TIME_DIR_NAME,
+        IMPORT_TIME_LOCAL_BUDGET_FILE
+    )
+    
+    runs: int = IMPORT_TIME_RUNS
     
-    no_epochs = MODEL_TRAINER_NO_EPOCHS
+    headroom: float = IMPORT_TIME_HEADROOM
     
-    batch_size = MODEL_TRAINER_BATCH_SIZE
+    min_headroom_ms: float = IMPORT_TIME_MIN_HEADROOM_MS
     
-    img_size = MODEL_TRAINER_IMG_SIZE
\ No newline at end of file
+    top_modules: int = IMPORT_TIME_TOP_MODULES
@@ -0,0 +1,138 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from fireSmoke.inference.detections import FrameDetections
+
+
+# BGR colours assigned to class ids in order
+DEFAULT_PALETTE = np.array([
+    (0, 99, 255),    # orange
+    (160, 160, 160), # gray
+    (52, 25, 48),
+    (0, 215, 255),
+    (255, 144, 30),
+    (113, 179, 60),
+    (180, 105, 255),
+    (0, 0, 200),
+], dtype=np.uint8)
+
+
+class FrameAnnotator:
+    """
+    Draws masks, boxes and labels onto frames.
+
+    All masks are blended in one vectorised composite: the top-most instance at each
+    pixel is resolved with a single reduction over the mask stack, coloured through a
+    palette lookup table and alpha-blended with one cv2.addWeighted. The overlay buffer
+    is reused across frames and the frame is drawn on in place.
+    """
+
+    def __init__(self,
+                 names: Optional[dict] = None,
+                 palette: np.ndarray = DEFAULT_PALETTE,
+                 mask_alpha: float = 0.45,
+                 thickness: int = 2,
+                 font_scale: float = 0.6):
+        """
+        Constructor for the FrameAnnotator class.
+
+        :param names: Class id to class name mapping; defaults to the names carried by the detections.
+        :param palette: BGR colours indexed by class id (modulo the palette size).
+        :param mask_alpha: Opacity of the mask overlay.
+        :param thickness: Box line thickness.
+        :param font_scale: Label font scale.
+        """
+        self.names = names
+        self.palette = np.asarray(palette, dtype=np.uint8)
+        self.mask_alpha = mask_alpha
+        self.thickness = thickness
+        self.font_scale = font_scale
+        self._overlay: Optional[np.ndarray] = None
+
+
+    def _colors(self, class_id: np.ndarray) -> np.ndarray:
+        return self.palette[np.asarray(class_id, dtype=int) % len(self.palette)]
+
+
+    def draw_masks(self, frame: np.ndarray, detections: FrameDetections) -> np.ndarray:
+        """
+        Blends every instance mask into the frame in one composite.
+
+        :param frame: BGR frame, modified in place.
+        :param detections: Detections with masks at frame resolution.
+        :return: The annotated frame.
+        """
+        masks = detections.masks
+        if masks is None or len(masks) == 0:
+            return frame
+
+        # Label map of the top-most (last) instance per pixel; 0 means background.
+        # The uint8 label map caps the composite at 255 instances.
+        masks = masks[:255]
+        labels = np.arange(1, len(masks) + 1, dtype=np.uint8)[:, None, None]
+        label_map = (masks.view(np.uint8) * labels).max(axis=0)
+
+        lut = np.zeros((256, 1, 3), dtype=np.uint8)
+        lut[1:len(masks) + 1, 0] = self._colors(detections.class_id[:len(masks)])
+
+        if self._overlay is None or self._overlay.shape != frame.shape:
+            self._overlay = np.empty_like(frame)
+        cv2.LUT(cv2.merge([label_map, label_map, label_map]), lut, dst=self._overlay)
+        cv2.addWeighted(self._overlay, self.mask_alpha, frame, 1 - self.mask_alpha, 0, dst=self._overlay)
+        cv2.copyTo(self._overlay, label_map, frame)
+        return frame
+
+
+    def draw_boxes(self, frame: np.ndarray, detections: FrameDetections) -> np.ndarray:
+        """
+        Draws boxes and "<class> <conf>" labels from arrays already on the host.
+
+        :param frame: BGR frame, modified in place.
+        :param detections: Detections to draw.
+        :return: The annotated frame.
+        """
+        if len(detections) == 0:
+            return frame
+
+        names = self.names or detections.names
+        boxes = np.round(detections.xyxy).astype(int)
+        colors = self._colors(detections.class_id).tolist()
+        confidences = np.ceil(detections.confidence * 100) / 100
+
+        for (x1, y1, x2, y2), class_id, conf, color in zip(boxes.tolist(), detections.class_id.tolist(),
+                                                           confidences.tolist(), colors):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, self.thickness)
+
+            label = f"{names.get(class_id, class_id)} {conf:.2f}"
+            (text_w, text_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, 1)
+            top = max(text_h + baseline, y1)
+            cv2.rectangle(frame, (x1, top - text_h - baseline), (x1 + text_w + 4, top), color, cv2.FILLED)
+            cv2.putText(frame, label, (x1 + 2, top - baseline), cv2.FONT_HERSHEY_SIMPLEX,
+                        self.font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+        return frame
+
+
+    def annotate(self, frame: np.ndarray, detections: FrameDetections, copy: bool = False) -> np.ndarray:
+        """
+        Draws masks, boxes and labels.
+
+        :param frame: BGR frame.
+        :param detections: Detections at the frame's resolution.
+        :param copy: Draw on a copy instead of the frame itself.
+        :return: The annotated frame.
+        """
+        if copy:
+            frame = frame.copy()
+        self.draw_masks(frame, detections)
+        self.draw_boxes(frame, detections)
+        return frame
+
+
+def draw_fps(frame: np.ndarray, fps: float) -> np.ndarray:
+    """
+    Writes the FPS value in the top-left corner of the frame.
+    """
+    cv2.putText(frame, f"FPS: {int(fps)}", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    return frame
@@ -0,0 +1,235 @@
+import io
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from fireSmoke.constant.application import (BATCH_DECODE_WORKERS,
+                                            BATCH_INFERENCE_SIZE)
+from fireSmoke.exception import AppException
+from fireSmoke.inference.detections import FrameDetections
+from fireSmoke.logger import logging
+
+
+@dataclass
+class LetterboxedImage:
+    """
+    An image resized and padded to the square model input size.
+
+    Attributes:
+    - name: Name of the source file.
+    - image: Letterboxed BGR image of shape (imgsz, imgsz, 3).
+    - original_shape: (height, width) of the decoded source image.
+    - scale: Resize factor applied to the source image.
+    - pad: (left, top) padding added around the resized image.
+    - content_shape: (height, width) of the resized image inside the padding.
+    """
+    name: str
+    image: np.ndarray
+    original_shape: Tuple[int, int]
+    scale: float
+    pad: Tuple[int, int]
+    content_shape: Tuple[int, int]
+
+
+    def crop(self, image: np.ndarray) -> np.ndarray:
+        """
+        Removes the letterbox padding from an image with the same layout (e.g. an annotated copy).
+        """
+        left, top = self.pad
+        height, width = self.content_shape
+        return image[top:top + height, left:left + width]
+
+
+    def restore(self, detections: FrameDetections) -> FrameDetections:
+        """
+        Maps detections made on the letterboxed image back to the original image.
+
+        :param detections: Detections in letterboxed image coordinates.
+        :return: Detections in original image coordinates.
+        """
+        left, top = self.pad
+        height, width = self.original_shape
+        xyxy = (detections.xyxy - np.array([left, top, left, top], dtype=np.float32)) / self.scale
+        xyxy = np.clip(xyxy, 0, [width, height, width, height]).astype(np.float32)
+
+        masks = detections.masks
+        if masks is not None and len(masks):
+            content = np.ascontiguousarray(self.crop(masks.transpose(1, 2, 0)).astype(np.uint8))
+            masks = cv2.resize(content, (width, height), interpolation=cv2.INTER_NEAREST)
+            masks = masks.reshape(height, width, -1).transpose(2, 0, 1).astype(bool)
+
+        return FrameDetections(xyxy=xyxy, confidence=detections.confidence, class_id=detections.class_id,
+                               tracker_id=detections.tracker_id, masks=masks, names=detections.names,
+                               orig_shape=(height, width))
+
+
+@dataclass
+class BatchResult:
+    """
+    Results of one inference batch.
+
+    Attributes:
+    - index: Position of the batch in the run.
+    - images: Letterboxed inputs of the batch.
+    - results: ultralytics Results, one per image.
+    - seconds: Inference time of the batch.
+    - failed: (name, error) of the inputs since the previous batch that could not be decoded.
+    """
+    index: int
+    images: List[LetterboxedImage]
+    results: list
+    seconds: float
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+
+    @property
+    def images_per_second(self) -> float:
+        return len(self.images) / self.seconds if self.seconds > 0 else 0.0
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """
+    Decodes encoded image bytes into an upright BGR array.
+
+    :param data: Encoded image (jpg, png, ...).
+    :return: BGR image with EXIF orientation applied.
+    """
+    pil_img = Image.open(io.BytesIO(data))
+    pil_img = ImageOps.exif_transpose(pil_img)
+    return np.ascontiguousarray(np.asarray(pil_img.convert("RGB"))[:, :, ::-1])
+
+
+def letterbox(image: np.ndarray, imgsz: int, name: str = "") -> LetterboxedImage:
+    """
+    Resizes an image to fit in a square of `imgsz` and pads the rest with gray.
+
+    :param image: BGR image.
+    :param imgsz: Side of the square model input.
+    :param name: Name of the source file.
+    :return: LetterboxedImage with the transform needed to undo the padding.
+    """
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_h, new_w = max(1, round(height * scale)), max(1, round(width * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    padded = cv2.copyMakeBorder(resized, top, imgsz - new_h - top, left, imgsz - new_w - left,
+                                cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return LetterboxedImage(name=name, image=padded, original_shape=(height, width), scale=scale,
+                            pad=(left, top), content_shape=(new_h, new_w))
+
+
+def _prepare(item: Tuple[str, bytes], imgsz: int) -> Tuple[str, Optional[LetterboxedImage], str]:
+    name, data = item
+    # A corrupt upload must not abort the other images of the run
+    try:
+        return name, letterbox(decode_image(data), imgsz, name=name), ""
+    except Exception as e:
+        logging.warning(f"Skipping unreadable image {name}: {e}")
+        return name, None, str(e)
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """
+    Groups an iterable into lists of at most `batch_size` items.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BatchDetector:
+    """
+    Runs detection over many images in fixed-size batches.
+
+    Decoding and letterboxing run in a thread pool ahead of inference, so the model
+    always receives full batches of same-shape inputs while the next batch is prepared.
+    Read-ahead is bounded to a few batches, and images that cannot be decoded are reported
+    with the batch that follows them instead of stopping the run.
+    """
+
+    def __init__(self,
+                 engine,
+                 batch_size: int = BATCH_INFERENCE_SIZE,
+                 workers: int = BATCH_DECODE_WORKERS,
+                 conf: float = 0.25):
+        """
+        Constructor for the BatchDetector class.
+
+        :param engine: InferenceEngine used for prediction.
+        :param batch_size: Number of images per inference batch.
+        :param workers: Number of decode/letterbox threads.
+        :param conf: Confidence threshold.
+        """
+        self.engine = engine
+        self.batch_size = batch_size
+        self.workers = workers
+        self.conf = conf
+
+
+    def _prepared(self, files: Iterable[Tuple[str, bytes]]) -> Iterator[Tuple[str, Optional[LetterboxedImage], str]]:
+        """
+        Decodes and letterboxes the inputs in a thread pool with bounded read-ahead.
+
+        :param files: (name, encoded bytes) pairs.
+        :yield: (name, letterboxed image, error) in input order; the image is None for inputs that cannot be decoded.
+        """
+        depth = self.workers * self.batch_size
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for item in files:
+                pending.append(executor.submit(_prepare, item, self.engine.imgsz))
+                if len(pending) >= depth:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+    def _infer(self, index: int, batch: List[LetterboxedImage], failed: List[Tuple[str, str]]) -> BatchResult:
+        start = time.perf_counter()
+        results = self.engine.predict([item.image for item in batch], conf=self.conf) if batch else []
+        batch_result = BatchResult(index=index, images=batch, results=results,
+                                   seconds=time.perf_counter() - start, failed=failed)
+        logging.info(f"Batch {index}: {len(batch)} images at {batch_result.images_per_second:.1f} images/s"
+                     + (f", {len(failed)} unreadable" if failed else ""))
+        return batch_result
+
+
+    def run(self, files: Iterable[Tuple[str, bytes]]) -> Iterator[BatchResult]:
+        """
+        Detects objects in a list of encoded images.
+
+        :param files: (name, encoded bytes) pairs.
+        :yield: BatchResult for each batch, in input order. The last one may hold no images,
+                only inputs that could not be decoded.
+        :raises AppException: If inference fails.
+        """
+        try:
+            index, batch, failed = 0, [], []
+            for name, image, error in self._prepared(files):
+                if image is None:
+                    failed.append((name, error))
+                    continue
+                batch.append(image)
+                if len(batch) == self.batch_size:
+                    yield self._infer(index, batch, failed)
+                    index, batch, failed = index + 1, [], []
+
+            if batch or failed:
+                yield self._infer(index, batch, failed)
+
+        except Exception as e:
+            raise AppException(e, sys)
@@ -0,0 +1,205 @@
+import sys
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from fireSmoke.exception import AppException
+from fireSmoke.inference.metrics import get_stage_metrics
+from fireSmoke.logger import log_throttled, logging
+
+
+def open_video_capture(source: Union[int, str],
+                       width: Optional[int] = None,
+                       height: Optional[int] = None,
+                       fps: Optional[int] = None,
+                       fourcc: Optional[int] = None,
+                       buffer_size: Optional[int] = None) -> cv2.VideoCapture:
+    """
+    Opens a cv2.VideoCapture with the backend and properties used across the app.
+
+    :param source: Video source (integer for webcam or string for IP camera / file).
+    :param width: Requested frame width.
+    :param height: Requested frame height.
+    :param fps: Requested frame rate.
+    :param fourcc: 4-character code of the capture codec.
+    :param buffer_size: Size of the backend frame buffer.
+    :return: The opened cv2.VideoCapture.
+    """
+    # CAP_DSHOW: To specify video source, 0: Default camera; 1 and later: External camera
+    cap = cv2.VideoCapture(source, cv2.CAP_DSHOW if isinstance(source, int) else cv2.CAP_FFMPEG)
+    if width is not None:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    if height is not None:
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fourcc is not None:
+        cap.set(cv2.CAP_PROP_FOURCC, fourcc)
+    if fps is not None:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    if buffer_size is not None:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    return cap
+
+
+class LatestFrameCapture:
+    """
+    Reads a video source on a background thread into a single latest-frame slot.
+
+    The reader never waits for the consumer: a frame that is not picked up before
+    the next one arrives is overwritten and counted as dropped. Consumers therefore
+    always process the newest frame and latency stays bounded even when inference
+    is slower than the camera.
+    """
+
+    def __init__(self,
+                 source: Union[int, str],
+                 width: Optional[int] = None,
+                 height: Optional[int] = None,
+                 fps: Optional[int] = None,
+                 fourcc: Optional[int] = None,
+                 buffer_size: Optional[int] = 1,
+                 max_read_failures: int = 30,
+                 metrics_label: Optional[str] = None):
+        """
+        Constructor for the LatestFrameCapture class.
+
+        :param source: Video source (integer for webcam or string for IP camera / file).
+        :param width: Requested frame width.
+        :param height: Requested frame height.
+        :param fps: Requested frame rate.
+        :param fourcc: 4-character code of the capture codec.
+        :param buffer_size: Size of the backend frame buffer; kept small so the slot holds the newest frame.
+        :param max_read_failures: Consecutive failed reads after which the stream is considered ended.
+        :param metrics_label: Camera label of the capture stage metrics; defaults to the source.
+        """
+        self.source = source
+        self.max_read_failures = max_read_failures
+        self.metrics_label = str(source) if metrics_label is None else metrics_label
+        self._capture_args = dict(width=width, height=height, fps=fps,
+                                  fourcc=fourcc, buffer_size=buffer_size)
+
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._thread: Optional[threading.Thread] = None
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+
+        self._frame: Optional[np.ndarray] = None
+        self._frame_time: float = 0.0
+        self._seq = 0
+        self._consumed_seq = 0
+        self._ended = False
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+
+
+    def start(self) -> "LatestFrameCapture":
+        """
+        Opens the source and starts the reader thread.
+
+        :return: The capture itself, for chaining.
+        :raises AppException: If the source cannot be opened.
+        """
+        try:
+            self._cap = open_video_capture(self.source, **self._capture_args)
+            if not self._cap.isOpened():
+                self._cap.release()
+                raise Exception(f"Unable to open video source {self.source}")
+
+            self._thread = threading.Thread(target=self._reader, name=f"capture-{self.source}", daemon=True)
+            self._thread.start()
+            logging.info(f"Started capture thread for source {self.source}")
+            return self
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def _reader(self) -> None:
+        """
+        Reader loop: grabs frames as fast as the source delivers them.
+        """
+        failures = 0
+        metrics = get_stage_metrics()
+        while not self._stop_event.is_set():
+            # Time blocked on the source: close to the frame interval for I/O-bound streams
+            with metrics.span(self.metrics_label, "capture"):
+                ok, frame = self._cap.read()
+            if not ok:
+                failures += 1
+                if failures >= self.max_read_failures:
+                    logging.info(f"Video source {self.source} ended after {failures} failed reads")
+                    break
+                log_throttled(f"capture-read-failed:{self.source}",
+                              f"Read from video source {self.source} failed, retrying", logging.WARNING)
+                time.sleep(0.01)
+                continue
+
+            failures = 0
+            with self._cond:
+                if self._seq > self._consumed_seq:
+                    self.frames_dropped += 1 # Previous frame was never consumed
+                self._frame = frame
+                self._frame_time = time.perf_counter()
+                self._seq += 1
+                self.frames_captured += 1
+                self._cond.notify_all()
+
+        # Released here rather than in stop() so a read blocked on the network never races the release
+        self._cap.release()
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+
+
+    def read(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Returns the newest frame that has not been returned before.
+
+        :param timeout: Seconds to wait for a new frame.
+        :return: (success, frame) in the same form as cv2.VideoCapture.read.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > self._consumed_seq or self._ended, timeout=timeout)
+            if self._seq == self._consumed_seq:
+                return False, None
+            self._consumed_seq = self._seq
+            return True, self._frame
+
+
+    @property
+    def frame_age(self) -> float:
+        """
+        Seconds since the latest frame was captured.
+        """
+        return time.perf_counter() - self._frame_time if self._frame_time else 0.0
+
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Whether the source is still delivering frames or has unread frames left.
+        """
+        with self._cond:
+            return not self._ended or self._seq > self._consumed_seq
+
+
+    def stop(self) -> None:
+        """
+        Stops the reader thread and releases the video source.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        logging.info(f"Stopped capture for source {self.source}: "
+                     f"{self.frames_captured} frames captured, {self.frames_dropped} dropped")
+
+
+    def __enter__(self) -> "LatestFrameCapture":
+        return self.start()
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from fireSmoke.inference.mask_codec import encode_rle, mask_to_polygons
+
+
+def scale_masks(masks: np.ndarray, orig_shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Maps masks from the letterboxed model input back onto the original frame.
+
+    All instances are cropped and resized together as channels of one image instead
+    of one resize per instance.
+
+    :param masks: Float masks of shape (N, h, w) at model input resolution.
+    :param orig_shape: (height, width) of the original frame.
+    :return: Boolean masks of shape (N, height, width).
+    """
+    n, h, w = masks.shape
+    orig_h, orig_w = orig_shape
+    if n == 0:
+        return np.zeros((0, orig_h, orig_w), dtype=bool)
+
+    gain = min(h / orig_h, w / orig_w)
+    pad_x, pad_y = (w - orig_w * gain) / 2, (h - orig_h * gain) / 2
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    bottom, right = int(round(h - pad_y + 0.1)), int(round(w - pad_x + 0.1))
+
+    cropped = np.ascontiguousarray(masks[:, top:bottom, left:right].transpose(1, 2, 0))
+    scaled = np.empty((orig_h, orig_w, n), dtype=np.float32)
+    # cv2.resize handles at most 512 channels per call
+    for start in range(0, n, 512):
+        chunk = cv2.resize(cropped[:, :, start:start + 512], (orig_w, orig_h), interpolation=cv2.INTER_LINEAR)
+        scaled[:, :, start:start + 512] = chunk.reshape(orig_h, orig_w, -1)
+    return (scaled > 0.5).transpose(2, 0, 1)
+
+
+@dataclass
+class FrameDetections:
+    """
+    Detections of one frame as plain NumPy arrays.
+
+    Attributes:
+    - xyxy: Boxes of shape (N, 4) in original frame pixels.
+    - confidence: Confidence scores of shape (N,).
+    - class_id: Class ids of shape (N,).
+    - tracker_id: Track ids of shape (N,), or None when tracking is off.
+    - masks: Boolean masks of shape (N, H, W) at frame resolution, or None.
+    - names: Class id to class name mapping.
+    - orig_shape: (height, width) of the frame.
+    """
+    xyxy: np.ndarray
+    confidence: np.ndarray
+    class_id: np.ndarray
+    tracker_id: Optional[np.ndarray]
+    masks: Optional[np.ndarray]
+    names: dict
+    orig_shape: Tuple[int, int]
+
+
+    @classmethod
+    def empty(cls, orig_shape: Tuple[int, int], names: Optional[dict] = None) -> "FrameDetections":
+        """
+        Returns detections with no instances.
+        """
+        return cls(xyxy=np.zeros((0, 4), dtype=np.float32),
+                   confidence=np.zeros(0, dtype=np.float32),
+                   class_id=np.zeros(0, dtype=int),
+                   tracker_id=None,
+                   masks=None,
+                   names=names or {},
+                   orig_shape=tuple(orig_shape))
+
+
+    @classmethod
+    def from_ultralytics(cls, result, with_masks: bool = True) -> "FrameDetections":
+        """
+        Converts an ultralytics Results object, with one device-to-host transfer for the
+        boxes and one for the masks.
+
+        :param result: ultralytics Results for one frame.
+        :param with_masks: Whether to convert the segmentation masks.
+        :return: FrameDetections for the frame.
+        """
+        orig_shape = tuple(result.orig_shape)
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty(orig_shape, result.names)
+
+        # Rows are [x1, y1, x2, y2, (track id), conf, cls]
+        data = boxes.data.cpu().numpy()
+        masks = None
+        if with_masks and result.masks is not None:
+            masks = scale_masks(result.masks.data.cpu().numpy(), orig_shape)
+
+        return cls(xyxy=data[:, :4].astype(np.float32),
+                   confidence=data[:, -2].astype(np.float32),
+                   class_id=data[:, -1].astype(int),
+                   tracker_id=data[:, 4].astype(int) if boxes.is_track else None,
+                   masks=masks,
+                   names=result.names,
+                   orig_shape=orig_shape)
+
+
+    def __len__(self) -> int:
+        return len(self.xyxy)
+
+
+    def to_records(self, mask_format: Optional[str] = "rle") -> list:
+        """
+        Converts the detections to JSON-serialisable dictionaries, one per instance.
+
+        Masks are never emitted densely: they are encoded as COCO RLE ("rle") or
+        simplified polygons ("polygon"), or left out (None).
+
+        :param mask_format: "rle", "polygon" or None.
+        :return: List of detection dictionaries.
+        """
+        masks = None
+        if mask_format and self.masks is not None:
+            if mask_format == "rle":
+                masks = encode_rle(self.masks)
+            elif mask_format == "polygon":
+                masks = [mask_to_polygons(mask) for mask in self.masks]
+            else:
+                raise ValueError(f"Unknown mask format: {mask_format}")
+
+        records = []
+        for i in range(len(self)):
+            record = {
+                "class_id": int(self.class_id[i]),
+                "class_name": self.names.get(int(self.class_id[i]), str(self.class_id[i])),
+                "confidence": round(float(self.confidence[i]), 4),
+                "box": [round(float(v), 1) for v in self.xyxy[i]],
+            }
+            if self.tracker_id is not None:
+                record["tracker_id"] = int(self.tracker_id[i])
+            if masks is not None:
+                record[mask_format] = masks[i]
+            records.append(record)
+        return records
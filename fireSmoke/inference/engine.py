@@ -0,0 +1,303 @@
+import importlib.util
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+import torch
+from ultralytics import YOLO
+
+from fireSmoke.constant.application import (APP_DEPLOYMENT_RECORD,
+                                            APP_DEVICE,
+                                            APP_MODEL_PATH,
+                                            INFERENCE_AUTO_EXPORT,
+                                            INFERENCE_EXPORT_FORMATS,
+                                            INFERENCE_NUM_THREADS,
+                                            MODEL_WARMUP_IMG_SIZE)
+from fireSmoke.exception import AppException
+from fireSmoke.inference.model_registry import RegisteredModel, get_model
+from fireSmoke.logger import logging
+
+
+def resolve_device(device: Optional[str] = APP_DEVICE) -> str:
+    """
+    Resolves the device to run inference on, falling back to CPU when CUDA is missing.
+
+    :param device: Requested device ("auto", "cpu", "cuda", "cuda:0", ...).
+    :return: The device actually used.
+    """
+    cuda_available = torch.cuda.is_available()
+    if device in (None, "", "auto"):
+        return "cuda" if cuda_available else "cpu"
+    if str(device).startswith("cuda") and not cuda_available:
+        logging.warning(f"Device {device} requested but CUDA is not available, falling back to CPU")
+        return "cpu"
+    return str(device)
+
+
+def exported_model_paths(weight_path: str) -> dict:
+    """
+    Lists the exported models that exist next to a .pt weight file.
+
+    :param weight_path: Path to the .pt weight file.
+    :return: Mapping of export format ("onnx", "openvino") to path.
+    """
+    stem = os.path.splitext(weight_path)[0]
+    candidates = {
+        "openvino": f"{stem}_openvino_model",
+        "onnx": f"{stem}.onnx",
+    }
+    return {fmt: path for fmt, path in candidates.items() if os.path.exists(path)}
+
+
+def export_model(weight_path: str,
+                 formats: List[str] = INFERENCE_EXPORT_FORMATS,
+                 imgsz: int = MODEL_WARMUP_IMG_SIZE) -> dict:
+    """
+    Exports a .pt model to CPU inference formats. The exports are written next to the weights.
+
+    OpenVINO is optional and skipped when the openvino package is not installed.
+
+    :param weight_path: Path to the .pt weight file.
+    :param formats: Export formats, any of "onnx" and "openvino".
+    :param imgsz: Image size the model is exported for.
+    :return: Mapping of export format to the exported model path.
+    :raises AppException: If an export fails.
+    """
+    try:
+        exported = {}
+        model = YOLO(weight_path)
+        for fmt in formats:
+            if fmt == "openvino" and importlib.util.find_spec("openvino") is None:
+                logging.info("openvino is not installed, skipping OpenVINO export")
+                continue
+
+            logging.info(f"Exporting {weight_path} to {fmt}")
+            # Dynamic axes keep batched inference possible on the exported model
+            exported[fmt] = str(model.export(format=fmt, imgsz=imgsz, dynamic=True, verbose=False))
+            logging.info(f"Exported {weight_path} to {exported[fmt]}")
+
+        return exported
+
+    except Exception as e:
+        raise AppException(e, sys)
+
+
+def _backend_available(fmt: str) -> bool:
+    """
+    Checks whether the runtime for an export format is importable.
+    """
+    module = {"onnx": "onnxruntime", "openvino": "openvino"}[fmt]
+    return importlib.util.find_spec(module) is not None
+
+
+def resolve_model_path(weight_path: str, device: str, auto_export: bool = INFERENCE_AUTO_EXPORT) -> str:
+    """
+    Picks the model file to load for a device.
+
+    On CPU an exported OpenVINO or ONNX model is preferred over eager PyTorch. If none
+    exists yet and `auto_export` is set, the weights are exported once and reused afterwards.
+
+    :param weight_path: Path to the .pt weight file.
+    :param device: Resolved device.
+    :param auto_export: Whether to export the weights when no exported model exists.
+    :return: Path of the model to load.
+    """
+    if device != "cpu" or not weight_path.endswith(".pt"):
+        return weight_path
+
+    exported = exported_model_paths(weight_path)
+    if not exported and auto_export and os.path.exists(weight_path):
+        try:
+            formats = [fmt for fmt in INFERENCE_EXPORT_FORMATS if _backend_available(fmt)]
+            exported = export_model(weight_path, formats=formats)
+        except AppException as e:
+            logging.warning(f"Export of {weight_path} failed, using PyTorch weights: {e}")
+
+    for fmt in ("openvino", "onnx"):
+        if fmt in exported and _backend_available(fmt):
+            return exported[fmt]
+    return weight_path
+
+
+def deployed_model_path(weight_path: str = APP_MODEL_PATH,
+                        device: Optional[str] = APP_DEVICE,
+                        record_path: str = APP_DEPLOYMENT_RECORD) -> str:
+    """
+    Picks the model the training pipeline deployed for the app.
+
+    The ModelOptimizer stage records the fastest model variant within its accuracy budget.
+    On CPU that variant is used; on CUDA the PyTorch weights it was derived from are used.
+
+    :param weight_path: Weights used when nothing was deployed.
+    :param device: Requested device.
+    :param record_path: Path to the deployment record.
+    :return: Path of the model to load.
+    """
+    if not os.path.exists(record_path):
+        return weight_path
+    try:
+        with open(record_path, "r") as f:
+            record = json.load(f)
+        key = "deployment_model_file_path" if resolve_device(device) == "cpu" else "source_model_file_path"
+        if os.path.exists(record[key]):
+            return record[key]
+        logging.warning(f"Deployed model {record[key]} is missing, using {weight_path}")
+    except (ValueError, KeyError) as e:
+        logging.warning(f"Ignoring unreadable deployment record {record_path}: {e}")
+    return weight_path
+
+
+def configure_threads(num_threads: int = INFERENCE_NUM_THREADS) -> None:
+    """
+    Sets the number of CPU threads used for inference in this process.
+
+    :param num_threads: Number of threads; 0 keeps the runtime default.
+    """
+    if num_threads and num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+
+def _apply_onnx_threads(entry: RegisteredModel, num_threads: int) -> bool:
+    """
+    Rebuilds the ONNX Runtime session of a loaded model with an explicit intra-op thread count.
+
+    ultralytics creates the session with default options, which spreads over every core. The
+    session is replaced on the format backend that runs it, not on the AutoBackend wrapper,
+    which only forwards attribute reads.
+
+    :return: Whether the session was rebuilt.
+    """
+    autobackend = getattr(getattr(entry.model, "predictor", None), "model", None)
+    # Older ultralytics versions keep the session on AutoBackend itself
+    backend = getattr(autobackend, "backend", autobackend)
+    session = getattr(backend, "session", None)
+    if session is None or not hasattr(session, "get_providers"):
+        return False
+
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = num_threads
+    options.inter_op_num_threads = 1
+    backend.session = ort.InferenceSession(entry.key[0], sess_options=options,
+                                           providers=session.get_providers())
+    backend.session_options = options
+    return True
+
+
+class InferenceEngine:
+    """
+    Single inference interface for the detection pages and streaming helpers.
+
+    It resolves the device (CUDA when available, otherwise CPU), picks the fastest
+    available model format for that device and serves predict/track calls through
+    the process-wide model registry.
+    """
+
+    def __init__(self,
+                 weight_path: str = APP_MODEL_PATH,
+                 device: Optional[str] = APP_DEVICE,
+                 num_threads: int = INFERENCE_NUM_THREADS,
+                 imgsz: int = MODEL_WARMUP_IMG_SIZE):
+        """
+        Constructor for the InferenceEngine class.
+
+        :param weight_path: Path to the .pt weight file (or an exported model).
+        :param device: Requested device; "auto" picks CUDA when available.
+        :param num_threads: CPU threads used for inference; 0 keeps the runtime default.
+        :param imgsz: Inference image size.
+        :raises AppException: If the model cannot be loaded.
+        """
+        try:
+            self.device = resolve_device(device)
+            self.imgsz = imgsz
+            self.num_threads = num_threads
+
+            if self.device == "cpu":
+                configure_threads(num_threads)
+
+            self.model_path = resolve_model_path(weight_path, self.device)
+            self._entry = get_model(self.model_path, self.device)
+
+            if self.device == "cpu" and num_threads and self.model_path.endswith(".onnx"):
+                with self._entry.lock:
+                    if self._entry.num_threads != num_threads and _apply_onnx_threads(self._entry, num_threads):
+                        self._entry.num_threads = num_threads
+
+            logging.info(f"Inference engine using {self.model_path} on {self.device}")
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    @property
+    def model(self) -> YOLO:
+        """
+        The underlying YOLO model.
+        """
+        return self._entry.model
+
+
+    @property
+    def names(self) -> dict:
+        """
+        Class id to class name mapping of the model.
+        """
+        return self._entry.model.names
+
+
+    def predict(self, source, **kwargs) -> list:
+        """
+        Runs detection on an image, a list of images or a batch.
+
+        :param source: Image(s) accepted by ultralytics (numpy, PIL, path).
+        :param kwargs: Extra ultralytics predict arguments (conf, iou, ...).
+        :return: List of ultralytics Results, one per image.
+        """
+        kwargs.setdefault("imgsz", self.imgsz)
+        kwargs.setdefault("verbose", False)
+        with self._entry.lock:
+            return self._entry.model.predict(source, device=self.device, **kwargs)
+
+
+    def track(self, frame, **kwargs):
+        """
+        Runs detection with tracking on a single video frame.
+
+        :param frame: BGR video frame.
+        :param kwargs: Extra ultralytics track arguments.
+        :return: ultralytics Results for the frame.
+        """
+        kwargs.setdefault("imgsz", self.imgsz)
+        kwargs.setdefault("verbose", False)
+        kwargs.setdefault("persist", True)
+        with self._entry.lock:
+            return self._entry.model.track(source=frame, device=self.device, **kwargs)[0]
+
+
+    def __call__(self, source, **kwargs) -> list:
+        return self.predict(source, **kwargs)
+
+
+def measure_latency(engine: InferenceEngine, image: np.ndarray, runs: int, warmup: int = 3) -> dict:
+    """
+    Times single-image predictions of an engine.
+
+    :param engine: Engine to time.
+    :param image: BGR image to run.
+    :param runs: Number of timed predictions.
+    :param warmup: Untimed predictions run first.
+    :return: Median, 95th percentile and mean latency in milliseconds.
+    """
+    for _ in range(warmup):
+        engine.predict(image)
+    timings = []
+    for _ in range(max(1, runs)):
+        start = time.perf_counter()
+        engine.predict(image)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"p50": round(float(np.percentile(timings, 50)), 2),
+            "p95": round(float(np.percentile(timings, 95)), 2),
+            "mean": round(float(np.mean(timings)), 2)}
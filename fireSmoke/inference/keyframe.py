@@ -0,0 +1,261 @@
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from fireSmoke.constant.application import (KEYFRAME_DRIFT_BUDGET,
+                                            KEYFRAME_FLOW_WIDTH,
+                                            KEYFRAME_MAX_INTERVAL,
+                                            KEYFRAME_MIN_INTERVAL,
+                                            KEYFRAME_MIN_TRACK_QUALITY,
+                                            KEYFRAME_POINTS_PER_TRACK)
+from fireSmoke.inference.detections import FrameDetections
+
+# Lucas-Kanade settings for the downscaled frames
+_LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+_SCENE_POINTS = 100 # Points spread over the whole frame that measure scene motion
+
+
+def _compose(step: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """
+    Returns the 2x3 affine transform applying `total`, then `step`.
+    """
+    return step[:, :2] @ total + np.hstack([np.zeros((2, 2)), step[:, 2:]])
+
+
+class KeyframePropagator:
+    """
+    Carries the detections of a keyframe over the frames that follow it.
+
+    The model runs on keyframes only. On the frames in between, feature points inside each
+    instance's mask are followed with sparse Lucas-Kanade optical flow on a downscaled
+    grayscale frame, and each instance's mask and box are warped with the rotation, scale and
+    translation fitted to its points. Keyframes are due every `interval` frames, where the
+    interval shrinks as the measured scene motion grows, and as soon as an instance loses
+    too many of its points; the propagated confidence is the keyframe confidence scaled by
+    the fraction of points still tracked.
+    """
+
+    def __init__(self,
+                 min_interval: int = KEYFRAME_MIN_INTERVAL,
+                 max_interval: int = KEYFRAME_MAX_INTERVAL,
+                 drift_budget: float = KEYFRAME_DRIFT_BUDGET,
+                 min_track_quality: float = KEYFRAME_MIN_TRACK_QUALITY,
+                 points_per_track: int = KEYFRAME_POINTS_PER_TRACK,
+                 width: int = KEYFRAME_FLOW_WIDTH):
+        """
+        Constructor for the KeyframePropagator class.
+
+        :param min_interval: Smallest number of frames between keyframes (1 runs the model on every frame).
+        :param max_interval: Largest number of frames between keyframes, reached on a still scene.
+        :param drift_budget: Motion, in downscaled pixels, allowed to accumulate between keyframes.
+        :param min_track_quality: Fraction of an instance's points that must still be tracked.
+        :param points_per_track: Feature points followed per instance.
+        :param width: Width of the downscaled frames the flow is computed on.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.drift_budget = drift_budget
+        self.min_track_quality = min_track_quality
+        self.points_per_track = points_per_track
+        self.width = width
+
+        self._keyframe: Optional[FrameDetections] = None
+        self._key_masks: Optional[np.ndarray] = None
+        self._prev_gray: Optional[np.ndarray] = None
+        self._scale = 1.0
+        self._points: List[np.ndarray] = []
+        self._initial_points: List[int] = []
+        self._transforms: List[np.ndarray] = []
+        self._scene_points: Optional[np.ndarray] = None
+        self._frames_since_keyframe = 0
+        self._force_keyframe = False
+        self.motion = 0.0 # Smoothed scene motion in downscaled pixels per frame
+        self.keyframes = 0
+        self.frames_propagated = 0
+
+
+    def _gray(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        self._scale = min(1.0, self.width / width)
+        size = (max(1, round(width * self._scale)), max(1, round(height * self._scale)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA) if self._scale < 1.0 else frame
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+
+    @property
+    def interval(self) -> int:
+        """
+        Current number of frames between keyframes, from the measured motion.
+        """
+        interval = round(self.drift_budget / self.motion) if self.motion > 0 else self.max_interval
+        return int(np.clip(interval, self.min_interval, self.max_interval))
+
+
+    def needs_keyframe(self) -> bool:
+        """
+        Whether the next frame must go through the model.
+        """
+        return (self._keyframe is None
+                or self._force_keyframe
+                or self._frames_since_keyframe + 1 >= self.interval)
+
+
+    def keyframe(self, frame: np.ndarray, detections: FrameDetections) -> None:
+        """
+        Stores a frame the model ran on and picks the points each instance is followed with.
+
+        :param frame: BGR frame.
+        :param detections: Detections of the model on the frame.
+        """
+        gray = self._gray(frame)
+        height, width = gray.shape
+        self._points, self._initial_points, self._transforms = [], [], []
+        self._key_masks = None if detections.masks is None else detections.masks.astype(np.uint8)
+
+        for i in range(len(detections)):
+            x1, y1, x2, y2 = np.clip(np.round(detections.xyxy[i] * self._scale),
+                                     0, [width, height, width, height]).astype(int)
+            region = np.zeros_like(gray)
+            region[y1:y2, x1:x2] = 255
+            if self._key_masks is not None:
+                mask = cv2.resize(self._key_masks[i], (width, height), interpolation=cv2.INTER_NEAREST)
+                # Smoke edges carry the texture; a dilated mask keeps points on the boundary
+                region &= cv2.dilate(mask * 255, np.ones((5, 5), np.uint8))
+            points = cv2.goodFeaturesToTrack(gray, self.points_per_track, 0.01, 3, mask=region)
+            if points is None or len(points) < 3:
+                # Flat instances: fall back to their box
+                region[y1:y2, x1:x2] = 255
+                points = cv2.goodFeaturesToTrack(gray, self.points_per_track, 0.01, 3, mask=region)
+            points = np.zeros((0, 1, 2), np.float32) if points is None else points.astype(np.float32)
+            self._points.append(points)
+            self._initial_points.append(len(points))
+            self._transforms.append(np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]))
+
+        self._scene_points = cv2.goodFeaturesToTrack(gray, _SCENE_POINTS, 0.01, 8)
+        self._keyframe = detections
+        self._prev_gray = gray
+        self._frames_since_keyframe = 0
+        self._force_keyframe = False
+        self.keyframes += 1
+
+
+    def _step_transform(self, old: np.ndarray, new: np.ndarray) -> np.ndarray:
+        """
+        Fits the motion of one instance's points between two frames.
+        """
+        if len(old) >= 3:
+            transform, _ = cv2.estimateAffinePartial2D(old, new, method=cv2.RANSAC, ransacReprojThreshold=2.0)
+            if transform is not None:
+                return transform
+        shift = np.median(new - old, axis=0) if len(old) else np.zeros(2)
+        return np.array([[1.0, 0.0, shift[0]], [0.0, 1.0, shift[1]]])
+
+
+    def propagate(self, frame: np.ndarray) -> FrameDetections:
+        """
+        Moves the keyframe detections onto a frame the model did not run on.
+
+        :param frame: BGR frame following the previous keyframe or propagated frame.
+        :return: Detections warped onto the frame.
+        """
+        gray = self._gray(frame)
+        if self._keyframe is None:
+            self._force_keyframe = True
+            return FrameDetections.empty(frame.shape[:2])
+        if gray.shape != self._prev_gray.shape:
+            self._force_keyframe = True
+            return self._keyframe
+
+        # One flow computation for the points of every instance and the scene points
+        groups = self._points + ([self._scene_points] if self._scene_points is not None else [])
+        counts = [len(points) for points in groups]
+        if sum(counts):
+            old = np.concatenate(groups).reshape(-1, 1, 2)
+            new, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, old, None, **_LK_PARAMS)
+            tracked = status.ravel() == 1
+        else:
+            old = new = np.zeros((0, 1, 2), np.float32)
+            tracked = np.zeros(0, dtype=bool)
+
+        offsets = np.cumsum([0] + counts)
+        displacements = []
+        for group, (start, end) in enumerate(zip(offsets[:-1], offsets[1:])):
+            good = tracked[start:end]
+            group_old, group_new = old[start:end][good].reshape(-1, 2), new[start:end][good].reshape(-1, 2)
+            if len(group_new):
+                displacements.append(float(np.median(np.linalg.norm(group_new - group_old, axis=1))))
+            if group < len(self._points):
+                self._transforms[group] = _compose(self._step_transform(group_old, group_new), self._transforms[group])
+                self._points[group] = group_new.reshape(-1, 1, 2)
+            else:
+                self._scene_points = group_new.reshape(-1, 1, 2) if len(group_new) else None
+
+        # Smoothed motion of the fastest instance (or of the scene) sets how long the next keyframe can wait
+        if displacements:
+            self.motion = 0.7 * self.motion + 0.3 * max(displacements)
+
+        quality = np.array([len(points) / initial if initial else 0.0
+                            for points, initial in zip(self._points, self._initial_points)])
+        if len(quality) and quality.min() < self.min_track_quality:
+            self._force_keyframe = True
+
+        self._prev_gray = gray
+        self._frames_since_keyframe += 1
+        self.frames_propagated += 1
+        return self._warp(quality)
+
+
+    def _warp(self, quality: np.ndarray) -> FrameDetections:
+        """
+        Applies each instance's accumulated transform to its keyframe box and mask.
+        """
+        key = self._keyframe
+        height, width = key.orig_shape
+        xyxy = np.zeros_like(key.xyxy)
+        masks = None if self._key_masks is None else np.zeros((len(key), height, width), dtype=bool)
+
+        for i, transform in enumerate(self._transforms):
+            # Same rotation and scale at full resolution, translation scaled up
+            full = transform.copy()
+            full[:, 2] /= self._scale
+            x1, y1, x2, y2 = key.xyxy[i]
+            corners = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]]) @ full[:, :2].T + full[:, 2]
+            xyxy[i] = np.clip([*corners.min(axis=0), *corners.max(axis=0)], 0, [width, height, width, height])
+
+            if masks is not None:
+                # Only the region around the warped box is resampled
+                left, top = int(xyxy[i, 0]), int(xyxy[i, 1])
+                right, bottom = int(np.ceil(xyxy[i, 2])), int(np.ceil(xyxy[i, 3]))
+                if right > left and bottom > top:
+                    full[:, 2] -= (left, top)
+                    masks[i, top:bottom, left:right] = cv2.warpAffine(self._key_masks[i], full, (right - left, bottom - top),
+                                                                      flags=cv2.INTER_NEAREST) > 0
+
+        return FrameDetections(xyxy=xyxy.astype(np.float32),
+                               confidence=(key.confidence * quality).astype(np.float32),
+                               class_id=key.class_id,
+                               tracker_id=key.tracker_id,
+                               masks=masks,
+                               names=key.names,
+                               orig_shape=key.orig_shape)
+
+
+    @property
+    def propagated_ratio(self) -> float:
+        """
+        Fraction of frames served by propagation instead of the model.
+        """
+        total = self.keyframes + self.frames_propagated
+        return self.frames_propagated / total if total else 0.0
+
+
+    def reset(self) -> None:
+        """
+        Forces a keyframe on the next frame.
+        """
+        self._keyframe = None
+        self._force_keyframe = False
+        self._frames_since_keyframe = 0
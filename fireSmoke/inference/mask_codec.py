@@ -0,0 +1,195 @@
+"""
+COCO-style run-length encoding of binary masks.
+
+An RLE is {"size": [height, width], "counts": ...} where counts are alternating run
+lengths of 0s and 1s over the mask in column-major order, starting with 0s. Counts
+are either a list of ints or the compact COCO string form, compatible with pycocotools.
+"""
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+
+def encode_rle(masks: np.ndarray, compress: bool = True) -> List[dict]:
+    """
+    Encodes binary masks as COCO RLEs.
+
+    Run boundaries of all masks are found with one vectorised pass over the stack.
+
+    :param masks: Boolean masks of shape (N, H, W) or a single (H, W) mask.
+    :param compress: Whether to emit the compact COCO string counts instead of a list of ints.
+    :return: One RLE dictionary per mask.
+    """
+    masks = np.asarray(masks, dtype=bool)
+    if masks.ndim == 2:
+        masks = masks[None]
+    n, height, width = masks.shape
+    length = height * width
+    if n == 0:
+        return []
+
+    # Column-major flattening, padded with a 0 at both ends so every run has a start and an end
+    flat = np.zeros((n, length + 2), dtype=bool)
+    flat[:, 1:-1] = masks.transpose(0, 2, 1).reshape(n, length)
+    rows, changes = np.nonzero(flat[:, 1:] != flat[:, :-1])
+    splits = np.searchsorted(rows, np.arange(1, n))
+
+    rles = []
+    for row_changes in np.split(changes, splits):
+        boundaries = np.concatenate(([0], row_changes, [length]))
+        counts = np.diff(boundaries)
+        # A mask ending in 1s produces a zero-length trailing run
+        if len(counts) > 1 and counts[-1] == 0:
+            counts = counts[:-1]
+        counts = counts.tolist()
+        rles.append({"size": [height, width],
+                     "counts": counts_to_string(counts) if compress else counts})
+    return rles
+
+
+def _counts(rle: dict) -> np.ndarray:
+    counts = rle["counts"]
+    if isinstance(counts, (str, bytes)):
+        counts = string_to_counts(counts)
+    return np.asarray(counts, dtype=np.int64)
+
+
+def decode_rle(rles: List[dict]) -> np.ndarray:
+    """
+    Decodes COCO RLEs back into boolean masks.
+
+    :param rles: RLE dictionaries sharing the same size.
+    :return: Boolean masks of shape (N, H, W).
+    """
+    if not rles:
+        return np.zeros((0, 0, 0), dtype=bool)
+    height, width = rles[0]["size"]
+    masks = np.empty((len(rles), height, width), dtype=bool)
+    for i, rle in enumerate(rles):
+        counts = _counts(rle)
+        values = np.arange(len(counts)) % 2 == 1
+        masks[i] = np.repeat(values, counts).reshape(width, height).T
+    return masks
+
+
+def counts_to_string(counts: List[int]) -> str:
+    """
+    Compresses RLE counts into the COCO string form (delta + 6-bit varint encoding).
+    """
+    chars = []
+    for i, x in enumerate(counts):
+        if i > 2:
+            x -= counts[i - 2]
+        more = True
+        while more:
+            c = x & 0x1F
+            x >>= 5
+            more = (x != -1) if (c & 0x10) else (x != 0)
+            if more:
+                c |= 0x20
+            chars.append(chr(c + 48))
+    return "".join(chars)
+
+
+def string_to_counts(s) -> List[int]:
+    """
+    Expands COCO string counts back into a list of run lengths.
+    """
+    if isinstance(s, bytes):
+        s = s.decode("ascii")
+    counts = []
+    p = 0
+    while p < len(s):
+        x, k, more = 0, 0, True
+        while more:
+            c = ord(s[p]) - 48
+            x |= (c & 0x1F) << (5 * k)
+            more = bool(c & 0x20)
+            p += 1
+            k += 1
+            if not more and (c & 0x10):
+                x |= -1 << (5 * k)
+        if len(counts) > 2:
+            x += counts[-2]
+        counts.append(x)
+    return counts
+
+
+def rle_area(rle: dict) -> int:
+    """
+    Number of foreground pixels of an RLE, computed without decoding.
+    """
+    return int(_counts(rle)[1::2].sum())
+
+
+def _run_ends(rle: dict) -> np.ndarray:
+    return np.cumsum(_counts(rle))
+
+
+def rle_intersection(a: dict, b: dict) -> int:
+    """
+    Number of pixels set in both RLEs, computed on the runs without decoding.
+    """
+    ends_a, ends_b = _run_ends(a), _run_ends(b)
+    length = int(ends_a[-1]) if len(ends_a) else 0
+    if length == 0:
+        return 0
+
+    # Segments between the union of all run boundaries are constant in both masks
+    starts = np.union1d(np.concatenate(([0], ends_a[:-1])), np.concatenate(([0], ends_b[:-1])))
+    lengths = np.diff(np.append(starts, length))
+    in_a = np.searchsorted(ends_a, starts, side="right") % 2 == 1
+    in_b = np.searchsorted(ends_b, starts, side="right") % 2 == 1
+    return int(lengths[in_a & in_b].sum())
+
+
+def rle_iou(rles_a: List[dict], rles_b: List[dict]) -> np.ndarray:
+    """
+    Pairwise mask IoU between two lists of RLEs, computed on the runs without decoding.
+
+    :param rles_a: N RLE dictionaries.
+    :param rles_b: M RLE dictionaries.
+    :return: IoU matrix of shape (N, M).
+    """
+    areas_a = np.array([rle_area(r) for r in rles_a], dtype=np.float64)
+    areas_b = np.array([rle_area(r) for r in rles_b], dtype=np.float64)
+    iou = np.zeros((len(rles_a), len(rles_b)), dtype=np.float64)
+    for i, a in enumerate(rles_a):
+        for j, b in enumerate(rles_b):
+            inter = rle_intersection(a, b)
+            union = areas_a[i] + areas_b[j] - inter
+            iou[i, j] = inter / union if union > 0 else 0.0
+    return iou
+
+
+def mask_to_polygons(mask: np.ndarray, epsilon: float = 1.5) -> List[List[float]]:
+    """
+    Converts a binary mask to simplified outer polygons.
+
+    :param mask: Boolean mask of shape (H, W).
+    :param epsilon: Douglas-Peucker tolerance in pixels.
+    :return: Polygons as flat [x1, y1, x2, y2, ...] lists; degenerate contours are dropped.
+    """
+    contours, _ = cv2.findContours(mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    polygons = []
+    for contour in contours:
+        approx = cv2.approxPolyDP(contour, epsilon, True)
+        if len(approx) >= 3:
+            polygons.append(approx.reshape(-1).astype(float).tolist())
+    return polygons
+
+
+def polygons_to_mask(polygons: List[List[float]], shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Rasterises polygons produced by mask_to_polygons.
+
+    :param polygons: Flat [x1, y1, x2, y2, ...] polygons.
+    :param shape: (height, width) of the mask.
+    :return: Boolean mask of shape (H, W).
+    """
+    mask = np.zeros(shape, dtype=np.uint8)
+    points = [np.round(np.asarray(p, dtype=np.float64).reshape(-1, 2)).astype(np.int32) for p in polygons]
+    if points:
+        cv2.fillPoly(mask, points, 1)
+    return mask.astype(bool)
@@ -0,0 +1,255 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fireSmoke.constant.application import (INSTRUMENTATION_BUCKETS,
+                                            INSTRUMENTATION_ENABLED,
+                                            INSTRUMENTATION_WINDOW)
+
+
+class StageHistogram:
+    """
+    Latency of one stage of one camera.
+
+    Cumulative bucket counts, sum and count are kept for the Prometheus histogram; the
+    most recent `window` samples are kept for rolling percentiles and throughput.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = INSTRUMENTATION_BUCKETS, window: int = INSTRUMENTATION_WINDOW):
+        """
+        Constructor for the StageHistogram class.
+
+        :param buckets: Upper bounds of the histogram buckets in seconds.
+        :param window: Number of recent samples kept for the rolling statistics.
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1) # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._durations = deque(maxlen=window)
+        self._times = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.bucket_counts[bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+            self._durations.append(seconds)
+            self._times.append(time.perf_counter())
+
+
+    def rate(self) -> float:
+        """
+        Samples per second over the rolling window, e.g. the frame rate of a stage run once per frame.
+        """
+        with self._lock:
+            samples, first = len(self._times), self._times[0] if self._times else 0.0
+        # Intervals between the first sample and now, so the rate decays when a stream stalls
+        elapsed = time.perf_counter() - first
+        return (samples - 1) / elapsed if samples > 1 and elapsed > 0 else 0.0
+
+
+    def rolling(self) -> dict:
+        """
+        Statistics of the samples in the rolling window.
+
+        :return: Sample count, p50/p95/p99/mean in milliseconds and samples per second.
+        """
+        with self._lock:
+            durations = np.fromiter(self._durations, dtype=np.float64, count=len(self._durations))
+        if durations.size == 0:
+            return {"samples": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "per_second": 0.0}
+        p50, p95, p99 = np.percentile(durations, (50, 95, 99)) * 1000
+        return {"samples": int(durations.size),
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3),
+                "mean": round(float(durations.mean()) * 1000, 3),
+                "per_second": round(self.rate(), 2)}
+
+
+class _Span:
+    """
+    Times a `with` block into a histogram.
+    """
+
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: StageHistogram):
+        self._histogram = histogram
+        self._start = 0.0
+
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class _NoSpan:
+    """
+    Span used while instrumentation is off; costs one attribute lookup.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class StageMetrics:
+    """
+    Per-camera, per-stage latency histograms of the streaming path.
+
+    Stages are capture (reading a frame from the source), preprocess, inference,
+    postprocess, annotate, encode and display. Comparing capture with the compute
+    stages of a camera shows whether it is limited by its source or by the model.
+    When disabled, spans and observations are no-ops and nothing is recorded.
+    """
+
+    def __init__(self, enabled: bool = INSTRUMENTATION_ENABLED,
+                 buckets: Tuple[float, ...] = INSTRUMENTATION_BUCKETS,
+                 window: int = INSTRUMENTATION_WINDOW):
+        """
+        Constructor for the StageMetrics class.
+
+        :param enabled: Whether spans are recorded.
+        :param buckets: Upper bounds of the histogram buckets in seconds.
+        :param window: Number of recent samples per histogram kept for the rolling statistics.
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.window = window
+        self._histograms: Dict[Tuple[str, str], StageHistogram] = {}
+        self._lock = threading.Lock()
+
+
+    def histogram(self, camera: str, stage: str) -> StageHistogram:
+        key = (str(camera), stage)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, StageHistogram(self.buckets, self.window))
+        return histogram
+
+
+    def span(self, camera: str, stage: str):
+        """
+        Context manager timing a block as `stage` of `camera`.
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self.histogram(camera, stage))
+
+
+    def observe(self, camera: str, stage: str, seconds: float) -> None:
+        """
+        Records a duration measured elsewhere, e.g. the per-image speed ultralytics reports.
+        """
+        if self.enabled:
+            self.histogram(camera, stage).observe(seconds)
+
+
+    def observe_result(self, camera: str, result) -> None:
+        """
+        Records the preprocess, inference and postprocess times of an ultralytics result.
+        For batched predictions they are the per-image share of the batch.
+        """
+        if self.enabled:
+            for stage in ("preprocess", "inference", "postprocess"):
+                if stage in result.speed:
+                    self.histogram(camera, stage).observe(result.speed[stage] / 1000)
+
+
+    def rate(self, camera: str, stage: str) -> float:
+        """
+        Rolling samples per second of a stage; 0 while disabled or before the first sample.
+        """
+        histogram = self._histograms.get((str(camera), stage)) if self.enabled else None
+        return histogram.rate() if histogram is not None else 0.0
+
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms = {}
+
+
+    def snapshot(self) -> List[dict]:
+        """
+        Rolling statistics of every camera and stage, sorted by camera and stage.
+
+        :return: One dict per (camera, stage) with the keys of StageHistogram.rolling.
+        """
+        with self._lock:
+            items = sorted(self._histograms.items())
+        return [{"camera": camera, "stage": stage, **histogram.rolling()} for (camera, stage), histogram in items]
+
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the histograms in the Prometheus text exposition format.
+
+        :return: Cumulative histograms `firesmoke_stage_seconds` plus rolling quantiles
+                 `firesmoke_stage_rolling_seconds`, labelled by camera and stage.
+        """
+        with self._lock:
+            items = sorted(self._histograms.items())
+
+        lines = ["# HELP firesmoke_stage_seconds Time spent per frame in each stage of the streaming path.",
+                 "# TYPE firesmoke_stage_seconds histogram"]
+        rolling = []
+        for (camera, stage), histogram in items:
+            labels = f'camera="{_escape(camera)}",stage="{stage}"'
+            with histogram._lock:
+                counts, total, count = list(histogram.bucket_counts), histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'firesmoke_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"firesmoke_stage_seconds_sum{{{labels}}} {total}")
+            lines.append(f"firesmoke_stage_seconds_count{{{labels}}} {count}")
+
+            stats = histogram.rolling()
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                rolling.append(f'firesmoke_stage_rolling_seconds{{{labels},quantile="{quantile}"}} {round(stats[key] / 1000, 6)}')
+
+        lines += ["# HELP firesmoke_stage_rolling_seconds Quantiles of the recent samples of each stage.",
+                  "# TYPE firesmoke_stage_rolling_seconds gauge"] + rolling
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Metrics shared by every stream of this process
+_stage_metrics: Optional[StageMetrics] = None
+_stage_metrics_lock = threading.Lock()
+
+
+def get_stage_metrics() -> StageMetrics:
+    """
+    Returns the process-wide stage metrics.
+    """
+    global _stage_metrics
+    with _stage_metrics_lock:
+        if _stage_metrics is None:
+            _stage_metrics = StageMetrics()
+        return _stage_metrics
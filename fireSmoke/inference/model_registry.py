@@ -0,0 +1,165 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+from ultralytics import YOLO
+
+from fireSmoke.constant.application import (MODEL_REGISTRY_MAX_MODELS,
+                                            MODEL_WARMUP_IMG_SIZE)
+from fireSmoke.exception import AppException
+from fireSmoke.logger import logging
+
+
+@dataclass
+class RegisteredModel:
+    """
+    A model held by the registry.
+
+    Attributes:
+    - key: (absolute weight path, file mtime, device) the model was loaded under.
+    - model: The loaded YOLO model.
+    - lock: Serialises calls into the model, whose predictor is not thread-safe.
+    - num_threads: CPU thread count the model's runtime was configured with (0: default).
+    """
+    key: tuple
+    model: YOLO
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    num_threads: int = 0
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded YOLO models.
+
+    Each weight file is loaded and warmed up once per (path, mtime, device), so
+    Streamlit reruns reuse the resident model instead of reading the weights again.
+    Retrained weights change the mtime and are therefore picked up automatically.
+    The least recently used model is evicted once more than `max_models` are resident.
+    """
+
+    def __init__(self,
+                 max_models: int = MODEL_REGISTRY_MAX_MODELS,
+                 warmup_img_size: int = MODEL_WARMUP_IMG_SIZE):
+        """
+        Constructor for the ModelRegistry class.
+
+        :param max_models: Maximum number of models kept in memory.
+        :param warmup_img_size: Size of the blank square image used for the warm-up inference.
+        """
+        self.max_models = max_models
+        self.warmup_img_size = warmup_img_size
+        self._models: "OrderedDict[tuple, RegisteredModel]" = OrderedDict()
+        self._loading: dict = {}
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def make_key(weight_path: str, device: str) -> tuple:
+        """
+        Builds the registry key for a weight file.
+
+        :param weight_path: Path to the weight file.
+        :param device: Device the model runs on.
+        :return: Tuple of (absolute path, mtime, device). The mtime is None for names
+                 that ultralytics resolves itself (e.g. "yolo11n-seg.pt").
+        """
+        path = os.path.abspath(weight_path)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        return (path, mtime, device)
+
+
+    def _load(self, key: tuple) -> RegisteredModel:
+        """
+        Loads the weights for `key` and runs one warm-up inference.
+
+        :param key: Registry key as returned by make_key.
+        :return: The loaded RegisteredModel, keyed by the file's mtime once a missing file was downloaded.
+        """
+        path, _, device = key
+        logging.info(f"Loading model {path} on device {device}")
+
+        # Missing official weights are downloaded to this very path, where the export and
+        # fingerprint helpers look for them
+        model = YOLO(path)
+        blank = np.zeros((self.warmup_img_size, self.warmup_img_size, 3), dtype=np.uint8)
+        model.predict(blank, imgsz=self.warmup_img_size, device=device, verbose=False)
+
+        logging.info(f"Model {path} loaded and warmed up")
+        return RegisteredModel(key=self.make_key(path, device), model=model)
+
+
+    def get(self, weight_path: str, device: str) -> RegisteredModel:
+        """
+        Returns the resident model for a weight file, loading it on first use.
+
+        :param weight_path: Path to the weight file.
+        :param device: Device the model runs on.
+        :return: RegisteredModel for the requested weights.
+        :raises AppException: If the model cannot be loaded.
+        """
+        try:
+            key = self.make_key(weight_path, device)
+
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    return entry
+                load_lock = self._loading.setdefault(key, threading.Lock())
+
+            # Only one thread loads a given key; the others wait and reuse its result
+            try:
+                with load_lock:
+                    with self._lock:
+                        # Keyed by mtime once the first thread downloaded missing weights
+                        entry = self._models.get(key) or self._models.get(self.make_key(weight_path, device))
+                        if entry is not None:
+                            self._models.move_to_end(entry.key)
+                            return entry
+
+                    entry = self._load(key)
+
+                    with self._lock:
+                        # Older versions of the same weights on the same device are stale
+                        for stale in [k for k in self._models if k[0] == key[0] and k[2] == key[2]]:
+                            del self._models[stale]
+                        self._models[entry.key] = entry
+
+                        while len(self._models) > self.max_models:
+                            evicted, _ = self._models.popitem(last=False)
+                            logging.info(f"Evicted model {evicted[0]} ({evicted[2]}) from registry")
+            finally:
+                # Also after a failed load, so no lock is left behind for the key
+                with self._lock:
+                    self._loading.pop(key, None)
+
+            return entry
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def clear(self) -> None:
+        """
+        Drops every resident model.
+        """
+        with self._lock:
+            self._models.clear()
+
+
+# Registry shared by every page and stream in this process
+model_registry: ModelRegistry = ModelRegistry()
+
+
+def get_model(weight_path: str, device: str) -> RegisteredModel:
+    """
+    Returns a model from the process-wide registry.
+
+    :param weight_path: Path to the weight file.
+    :param device: Device the model runs on.
+    :return: RegisteredModel for the requested weights.
+    """
+    return model_registry.get(weight_path, device)
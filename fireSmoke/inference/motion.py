@@ -0,0 +1,96 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from fireSmoke.constant.application import (MOTION_GATE_CHANGED_FRACTION,
+                                            MOTION_GATE_MAX_SKIP,
+                                            MOTION_GATE_PIXEL_THRESHOLD,
+                                            MOTION_GATE_WIDTH)
+
+
+class MotionGate:
+    """
+    Change-detection gate placed in front of inference on a fixed camera.
+
+    Each frame is shrunk to a small grayscale thumbnail and compared with the thumbnail
+    of the last frame that went through the model. When the fraction of changed pixels
+    stays below a threshold the caller reuses the previous detections; after `max_skip`
+    consecutive reused frames inference runs anyway so slow changes are never missed.
+    """
+
+    def __init__(self,
+                 changed_fraction: float = MOTION_GATE_CHANGED_FRACTION,
+                 pixel_threshold: int = MOTION_GATE_PIXEL_THRESHOLD,
+                 max_skip: int = MOTION_GATE_MAX_SKIP,
+                 width: int = MOTION_GATE_WIDTH):
+        """
+        Constructor for the MotionGate class.
+
+        :param changed_fraction: Fraction of changed thumbnail pixels that triggers inference.
+        :param pixel_threshold: Gray-level difference above which a pixel counts as changed.
+        :param max_skip: Maximum number of consecutive frames that reuse the previous result.
+        :param width: Width of the comparison thumbnail.
+        """
+        self.changed_fraction = changed_fraction
+        self.pixel_threshold = pixel_threshold
+        self.max_skip = max_skip
+        self.width = width
+
+        self._reference: Optional[np.ndarray] = None
+        self._consecutive_skips = 0
+        self.frames_inferred = 0
+        self.frames_skipped = 0
+
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        # Light blur so sensor noise and compression artefacts do not count as change
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        """
+        Decides whether a frame needs inference and updates the counters.
+
+        :param frame: BGR frame.
+        :return: True to run the model, False to reuse the previous detections.
+        """
+        thumbnail = self._thumbnail(frame)
+
+        infer = (self._reference is None
+                 or self._reference.shape != thumbnail.shape
+                 or self._consecutive_skips >= self.max_skip)
+        if not infer:
+            diff = cv2.absdiff(thumbnail, self._reference)
+            changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+            infer = changed >= self.changed_fraction * diff.size
+
+        if infer:
+            self._reference = thumbnail
+            self._consecutive_skips = 0
+            self.frames_inferred += 1
+        else:
+            self._consecutive_skips += 1
+            self.frames_skipped += 1
+        return infer
+
+
+    @property
+    def skip_ratio(self) -> float:
+        """
+        Fraction of frames that reused the previous result.
+        """
+        total = self.frames_inferred + self.frames_skipped
+        return self.frames_skipped / total if total else 0.0
+
+
+    def reset(self) -> None:
+        """
+        Forces inference on the next frame.
+        """
+        self._reference = None
+        self._consecutive_skips = 0
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from fireSmoke.constant.application import (RESULT_CACHE_DIR,
+                                            RESULT_CACHE_MAX_DISK_BYTES,
+                                            RESULT_CACHE_MEMORY_ENTRIES)
+from fireSmoke.logger import logging
+
+
+@dataclass
+class CachedResult:
+    """
+    Detection result of one image, as shown and downloaded by the Image Detection page.
+
+    Attributes:
+    - jpeg: Annotated image encoded as JPEG.
+    - records: Compact detections (RLE masks) in original image coordinates.
+    """
+    jpeg: bytes
+    records: list
+
+    @property
+    def n_detections(self) -> int:
+        return len(self.records)
+
+
+def model_fingerprint(engine) -> str:
+    """
+    Identity of the model an InferenceEngine serves: the model file the registry loaded with
+    its size and mtime, the device and the input size. Retrained or re-exported weights change
+    it. Models without a local file (e.g. resolved by name) are identified by their name.
+
+    :param engine: InferenceEngine.
+    :return: Fingerprint string.
+    """
+    for path in (getattr(engine.model, "ckpt_path", None), engine.model_path):
+        if path and os.path.isfile(path):
+            stat = os.stat(path)
+            return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{engine.device}:{engine.imgsz}"
+    return f"{os.path.basename(engine.model_path)}:{engine.device}:{engine.imgsz}"
+
+
+def make_key(image_bytes: bytes, fingerprint: str, conf: float, mode: str = "") -> str:
+    """
+    Cache key of a detection result.
+
+    :param image_bytes: Encoded image as uploaded.
+    :param fingerprint: Fingerprint of the model (see model_fingerprint).
+    :param conf: Confidence threshold.
+    :param mode: Other settings the result depends on, e.g. tiling and its latency budget.
+    :return: Hex digest.
+    """
+    digest = hashlib.sha256(image_bytes)
+    digest.update(f"|{fingerprint}|{conf}|{mode}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of image detection results.
+
+    Recent results are held in memory in least-recently-used order; every result is also
+    written to a directory on disk, so results survive restarts and are shared by every
+    process using the same directory. The disk tier is capped in bytes: the size of every
+    entry is indexed when the cache is created and updated on each write, and the directory is
+    rescanned only when another process added or deleted entries since this one last wrote,
+    so their entries and reads (by file mtime) count too. Once the indexed total goes over the
+    cap, the results read least recently are deleted first. A result found on disk only is
+    promoted to memory.
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = RESULT_CACHE_DIR,
+                 max_entries: int = RESULT_CACHE_MEMORY_ENTRIES,
+                 max_disk_bytes: int = RESULT_CACHE_MAX_DISK_BYTES):
+        """
+        Constructor for the ResultCache class.
+
+        :param cache_dir: Directory of the disk tier; None keeps results in memory only.
+        :param max_entries: Maximum number of results kept in memory.
+        :param max_disk_bytes: Maximum total size of the disk tier.
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # Size of every result on disk as of the last scan plus later writes, oldest read first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._dir_mtime = None # Directory mtime after this process's last scan or write
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk = self._scan()
+            self._dir_mtime = os.stat(cache_dir).st_mtime_ns
+
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.cache_dir, key + extension)
+
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+
+    def _scan(self) -> "OrderedDict[str, int]":
+        """
+        Lists the results on disk with their size, least recently read first. Entries deleted by
+        another process while scanning are left out.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            key = entry.name[:-len(".json")]
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, key, stat.st_size + self._size(self._path(key, ".jpg"))))
+        return OrderedDict((key, size) for _, key, size in sorted(entries))
+
+
+    def _read(self, key: str) -> Optional[CachedResult]:
+        """
+        Reads a result from the disk tier and marks it as recently used.
+        """
+        try:
+            with open(self._path(key, ".jpg"), "rb") as f:
+                jpeg = f.read()
+            with open(self._path(key, ".json"), "r") as f:
+                records = json.load(f)
+            os.utime(self._path(key, ".json"))
+            return CachedResult(jpeg=jpeg, records=records)
+        except (OSError, ValueError):
+            return None # Evicted by another process or partially written
+
+
+    def _write(self, key: str, result: CachedResult) -> None:
+        """
+        Writes a result to the disk tier, then deletes the least recently used results above the cap.
+        """
+        # Entries added or deleted by another process change the directory mtime
+        changed = os.stat(self.cache_dir).st_mtime_ns != self._dir_mtime
+
+        # The records file is written last and marks a complete entry
+        for extension, data, mode in ((".jpg", result.jpeg, "wb"),
+                                      (".json", json.dumps(result.records), "w")):
+            temporary_path = f"{self._path(key, extension)}.{os.getpid()}.tmp"
+            with open(temporary_path, mode) as f:
+                f.write(data)
+            os.replace(temporary_path, self._path(key, extension))
+
+        if changed:
+            # Pick up what other processes wrote, read or evicted since the last scan
+            self._disk = self._scan()
+        else:
+            self._disk[key] = self._size(self._path(key, ".jpg")) + self._size(self._path(key, ".json"))
+        if key in self._disk:
+            self._disk.move_to_end(key) # Just written, even if the clock is coarse
+        total = sum(self._disk.values())
+        while total > self.max_disk_bytes and len(self._disk) > 1:
+            evicted, size = self._disk.popitem(last=False)
+            for extension in (".json", ".jpg"):
+                try:
+                    os.remove(self._path(evicted, extension))
+                except OSError:
+                    pass
+            total -= size
+        self._dir_mtime = os.stat(self.cache_dir).st_mtime_ns
+
+
+    def _remember(self, key: str, result: CachedResult) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """
+        Looks a result up in memory, then on disk.
+
+        :param key: Key from make_key.
+        :return: The cached result, or None on a miss.
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return result
+
+            # Looked up on disk even when missing from the last scan: another process may have written it
+            if self.cache_dir is not None:
+                result = self._read(key)
+                if result is not None:
+                    self._remember(key, result)
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self.disk_hits += 1
+                    return result
+
+            self.misses += 1
+            return None
+
+
+    def put(self, key: str, result: CachedResult) -> None:
+        """
+        Stores a result in both tiers. A failure to write the disk tier is logged and the
+        result is kept in memory only.
+
+        :param key: Key from make_key.
+        :param result: Result to store.
+        """
+        with self._lock:
+            self._remember(key, result)
+            if self.cache_dir is None:
+                return
+            try:
+                self._write(key, result)
+            except OSError as e:
+                logging.warning(f"Could not write result {key} to {self.cache_dir}: {e}")
+
+
+    def stats(self) -> dict:
+        """
+        Hit and miss counters and the size of both tiers.
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {"memory_hits": self.memory_hits,
+                    "disk_hits": self.disk_hits,
+                    "misses": self.misses,
+                    "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                    "memory_entries": len(self._memory),
+                    "disk_entries": len(self._disk),
+                    "disk_bytes": sum(self._disk.values())}
+
+
+    def clear(self) -> None:
+        """
+        Empties both tiers and resets the counters.
+        """
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._scan() if self.cache_dir is not None else []):
+                for extension in (".json", ".jpg"):
+                    try:
+                        os.remove(self._path(key, extension))
+                    except OSError:
+                        pass
+            self._disk.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Returns the process-wide result cache.
+    """
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from fireSmoke.constant.application import (APP_HOST, APP_PORT,
+                                            KEYFRAME_ENABLED,
+                                            MOTION_GATE_ENABLED,
+                                            MULTI_CAMERA_BATCH_SIZE,
+                                            SERVER_JPEG_QUALITY)
+from fireSmoke.exception import AppException
+from fireSmoke.inference.annotator import FrameAnnotator
+from fireSmoke.inference.detections import FrameDetections
+from fireSmoke.inference.engine import InferenceEngine
+from fireSmoke.inference.metrics import get_stage_metrics
+from fireSmoke.inference.multi_camera import (CameraSource, CameraStream,
+                                              MultiCameraScheduler)
+from fireSmoke.logger import logging
+
+
+BOUNDARY = b"frame"
+
+
+@dataclass
+class EncodedFrame:
+    """
+    One processed frame, encoded once and shared by every client.
+
+    Attributes:
+    - seq: Sequence number of the frame within its camera.
+    - timestamp: Wall-clock time the frame was processed.
+    - jpeg: Annotated frame as JPEG bytes.
+    - detections: Detections of the frame as JSON bytes.
+    """
+    seq: int
+    timestamp: float
+    jpeg: bytes
+    detections: bytes
+
+
+class FrameBroadcaster:
+    """
+    Latest-frame slot shared between a camera worker thread and asyncio clients.
+
+    The worker publishes each frame once; clients wait for a frame newer than the
+    one they sent last and always receive the newest. A slow client therefore skips
+    frames instead of holding up the worker or the other clients.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._latest: Optional[EncodedFrame] = None
+        self._changed = asyncio.Event()
+
+
+    @property
+    def latest(self) -> Optional[EncodedFrame]:
+        return self._latest
+
+
+    def publish(self, frame: EncodedFrame) -> None:
+        """
+        Publishes a frame; safe to call from any thread.
+        """
+        self._loop.call_soon_threadsafe(self._set, frame)
+
+
+    def _set(self, frame: EncodedFrame) -> None:
+        self._latest = frame
+        # Wake every waiting client, then arm a fresh event for the next frame
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+    async def wait_newer(self, seq: int) -> EncodedFrame:
+        """
+        Waits until a frame newer than `seq` is available and returns the newest one.
+        """
+        while self._latest is None or self._latest.seq <= seq:
+            await self._changed.wait()
+        return self._latest
+
+
+class MJPEGServer:
+    """
+    Small asyncio HTTP server for the live cameras.
+
+    Endpoints:
+    - GET /cameras                       -> list of camera ids
+    - GET /cameras/<id>/mjpeg            -> multipart/x-mixed-replace MJPEG stream
+    - GET /cameras/<id>/snapshot.jpg     -> latest annotated JPEG
+    - GET /cameras/<id>/detections       -> latest detections as JSON
+    - GET /metrics                       -> per-camera, per-stage latency histograms (Prometheus text format)
+
+    Each camera is captured, inferred and encoded once regardless of the number of viewers;
+    all cameras share one model through a MultiCameraScheduler.
+    """
+
+    def __init__(self,
+                 cameras: List[CameraSource],
+                 engine: Optional[InferenceEngine] = None,
+                 host: str = APP_HOST,
+                 port: int = APP_PORT,
+                 batch_size: int = MULTI_CAMERA_BATCH_SIZE,
+                 jpeg_quality: int = SERVER_JPEG_QUALITY,
+                 motion_gate: bool = MOTION_GATE_ENABLED,
+                 keyframes: bool = KEYFRAME_ENABLED):
+        """
+        Constructor for the MJPEGServer class.
+
+        :param cameras: Cameras to serve.
+        :param engine: InferenceEngine shared by the cameras; created on start if not given.
+        :param host: Address to bind.
+        :param port: Port to bind.
+        :param batch_size: Maximum number of camera frames per inference batch.
+        :param jpeg_quality: JPEG quality of the served frames.
+        :param motion_gate: Whether to reuse detections on frames where a camera's scene did not change.
+        :param keyframes: Whether to run the model on keyframes only and propagate the detections in between.
+        """
+        self.cameras = cameras
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.motion_gate = motion_gate
+        self.keyframes = keyframes
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.broadcasters: Dict[str, FrameBroadcaster] = {}
+        self.annotators: Dict[str, FrameAnnotator] = {}
+        self.scheduler: Optional[MultiCameraScheduler] = None
+        self._scheduler_thread: Optional[threading.Thread] = None
+        self.metrics = get_stage_metrics()
+
+
+    def _publish(self, stream: CameraStream, frame: np.ndarray, detections: FrameDetections) -> None:
+        """
+        Annotates and encodes a processed frame once and hands it to the camera's clients.
+        """
+        with self.metrics.span(stream.camera_id, "annotate"):
+            annotated = self.annotators[stream.camera_id].annotate(frame, detections)
+        with self.metrics.span(stream.camera_id, "encode"):
+            ok, jpeg = cv2.imencode(".jpg", annotated, self.encode_params)
+        if not ok:
+            return
+
+        timestamp = time.time()
+        payload = {"camera": stream.camera_id, "seq": stream.frames_processed, "timestamp": timestamp,
+                   "dropped_frames": stream.capture.frames_dropped,
+                   "reused_frames": stream.motion_gate.frames_skipped if stream.motion_gate else 0,
+                   "propagated_frames": stream.keyframes.frames_propagated if stream.keyframes else 0,
+                   "detections": detections.to_records(mask_format="rle")}
+        self.broadcasters[stream.camera_id].publish(
+            EncodedFrame(seq=stream.frames_processed, timestamp=timestamp, jpeg=jpeg.tobytes(),
+                         detections=json.dumps(payload).encode("utf-8")))
+
+
+    def _run_scheduler(self) -> None:
+        try:
+            self.scheduler.run(on_frame=self._publish)
+        except Exception as e:
+            logging.error(f"Camera scheduler stopped: {AppException(e, sys)}")
+
+
+    def start_cameras(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Opens the cameras and starts the shared scheduler thread.
+        """
+        if self.engine is None:
+            self.engine = InferenceEngine()
+        self.scheduler = MultiCameraScheduler(self.engine, self.cameras, batch_size=self.batch_size,
+                                              motion_gate=self.motion_gate, keyframes=self.keyframes).start()
+        for stream in self.scheduler.streams:
+            # One annotator per camera: annotators reuse their overlay buffer
+            self.broadcasters[stream.camera_id] = FrameBroadcaster(loop)
+            self.annotators[stream.camera_id] = FrameAnnotator(names=self.engine.names)
+
+        self._scheduler_thread = threading.Thread(target=self._run_scheduler, name="camera-scheduler", daemon=True)
+        self._scheduler_thread.start()
+        logging.info(f"Started {len(self.scheduler.streams)} cameras")
+
+
+    def stop_cameras(self) -> None:
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self._scheduler_thread is not None:
+            self._scheduler_thread.join(timeout=5.0)
+
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: str, content_type: str, body: bytes) -> None:
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nCache-Control: no-cache\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+
+    async def _stream_mjpeg(self, writer: asyncio.StreamWriter, broadcaster: FrameBroadcaster) -> None:
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: multipart/x-mixed-replace; boundary=" + BOUNDARY + b"\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+
+        seq = 0
+        while True:
+            frame = await broadcaster.wait_newer(seq)
+            seq = frame.seq
+            writer.write(b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+                         b"Content-Length: " + str(len(frame.jpeg)).encode() + b"\r\n\r\n"
+                         + frame.jpeg + b"\r\n")
+            # Waits only on this client's socket; frames published meanwhile are skipped
+            await writer.drain()
+
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serves one HTTP connection.
+        """
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass # Headers are not needed
+            if len(request_line) < 2 or request_line[0] != "GET":
+                await self._send(writer, "405 Method Not Allowed", "text/plain", b"Method not allowed")
+                return
+
+            parts = [p for p in request_line[1].split("?")[0].split("/") if p]
+            if parts == ["cameras"]:
+                await self._send(writer, "200 OK", "application/json",
+                                 json.dumps(sorted(self.broadcasters)).encode("utf-8"))
+                return
+            if parts == ["metrics"]:
+                await self._send(writer, "200 OK", "text/plain; version=0.0.4; charset=utf-8",
+                                 self.metrics.to_prometheus().encode("utf-8"))
+                return
+
+            if len(parts) != 3 or parts[0] != "cameras" or parts[1] not in self.broadcasters:
+                await self._send(writer, "404 Not Found", "text/plain", b"Not found")
+                return
+
+            broadcaster = self.broadcasters[parts[1]]
+            if parts[2] == "mjpeg":
+                await self._stream_mjpeg(writer, broadcaster)
+            elif parts[2] in ("snapshot.jpg", "detections"):
+                frame = broadcaster.latest or await broadcaster.wait_newer(0)
+                if parts[2] == "snapshot.jpg":
+                    await self._send(writer, "200 OK", "image/jpeg", frame.jpeg)
+                else:
+                    await self._send(writer, "200 OK", "application/json", frame.detections)
+            else:
+                await self._send(writer, "404 Not Found", "text/plain", b"Not found")
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # Client went away
+        finally:
+            writer.close()
+
+
+    async def serve(self) -> None:
+        """
+        Starts the cameras and serves HTTP until cancelled.
+        """
+        self.start_cameras(asyncio.get_running_loop())
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        logging.info(f"Serving {len(self.cameras)} cameras on http://{self.host}:{self.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.stop_cameras()
+
+
+    def run(self) -> None:
+        """
+        Runs the server until interrupted.
+        """
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logging.info("MJPEG server stopped")
@@ -0,0 +1,88 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from fireSmoke.inference.annotator import FrameAnnotator
+from fireSmoke.inference.detections import FrameDetections
+from fireSmoke.inference.keyframe import KeyframePropagator
+from fireSmoke.inference.metrics import get_stage_metrics
+from fireSmoke.inference.motion import MotionGate
+from fireSmoke.inference.tracking import StreamTracker
+
+
+class StreamProcessor:
+    """
+    Per-stream detection step shared by the live pages and the streaming helpers:
+    runs the model on a frame, converts the result to host arrays once and draws the
+    annotations in place.
+    """
+
+    def __init__(self,
+                 engine,
+                 annotator: Optional[FrameAnnotator] = None,
+                 track: bool = True,
+                 conf: float = 0.25,
+                 motion_gate: Optional[MotionGate] = None,
+                 camera: str = "default",
+                 keyframes: Optional[KeyframePropagator] = None):
+        """
+        Constructor for the StreamProcessor class.
+
+        :param engine: InferenceEngine used for detection.
+        :param annotator: Annotator used to draw the detections.
+        :param track: Whether to run tracking (persistent ids) or plain detection.
+        :param conf: Confidence threshold.
+        :param motion_gate: Optional gate that reuses the previous detections on unchanged frames.
+        :param camera: Camera label of the stage metrics of this stream.
+        :param keyframes: Optional propagator that runs the model on keyframes only and carries
+                          their detections over the frames in between.
+        """
+        self.engine = engine
+        self.annotator = annotator or FrameAnnotator()
+        self.track = track
+        self.conf = conf
+        # Each stream keeps its own tracker so streams can share one model
+        self.tracker = StreamTracker() if track else None
+        self.motion_gate = motion_gate
+        self.keyframes = keyframes
+        self._last_detections: Optional[FrameDetections] = None
+        self.camera = str(camera)
+        self.metrics = get_stage_metrics()
+
+
+    def detect(self, frame: np.ndarray) -> FrameDetections:
+        """
+        Runs the model on one frame.
+
+        :param frame: BGR frame.
+        :return: Detections at the frame's resolution.
+        """
+        result = self.engine.predict(frame, conf=self.conf)[0]
+        self.metrics.observe_result(self.camera, result)
+        if self.tracker is not None:
+            result = self.tracker.update(result)
+        return FrameDetections.from_ultralytics(result)
+
+
+    def process(self, frame: np.ndarray) -> Tuple[np.ndarray, FrameDetections]:
+        """
+        Detects and annotates one frame. The frame is drawn on in place.
+
+        :param frame: BGR frame owned by the caller.
+        :return: (annotated frame, detections).
+        """
+        # The gate always asks for inference on its first frame, so a previous result exists when it skips
+        if self.motion_gate is None or self.motion_gate.should_infer(frame):
+            if self.keyframes is not None and not self.keyframes.needs_keyframe():
+                with self.metrics.span(self.camera, "propagate"):
+                    detections = self.keyframes.propagate(frame)
+            else:
+                detections = self.detect(frame)
+                if self.keyframes is not None:
+                    self.keyframes.keyframe(frame, detections)
+            self._last_detections = detections
+        else:
+            detections = self._last_detections
+        with self.metrics.span(self.camera, "annotate"):
+            annotated = self.annotator.annotate(frame, detections)
+        return annotated, detections
@@ -0,0 +1,221 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from fireSmoke.constant.application import (BATCH_DECODE_WORKERS,
+                                            BATCH_INFERENCE_SIZE,
+                                            TILING_LATENCY_BUDGET,
+                                            TILING_MATCH_THRESHOLD,
+                                            TILING_OVERLAP)
+from fireSmoke.exception import AppException
+from fireSmoke.inference.batch import iter_batches
+from fireSmoke.inference.detections import FrameDetections
+from fireSmoke.logger import logging
+
+
+@dataclass
+class TiledResult:
+    """
+    Detections of one image made from overlapping tiles.
+
+    Attributes:
+    - detections: Merged detections in full-image coordinates.
+    - tiles_total: Number of tiles the image was split into.
+    - tiles_processed: Number of tiles run before the latency budget ran out.
+    - seconds: Total time spent on the image.
+    """
+    detections: FrameDetections
+    tiles_total: int
+    tiles_processed: int
+    seconds: float
+
+
+    @property
+    def budget_exceeded(self) -> bool:
+        return self.tiles_processed < self.tiles_total
+
+
+def tile_origins(length: int, tile_size: int, overlap: float) -> List[int]:
+    """
+    Start offsets of overlapping tiles along one axis; the last tile is aligned to the edge.
+
+    :param length: Image size along the axis.
+    :param tile_size: Tile size along the axis.
+    :param overlap: Fraction of the tile shared with its neighbour.
+    :return: Sorted tile start offsets.
+    """
+    if length <= tile_size:
+        return [0]
+    step = max(1, int(tile_size * (1 - overlap)))
+    origins = list(range(0, length - tile_size, step))
+    origins.append(length - tile_size)
+    return origins
+
+
+def _pairwise_ios(xyxy: np.ndarray) -> np.ndarray:
+    """
+    Intersection over the smaller box for every pair of boxes.
+    """
+    x1 = np.maximum(xyxy[:, None, 0], xyxy[None, :, 0])
+    y1 = np.maximum(xyxy[:, None, 1], xyxy[None, :, 1])
+    x2 = np.minimum(xyxy[:, None, 2], xyxy[None, :, 2])
+    y2 = np.minimum(xyxy[:, None, 3], xyxy[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    smaller = np.minimum(area[:, None], area[None, :])
+    return intersection / np.maximum(smaller, 1e-6)
+
+
+class TiledDetector:
+    """
+    Sliced inference for images much larger than the model input.
+
+    The image is covered by overlapping model-sized tiles, so small distant objects
+    keep their pixels instead of being shrunk away. One downscaled full-image pass runs
+    first for large objects, then tile crops are prepared in a thread pool and run
+    through the model in batches until the latency budget is spent. Detections of the
+    same class that overlap across tiles are merged greedily: the most confident one is
+    kept, its box grows to cover the matches and their masks are united.
+    """
+
+    def __init__(self,
+                 engine,
+                 overlap: float = TILING_OVERLAP,
+                 match_threshold: float = TILING_MATCH_THRESHOLD,
+                 latency_budget: Optional[float] = TILING_LATENCY_BUDGET,
+                 batch_size: int = BATCH_INFERENCE_SIZE,
+                 workers: int = BATCH_DECODE_WORKERS,
+                 conf: float = 0.25):
+        """
+        Constructor for the TiledDetector class.
+
+        :param engine: InferenceEngine used for prediction; tiles match its input size.
+        :param overlap: Fraction of each tile shared with its neighbours.
+        :param match_threshold: Intersection over the smaller box above which two detections are merged.
+        :param latency_budget: Seconds per image after which remaining tiles are skipped; None for no limit.
+        :param batch_size: Number of tiles per inference batch.
+        :param workers: Number of tile preparation threads.
+        :param conf: Confidence threshold.
+        """
+        self.engine = engine
+        self.tile_size = engine.imgsz
+        self.overlap = overlap
+        self.match_threshold = match_threshold
+        self.latency_budget = latency_budget
+        self.batch_size = batch_size
+        self.workers = workers
+        self.conf = conf
+
+
+    def tiles(self, image: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        (x, y) origins of the tiles covering an image, row by row from the top.
+        """
+        height, width = image.shape[:2]
+        return [(x, y) for y in tile_origins(height, self.tile_size, self.overlap)
+                for x in tile_origins(width, self.tile_size, self.overlap)]
+
+
+    def _crop(self, image: np.ndarray, origin: Tuple[int, int]) -> np.ndarray:
+        x, y = origin
+        return np.ascontiguousarray(image[y:y + self.tile_size, x:x + self.tile_size])
+
+
+    def merge(self, parts: List[Tuple[FrameDetections, Tuple[int, int]]],
+              image_shape: Tuple[int, int], names: dict) -> FrameDetections:
+        """
+        Merges per-tile detections into full-image detections.
+
+        :param parts: (detections in tile coordinates, (x, y) tile origin) pairs.
+        :param image_shape: (height, width) of the full image.
+        :param names: Class id to class name mapping.
+        :return: Merged detections with full-image masks.
+        """
+        parts = [(detections, origin) for detections, origin in parts if len(detections)]
+        if not parts:
+            return FrameDetections.empty(image_shape, names=names)
+
+        xyxy = np.concatenate([d.xyxy + np.array([x, y, x, y], dtype=np.float32) for d, (x, y) in parts])
+        confidence = np.concatenate([d.confidence for d, _ in parts])
+        class_id = np.concatenate([d.class_id for d, _ in parts])
+        # (part index, row in part) of every detection, to find its mask without concatenating masks
+        sources = [(p, i) for p, (d, _) in enumerate(parts) for i in range(len(d))]
+        with_masks = all(d.masks is not None for d, _ in parts)
+
+        ios = _pairwise_ios(xyxy)
+        same_class = class_id[:, None] == class_id[None, :]
+        matches = (ios >= self.match_threshold) & same_class
+
+        order = np.argsort(-confidence, kind="stable")
+        merged = np.zeros(len(order), dtype=bool)
+        keep_xyxy, keep_conf, keep_cls, keep_masks = [], [], [], []
+        height, width = image_shape
+        for index in order:
+            if merged[index]:
+                continue
+            group = np.flatnonzero(matches[index] & ~merged)
+            merged[group] = True
+
+            keep_xyxy.append(np.concatenate([xyxy[group, :2].min(0), xyxy[group, 2:].max(0)]))
+            keep_conf.append(confidence[index])
+            keep_cls.append(class_id[index])
+            if with_masks:
+                mask = np.zeros((height, width), dtype=bool)
+                for member in group:
+                    part, row = sources[member]
+                    tile_mask = parts[part][0].masks[row]
+                    x, y = parts[part][1]
+                    mask[y:y + tile_mask.shape[0], x:x + tile_mask.shape[1]] |= tile_mask
+                keep_masks.append(mask)
+
+        return FrameDetections(xyxy=np.array(keep_xyxy, dtype=np.float32),
+                               confidence=np.array(keep_conf, dtype=np.float32),
+                               class_id=np.array(keep_cls, dtype=int),
+                               tracker_id=None,
+                               masks=np.stack(keep_masks) if with_masks else None,
+                               names=names,
+                               orig_shape=(height, width))
+
+
+    def detect(self, image: np.ndarray) -> TiledResult:
+        """
+        Runs sliced inference on one image.
+
+        :param image: BGR image of any size.
+        :return: TiledResult with the merged detections and the tile counts.
+        :raises AppException: If inference fails.
+        """
+        try:
+            start = time.perf_counter()
+            height, width = image.shape[:2]
+
+            # Full-image pass: catches objects larger than a tile
+            full = FrameDetections.from_ultralytics(self.engine.predict(image, conf=self.conf)[0])
+            parts = [(full, (0, 0))]
+            origins = self.tiles(image) if max(height, width) > self.tile_size else []
+
+            tiles_processed = 0
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                crops = executor.map(lambda origin: (origin, self._crop(image, origin)), origins)
+                for batch in iter_batches(crops, self.batch_size):
+                    if self.latency_budget is not None and time.perf_counter() - start > self.latency_budget:
+                        break
+                    results = self.engine.predict([crop for _, crop in batch], conf=self.conf)
+                    parts.extend((FrameDetections.from_ultralytics(result), origin)
+                                 for (origin, _), result in zip(batch, results))
+                    tiles_processed += len(batch)
+
+            if tiles_processed < len(origins):
+                logging.info(f"Tiled inference stopped after {tiles_processed}/{len(origins)} tiles: "
+                             f"latency budget of {self.latency_budget}s reached")
+
+            detections = self.merge(parts, (height, width), names=full.names)
+            return TiledResult(detections=detections, tiles_total=len(origins), tiles_processed=tiles_processed,
+                               seconds=time.perf_counter() - start)
+
+        except Exception as e:
+            raise AppException(e, sys)
@@ -0,0 +1,49 @@
+import torch
+from ultralytics.engine.results import Results
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.utils import YAML, IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+
+class StreamTracker:
+    """
+    ByteTrack state owned by a single stream.
+
+    model.track(persist=True) keeps its tracker on the model, so every stream sharing
+    a model would feed the same tracker. Keeping one StreamTracker per stream lets any
+    number of streams share a model (and its batches) with independent track ids.
+    """
+
+    def __init__(self, tracker_config: str = "bytetrack.yaml"):
+        """
+        Constructor for the StreamTracker class.
+
+        :param tracker_config: ultralytics ByteTrack configuration file.
+        """
+        cfg = IterableSimpleNamespace(**YAML.load(check_yaml(tracker_config)))
+        self._tracker = BYTETracker(args=cfg)
+
+
+    def update(self, result: Results) -> Results:
+        """
+        Associates the detections of one frame with the tracks of this stream.
+
+        :param result: ultralytics Results of the stream's newest frame.
+        :return: Results restricted to tracked objects, with track ids in the boxes. Without
+                 matched tracks the detections are kept without ids, unless new tracks are
+                 still waiting for confirmation (as model.track does).
+        """
+        tracks = self._tracker.update(result.boxes.cpu().numpy(), result.orig_img)
+        if len(tracks) == 0:
+            if any(not track.is_activated for track in self._tracker.tracked_stracks):
+                return result[:0] # Hide new tracks until they are confirmed
+            return result
+
+        # Last column is the index of the detection each track was matched to
+        tracked = result[tracks[:, -1].astype(int)]
+        tracked.update(boxes=torch.as_tensor(tracks[:, :-1], device=result.boxes.data.device))
+        return tracked
+
+
+    def reset(self) -> None:
+        self._tracker.reset()
@@ -1,24 +1,231 @@
-import logging 
+import atexit
+import json
+import logging
+import multiprocessing.util
 import os
+import queue
+import shutil
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from from_root import from_root
 
+from fireSmoke.constant.application import (LOG_BACKUP_COUNT, LOG_DIR_NAME,
+                                            LOG_FORMAT, LOG_MAX_BYTES,
+                                            LOG_MAX_FILES, LOG_QUEUE_SIZE,
+                                            LOG_RATE_LIMIT_INTERVAL,
+                                            LOG_STOP_TIMEOUT)
 
-# Generate a unique log file name based on the current date and time
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as JSON lines for log shippers.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"time": self.formatTime(record),
+                 "logger": record.name,
+                 "level": record.levelname,
+                 "message": record.getMessage(),
+                 "process": record.process,
+                 "thread": record.threadName}
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking when the writer thread falls behind.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so the record is queued as is instead of being copied
+        # and formatted by the calling thread; only the arguments are merged into the message
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StoppableQueueListener(QueueListener):
+    """
+    QueueListener whose stop() waits at most `timeout` for room in a full queue, then writes the
+    records still queued. Runs its own writer thread, so it does not rely on the base class internals.
+    """
+
+    _stop_marker = object()
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler, respect_handler_level: bool = False):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self._writer = None
+
+
+    def start(self) -> None:
+        self._writer = threading.Thread(target=self._write_records, name="log-writer", daemon=True)
+        self._writer.start()
+
+
+    def _write_records(self) -> None:
+        while True:
+            record = self.dequeue(True)
+            if record is self._stop_marker:
+                break
+            self.handle(record)
+
+
+    def stop(self, timeout: float = None) -> bool:
+        """
+        Stops the writer thread once the records queued before the call are written; safe to
+        call more than once.
+
+        :param timeout: Seconds to wait for room in a full queue and for the writer thread to finish.
+        :return: Whether every queued record was written.
+        """
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return True
+        try:
+            # Blocks while the queue is full, unlike QueueListener.stop()
+            self.queue.put(self._stop_marker, timeout=timeout)
+        except queue.Full:
+            return False # The writer thread is stuck
+        writer.join(timeout)
+        if writer.is_alive():
+            return False
+
+        # Records queued by other threads after the stop marker
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                return True
+            if record is not self._stop_marker:
+                self.handle(record)
+
+
+def _process_alive(pid: int) -> bool:
+    """
+    Whether a process with this id is running. Only checked on POSIX: Windows refuses to
+    delete a log file that is still open, and os.kill would terminate the process there.
+    """
+    if os.name == "nt":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True # Running under another user
+    return True
+
+
+def prune_log_files(log_dir: str, max_files: int) -> None:
+    """
+    Deletes the oldest log files so at most `max_files` runs are kept, rotated backups included.
+    Directories named `<run>.log`, left by earlier versions that put each log file in its own
+    directory, count as runs too. Files of processes that are still running are kept, so a
+    worker started later cannot delete the log of an idle app process.
+    """
+    runs = {}
+    for name in os.listdir(log_dir):
+        if ".log" in name:
+            runs.setdefault(name.split(".log")[0], []).append(os.path.join(log_dir, name))
+    ordered = sorted(runs.items(), key=lambda run: max(os.path.getmtime(path) for path in run[1]))
+    for run, paths in ordered[:max(len(ordered) - max_files, 0)]:
+        pid = run.rsplit("_", 1)[-1]
+        if pid.isdigit() and _process_alive(int(pid)):
+            continue
+        for path in paths:
+            try:
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+            except OSError:
+                pass # Still open in another process on some platforms
+
+
+_throttle_state = {}
+_throttle_lock = threading.Lock()
+
+
+def log_throttled(key: str, message: str, level: int = logging.INFO,
+                  interval: float = LOG_RATE_LIMIT_INTERVAL) -> None:
+    """
+    Logs a message at most once per `interval` seconds for the same key. Meant for per-frame
+    events of the live loops; the number of suppressed messages is appended to the next one.
+
+    :param key: Identifies the event, e.g. "capture-read-failed:<source>".
+    :param message: Message to log.
+    :param level: Logging level.
+    :param interval: Minimum seconds between two messages of the same key.
+    """
+    now = time.monotonic()
+    with _throttle_lock:
+        last, suppressed = _throttle_state.get(key, (float("-inf"), 0))
+        if now - last < interval:
+            _throttle_state[key] = (last, suppressed + 1)
+            return
+        _throttle_state[key] = (now, 0)
+    if suppressed:
+        message = f"{message} ({suppressed} similar messages suppressed)"
+    logging.log(level, message)
+
+
+# One log file per process (named by start time and pid), rotated by size; old runs are pruned
+LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}_{os.getpid()}.log"
 
 # Define the directory path for storing log files
-log_path = os.path.join(from_root(), 'log', LOG_FILE)
+log_path = os.path.join(from_root(), LOG_DIR_NAME)
 
 # Ensure the log directory exists
 os.makedirs(log_path, exist_ok=True)
+prune_log_files(log_path, LOG_MAX_FILES - 1)
 
 # Define the full path for the log file
 LOG_FILE_PATH = os.path.join(log_path, LOG_FILE)
 
+# Records are queued by the calling thread and written to disk by the listener thread
+file_handler = RotatingFileHandler(LOG_FILE_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                   encoding="utf-8", delay=True)
+file_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else
+                          logging.Formatter("[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s"))
+
+queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+listener = StoppableQueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Writes the queued records and stops the writer thread; safe to call more than once.
+    """
+    listener.stop(timeout=LOG_STOP_TIMEOUT) # False when the writer thread is stuck; nothing left to log to then
+    if queue_handler.dropped:
+        file_handler.handle(logging.makeLogRecord({"msg": f"{queue_handler.dropped} log records dropped, "
+                                                          f"the log queue was full",
+                                                   "levelname": "WARNING", "levelno": logging.WARNING}))
+        queue_handler.dropped = 0
+    file_handler.close()
+
+
+# Worker processes exit without running atexit handlers, but run multiprocessing finalizers
+atexit.register(stop_logging)
+multiprocessing.util.Finalize(None, stop_logging, exitpriority=0)
+
 # Configure the logging settings
 logging.basicConfig(
-    filename = LOG_FILE_PATH,
-    format = "[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s",
+    handlers = [queue_handler],
     level = logging.INFO
-)
\ No newline at end of file
+)
@@ -0,0 +1,271 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from fireSmoke.constant.application import BATCH_INFERENCE_IMAGE_EXTENSIONS
+from fireSmoke.entity.artifacts_entity import BatchInferenceArtifact
+from fireSmoke.entity.config_entity import BatchInferenceConfig
+from fireSmoke.exception import AppException
+from fireSmoke.inference.batch import decode_image, iter_batches
+from fireSmoke.inference.detections import FrameDetections
+from fireSmoke.inference.engine import InferenceEngine
+from fireSmoke.logger import logging
+
+
+class BatchInferencePipeline:
+    """
+    This class streams a folder of images or a video file through the model and writes
+    the detections as JSON lines. Progress is checkpointed periodically so an
+    interrupted run resumes from the last checkpoint instead of starting over.
+    """
+
+    def __init__(self, batch_inference_config: BatchInferenceConfig):
+        """
+        Constructor for the BatchInferencePipeline class.
+
+        :param batch_inference_config: Configuration with the source, output path and batching options.
+        """
+        self.config = batch_inference_config
+        self.checkpoint_file_path = f"{self.config.output_file_path}.ckpt.json"
+
+
+    def _run_signature(self) -> dict:
+        """
+        Settings a checkpoint must match to be resumed.
+        """
+        return {
+            "source": os.path.abspath(self.config.source),
+            "weight_path": os.path.abspath(self.config.weight_path),
+            "conf": self.config.conf,
+            "frame_stride": self.config.frame_stride,
+            "mask_format": self.config.mask_format,
+        }
+
+
+    def load_checkpoint(self, restart: bool = False) -> dict:
+        """
+        Loads the checkpoint of a previous run over the same source.
+
+        :param restart: Ignore any existing checkpoint and start from the beginning.
+        :return: Checkpoint state; a fresh state if there is nothing to resume.
+        :raises AppException: If the checkpoint belongs to a run with different settings.
+        """
+        try:
+            fresh = {"next_index": 0, "output_bytes": 0, "frames_processed": 0, "completed": False}
+            if restart or not os.path.exists(self.checkpoint_file_path):
+                return fresh
+
+            with open(self.checkpoint_file_path, "r") as f:
+                state = json.load(f)
+
+            if state.get("signature") != self._run_signature():
+                raise Exception(f"Checkpoint {self.checkpoint_file_path} was written for a different run; "
+                                f"use a different output file or restart")
+
+            logging.info(f"Resuming batch inference from frame {state['next_index']}")
+            return state
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def save_checkpoint(self, state: dict) -> None:
+        """
+        Atomically writes the checkpoint state next to the output file.
+
+        :param state: Checkpoint state to persist.
+        """
+        state = dict(state, signature=self._run_signature())
+        tmp_path = f"{self.checkpoint_file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_file_path)
+
+
+    def list_images(self) -> list:
+        """
+        Lists the image files under the source folder in a stable order.
+        """
+        images = []
+        for root, _, files in os.walk(self.config.source):
+            for file in files:
+                if file.lower().endswith(BATCH_INFERENCE_IMAGE_EXTENSIONS):
+                    images.append(os.path.join(root, file))
+        return sorted(images)
+
+
+    def iter_image_frames(self, start_index: int) -> Iterator[Tuple[int, str, Optional[np.ndarray]]]:
+        """
+        Decodes the images of the source folder in a thread pool with bounded read-ahead.
+
+        :param start_index: Index of the first image to yield.
+        :yield: (image index, image path, BGR image); the image is None for files that cannot be read.
+        """
+        images = self.list_images()
+        indices = range(start_index, len(images), self.config.frame_stride)
+        depth = self.config.workers * self.config.batch_size
+
+        def load(index: int) -> Tuple[int, str, Optional[np.ndarray]]:
+            # A truncated or corrupt file must not stop the run, or every resume would stop on it again
+            try:
+                with open(images[index], "rb") as f:
+                    return index, images[index], decode_image(f.read())
+            except Exception as e:
+                logging.warning(f"Skipping unreadable image {images[index]}: {e}")
+                return index, images[index], None
+
+        with ThreadPoolExecutor(max_workers=self.config.workers) as executor:
+            pending = deque()
+            for index in indices:
+                pending.append(executor.submit(load, index))
+                if len(pending) >= depth:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+    def iter_video_frames(self, start_index: int) -> Iterator[Tuple[int, str, np.ndarray]]:
+        """
+        Decodes the source video on a reader thread, skipping strided frames without decoding them.
+
+        :param start_index: Index of the first frame to yield.
+        :yield: (frame index, video path, BGR frame).
+        """
+        cap = cv2.VideoCapture(self.config.source)
+        if not cap.isOpened():
+            raise Exception(f"Unable to open video {self.config.source}")
+
+        # Seeking is approximate for some codecs; fall back to grabbing up to the start frame
+        if start_index:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_index)
+            if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start_index:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                for _ in range(start_index):
+                    cap.grab()
+
+        frames = queue.Queue(maxsize=2 * self.config.batch_size)
+        stop_event = threading.Event()
+
+        def reader() -> None:
+            index = start_index
+            try:
+                while not stop_event.is_set() and cap.grab():
+                    if (index - start_index) % self.config.frame_stride == 0:
+                        ok, frame = cap.retrieve()
+                        if ok:
+                            frames.put((index, self.config.source, frame))
+                    index += 1
+            finally:
+                frames.put(None)
+
+        thread = threading.Thread(target=reader, name="batch-inference-reader", daemon=True)
+        thread.start()
+        try:
+            while (item := frames.get()) is not None:
+                yield item
+        finally:
+            stop_event.set()
+            # Unblock the reader if it is waiting on a full queue
+            while thread.is_alive():
+                try:
+                    frames.get_nowait()
+                except queue.Empty:
+                    thread.join(timeout=0.1)
+            cap.release()
+
+
+    def run(self, restart: bool = False) -> BatchInferenceArtifact:
+        """
+        Runs batch inference over the source, resuming from the last checkpoint.
+
+        :param restart: Ignore any existing checkpoint and start from the beginning.
+        :return: BatchInferenceArtifact with the output path and throughput.
+        :raises AppException: If reading, inference or writing fails.
+        """
+        logging.info("Entered the run method of BatchInferencePipeline class")
+        try:
+            state = self.load_checkpoint(restart=restart)
+            if state["completed"]:
+                logging.info(f"Batch inference over {self.config.source} already completed")
+                return BatchInferenceArtifact(output_file_path=self.config.output_file_path,
+                                              frames_processed=0, frames_per_second=0.0)
+
+            os.makedirs(os.path.dirname(self.config.output_file_path) or ".", exist_ok=True)
+            # Drop lines written after the last checkpoint; they are produced again below
+            with open(self.config.output_file_path, "ab") as out:
+                out.truncate(state["output_bytes"])
+
+            engine = InferenceEngine(self.config.weight_path, device=self.config.device)
+            if os.path.isdir(self.config.source):
+                frames = self.iter_image_frames(state["next_index"])
+            else:
+                frames = self.iter_video_frames(state["next_index"])
+
+            frames_processed = 0
+            since_checkpoint = 0
+            start = time.perf_counter()
+
+            with open(self.config.output_file_path, "ab") as out:
+                def checkpoint(completed: bool = False) -> None:
+                    out.flush()
+                    os.fsync(out.fileno())
+                    self.save_checkpoint(dict(state, output_bytes=out.tell(), completed=completed))
+
+                try:
+                    for batch in iter_batches(frames, self.config.batch_size):
+                        readable = [frame for _, _, frame in batch if frame is not None]
+                        results = iter(engine.predict(readable, conf=self.config.conf) if readable else [])
+
+                        lines = []
+                        for index, name, frame in batch:
+                            if frame is None:
+                                lines.append(json.dumps({"source": name, "frame": index,
+                                                         "error": "Unreadable image"}))
+                                continue
+                            detections = FrameDetections.from_ultralytics(
+                                next(results), with_masks=self.config.mask_format is not None)
+                            lines.append(json.dumps({"source": name, "frame": index,
+                                                     "detections": detections.to_records(self.config.mask_format)}))
+                        out.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+                        frames_processed += len(batch)
+                        since_checkpoint += len(batch)
+                        state["next_index"] = batch[-1][0] + self.config.frame_stride
+                        state["frames_processed"] += len(batch)
+
+                        if since_checkpoint >= self.config.checkpoint_every:
+                            checkpoint()
+                            since_checkpoint = 0
+                            logging.info(f"Checkpoint at frame {state['next_index']}, "
+                                         f"{state['frames_processed']} frames processed")
+
+                    checkpoint(completed=True)
+
+                except BaseException:
+                    # Keep everything finished so far so the next run resumes after it
+                    checkpoint()
+                    raise
+
+            elapsed = time.perf_counter() - start
+            artifact = BatchInferenceArtifact(
+                output_file_path=self.config.output_file_path,
+                frames_processed=frames_processed,
+                frames_per_second=frames_processed / elapsed if elapsed > 0 else 0.0
+            )
+
+            logging.info("Exited the run method of BatchInferencePipeline class")
+            logging.info(f"Batch inference artifact: {artifact}")
+
+            return artifact
+
+        except Exception as e:
+            raise AppException(e, sys)
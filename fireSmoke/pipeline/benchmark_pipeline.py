@@ -0,0 +1,326 @@
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+import supervision as sv
+import torch
+from ultralytics import YOLO
+from ultralytics.engine.results import Results
+
+from fireSmoke.constant.application import BATCH_INFERENCE_IMAGE_EXTENSIONS
+from fireSmoke.entity.artifacts_entity import BenchmarkArtifact
+from fireSmoke.entity.config_entity import BenchmarkConfig
+from fireSmoke.exception import AppException
+from fireSmoke.inference.annotator import FrameAnnotator, draw_fps
+from fireSmoke.inference.batch import decode_image
+from fireSmoke.inference.detections import FrameDetections
+from fireSmoke.inference.engine import InferenceEngine
+from fireSmoke.logger import logging
+
+# Stages summed into the end-to-end time of a frame: the path of the streaming pages
+END_TO_END_STAGES = ("decode", "preprocess", "inference", "postprocess", "annotate_frame_annotator", "encode")
+
+# Settings a baseline must share with the run to be comparable
+BASELINE_SETTINGS = ("model", "source", "frames", "frame_size", "imgsz", "device", "num_threads", "instances", "jpeg_quality")
+
+
+def summarize(timings: List[float]) -> dict:
+    """
+    Latency percentiles and throughput of one stage.
+
+    :param timings: Per-frame times in milliseconds.
+    :return: p50, p95, p99 and mean in milliseconds, and frames per second.
+    """
+    values = np.asarray(timings, dtype=np.float64)
+    mean = float(values.mean())
+    return {"p50": round(float(np.percentile(values, 50)), 3),
+            "p95": round(float(np.percentile(values, 95)), 3),
+            "p99": round(float(np.percentile(values, 99)), 3),
+            "mean": round(mean, 3),
+            "fps": round(1000.0 / mean, 2) if mean > 0 else 0.0}
+
+
+def compare_to_baseline(stages: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Lists the stages whose p50 or p95 got slower than the baseline allows.
+
+    :param stages: Summaries of the current run by stage.
+    :param baseline: Summaries of the baseline run by stage.
+    :param tolerance: Allowed relative slowdown, e.g. 0.15 for 15%.
+    :return: One message per regressed stage and percentile.
+    """
+    regressions = []
+    for stage, reference in baseline.items():
+        if stage not in stages:
+            continue
+        for percentile in ("p50", "p95"):
+            limit = reference[percentile] * (1 + tolerance)
+            if stages[stage][percentile] > limit:
+                regressions.append(f"{stage} {percentile} {stages[stage][percentile]:.3f} ms > "
+                                   f"{limit:.3f} ms (baseline {reference[percentile]:.3f} ms + {tolerance:.0%})")
+    return regressions
+
+
+class BenchmarkPipeline:
+    """
+    This class times every stage of serving a frame on CPU without network access:
+    decode, preprocess, inference, postprocess, annotate and JPEG encode.
+
+    Frames are synthetic (seeded) or recorded (an image folder or a video). The model is
+    built from an architecture YAML with seeded random weights, or loaded from a local weight
+    file, and run through the InferenceEngine as the app runs it. Untrained models detect
+    nothing, so the annotate stages draw the same seeded set of instances on every frame
+    with each of the drawing paths: FrameAnnotator (gen_frames and the pages), supervision
+    MaskAnnotator + LabelAnnotator, and ultralytics `Results.plot()`.
+    """
+
+    def __init__(self, benchmark_config: BenchmarkConfig):
+        """
+        Constructor for the BenchmarkPipeline class.
+
+        :param benchmark_config: Configuration of the model, frames and baseline.
+        """
+        self.config = benchmark_config
+
+
+    def build_model(self) -> str:
+        """
+        Resolves the model to benchmark to a local weight file.
+
+        Architecture YAMLs are built with seeded random weights and saved next to the
+        output file once, so repeated runs load (and export) the same model.
+
+        :return: Path to the weight file.
+        :raises AppException: If the weight file does not exist.
+        """
+        try:
+            model = self.config.model
+            if not model.endswith((".yaml", ".yml")):
+                if not os.path.exists(model):
+                    raise Exception(f"Weight file {model} not found; the benchmark does not download weights")
+                return model
+
+            stem = os.path.splitext(os.path.basename(model))[0]
+            weight_path = os.path.join(os.path.dirname(self.config.output_file_path) or ".",
+                                       f"{stem}_seed{self.config.seed}.pt")
+            if not os.path.exists(weight_path):
+                os.makedirs(os.path.dirname(weight_path) or ".", exist_ok=True)
+                torch.manual_seed(self.config.seed)
+                YOLO(model, task="segment").save(weight_path)
+                logging.info(f"Built {model} with random weights into {weight_path}")
+            return weight_path
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def synthetic_frame(self, rng: np.random.Generator, index: int) -> np.ndarray:
+        """
+        A camera-like frame: a gradient background with texture and a few moving blobs.
+        """
+        width, height = self.config.frame_size
+        x = np.broadcast_to(np.linspace(0, 255, width, dtype=np.float32), (height, width))
+        y = np.broadcast_to(np.linspace(0, 255, height, dtype=np.float32)[:, None], (height, width))
+        noise = cv2.GaussianBlur(rng.normal(0, 25, (height, width)).astype(np.float32), (0, 0), 3)
+        frame = np.dstack([0.6 * x, 0.3 * x + 0.5 * y, 0.5 * y + 40]) + noise[:, :, None]
+        frame = np.clip(frame, 0, 255).astype(np.uint8)
+        for blob in range(4):
+            center = (int((width * (blob + 1) / 5 + 7 * index) % width), int(height * (0.3 + 0.1 * blob)))
+            axes = (int(width * 0.05) + 10 * blob, int(height * 0.08))
+            color = tuple(int(c) for c in rng.integers(0, 255, 3))
+            cv2.ellipse(frame, center, axes, 15 * blob, 0, 360, color, cv2.FILLED)
+        return frame
+
+
+    def load_frames(self) -> List[bytes]:
+        """
+        Encoded frames the benchmark decodes, like uploaded images are.
+
+        :return: JPEG/PNG bytes of warmup_frames + frames frames, repeating the source if it is shorter.
+        :raises AppException: If the recorded source has no frames.
+        """
+        try:
+            count = self.config.warmup_frames + self.config.frames
+            source = self.config.source
+            encoded = []
+
+            if source is None:
+                rng = np.random.default_rng(self.config.seed)
+                for index in range(count):
+                    encoded.append(cv2.imencode(".jpg", self.synthetic_frame(rng, index),
+                                                [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes())
+            elif os.path.isdir(source):
+                images = sorted(os.path.join(root, file) for root, _, files in os.walk(source)
+                                for file in files if file.lower().endswith(BATCH_INFERENCE_IMAGE_EXTENSIONS))
+                for path in images[:count]:
+                    with open(path, "rb") as f:
+                        encoded.append(f.read())
+            else:
+                cap = cv2.VideoCapture(source)
+                while len(encoded) < count:
+                    ok, frame = cap.read()
+                    if not ok:
+                        break
+                    encoded.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes())
+                cap.release()
+
+            if not encoded:
+                raise Exception(f"No frames could be read from {source}")
+            return [encoded[index % len(encoded)] for index in range(count)]
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def synthetic_results(self, frame: np.ndarray, names: dict, rng: np.random.Generator) -> Results:
+        """
+        ultralytics Results with `instances` elliptic masks, at the letterboxed input
+        resolution the segmentation head produces them at.
+        """
+        height, width = frame.shape[:2]
+        gain = self.config.imgsz / max(height, width)
+        mask_h = int(np.ceil(height * gain / 32) * 32)
+        mask_w = int(np.ceil(width * gain / 32) * 32)
+        pad_x, pad_y = (mask_w - width * gain) / 2, (mask_h - height * gain) / 2
+
+        boxes, masks = [], np.zeros((self.config.instances, mask_h, mask_w), dtype=np.uint8)
+        for i in range(self.config.instances):
+            box_w, box_h = rng.uniform(0.05, 0.3) * width, rng.uniform(0.05, 0.3) * height
+            x1, y1 = rng.uniform(0, width - box_w), rng.uniform(0, height - box_h)
+            boxes.append([x1, y1, x1 + box_w, y1 + box_h, rng.uniform(0.3, 0.95), i % len(names)])
+            center = (int((x1 + box_w / 2) * gain + pad_x), int((y1 + box_h / 2) * gain + pad_y))
+            cv2.ellipse(masks[i], center, (int(box_w * gain / 2), int(box_h * gain / 2)), 0, 0, 360, 1, cv2.FILLED)
+
+        return Results(frame, path="", names=names,
+                       boxes=torch.tensor(boxes, dtype=torch.float32),
+                       masks=torch.from_numpy(masks.astype(np.float32)))
+
+
+    def run(self) -> BenchmarkArtifact:
+        """
+        Runs the benchmark, writes the timings and compares them with the baseline.
+
+        :return: BenchmarkArtifact with the timings and any regressions.
+        :raises AppException: If the model or frames cannot be loaded, or the baseline
+                              was recorded with different settings.
+        """
+        logging.info("Entered the run method of BenchmarkPipeline class")
+        try:
+            config = self.config
+            weight_path = self.build_model()
+            frames = self.load_frames()
+            engine = InferenceEngine(weight_path, device=config.device, num_threads=config.num_threads,
+                                     imgsz=config.imgsz)
+            names = engine.names
+
+            frame_annotator = FrameAnnotator(names=names)
+            mask_annotator = sv.MaskAnnotator()
+            label_annotator = sv.LabelAnnotator(text_color=sv.Color.BLACK, text_position=sv.Position.CENTER)
+            rng = np.random.default_rng(config.seed)
+
+            timings: Dict[str, List[float]] = {}
+
+            def record(stage: str, start: float) -> float:
+                now = time.perf_counter()
+                timings.setdefault(stage, []).append((now - start) * 1000)
+                return now
+
+            for index, data in enumerate(frames):
+                start = time.perf_counter()
+                frame = decode_image(data)
+                decode_end = record("decode", start)
+
+                result = engine.predict(frame, conf=config.conf)[0]
+                record("predict", decode_end) # Wall time of the engine call, including its overhead
+                for stage in ("preprocess", "inference", "postprocess"):
+                    timings.setdefault(stage, []).append(result.speed[stage])
+
+                drawn = self.synthetic_results(frame, names, rng)
+                canvases = [frame.copy(), frame.copy()]
+
+                # gen_frames and the streaming pages: FrameAnnotator plus the FPS overlay
+                start = time.perf_counter()
+                annotated = frame_annotator.annotate(canvases[0], FrameDetections.from_ultralytics(drawn))
+                draw_fps(annotated, 30.0)
+                record("annotate_frame_annotator", start)
+
+                start = time.perf_counter()
+                detections = sv.Detections.from_ultralytics(drawn)
+                supervision_frame = mask_annotator.annotate(canvases[1], detections=detections)
+                label_annotator.annotate(supervision_frame, detections=detections)
+                record("annotate_supervision", start)
+
+                start = time.perf_counter()
+                drawn.plot()
+                record("annotate_plot", start)
+
+                start = time.perf_counter()
+                cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, config.jpeg_quality])
+                record("encode", start)
+
+            # Drop the warmup frames, then add the end-to-end time of every frame
+            timings = {stage: values[config.warmup_frames:] for stage, values in timings.items()}
+            timings["end_to_end"] = [sum(timings[stage][i] for stage in END_TO_END_STAGES)
+                                     for i in range(config.frames)]
+            stages = {stage: summarize(values) for stage, values in timings.items()}
+
+            settings = {"model": config.model, "source": config.source, "frames": config.frames,
+                        "frame_size": list(frame.shape[1::-1]),
+                        "imgsz": config.imgsz, "device": config.device, "num_threads": config.num_threads,
+                        "instances": config.instances, "jpeg_quality": config.jpeg_quality}
+
+            regressions = []
+            if os.path.exists(config.baseline_file_path):
+                with open(config.baseline_file_path, "r") as f:
+                    baseline = json.load(f)
+                mismatched = [key for key in BASELINE_SETTINGS if baseline["settings"].get(key) != settings[key]]
+                if mismatched:
+                    raise Exception(f"Baseline {config.baseline_file_path} was recorded with different settings "
+                                    f"({', '.join(mismatched)}); record a new one with --update-baseline")
+                regressions = compare_to_baseline(stages, baseline["stages"], config.tolerance)
+            else:
+                logging.info(f"No baseline at {config.baseline_file_path}, nothing to compare against")
+
+            report = {"settings": settings,
+                      "environment": {"platform": platform.platform(),
+                                      "processor": platform.processor(),
+                                      "cpu_count": os.cpu_count(),
+                                      "python": platform.python_version(),
+                                      "torch": torch.__version__,
+                                      "backend": os.path.basename(engine.model_path)},
+                      "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                      "stages": stages,
+                      "regressions": regressions}
+            os.makedirs(os.path.dirname(config.output_file_path) or ".", exist_ok=True)
+            with open(config.output_file_path, "w") as f:
+                json.dump(report, f, indent=2)
+
+            logging.info(f"Benchmark written to {config.output_file_path}, {len(regressions)} regressions")
+            return BenchmarkArtifact(output_file_path=config.output_file_path, stages=stages, regressions=regressions)
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def update_baseline(self) -> None:
+        """
+        Stores the timings of the last run as the baseline future runs are compared against.
+
+        :raises AppException: If there is no benchmark output to store.
+        """
+        try:
+            with open(self.config.output_file_path, "r") as f:
+                report = json.load(f)
+            report.pop("regressions", None)
+            os.makedirs(os.path.dirname(self.config.baseline_file_path) or ".", exist_ok=True)
+            with open(self.config.baseline_file_path, "w") as f:
+                json.dump(report, f, indent=2)
+            logging.info(f"Stored {self.config.output_file_path} as baseline {self.config.baseline_file_path}")
+
+        except Exception as e:
+            raise AppException(e, sys)
@@ -0,0 +1,215 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from statistics import median
+from typing import Dict, List, Tuple
+
+from fireSmoke.constant.application import IMPORT_TIME_HEAVY_PACKAGES
+from fireSmoke.entity.artifacts_entity import ImportTimeArtifact
+from fireSmoke.entity.config_entity import ImportTimeConfig
+from fireSmoke.exception import AppException
+from fireSmoke.logger import logging
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parses the report `python -X importtime` writes to stderr.
+
+    :param stderr: Output lines of the form "import time: <self us> | <cumulative us> | <module>".
+    :return: (self, cumulative) microseconds by module.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue # Header line
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+
+def compare_to_budget(targets: dict, budget: dict) -> List[str]:
+    """
+    Lists the targets that import slower than their budget or load a forbidden package.
+
+    :param targets: Profiles of the current run by target.
+    :param budget: Budget entries ("max_ms" and "forbidden") by target.
+    :return: One message per violation.
+    """
+    regressions = []
+    for target, limits in budget.items():
+        if target not in targets:
+            continue
+        profile = targets[target]
+        if "max_ms" in limits and profile["median_ms"] > limits["max_ms"]:
+            regressions.append(f"{target} imports in {profile['median_ms']:.1f} ms > budget {limits['max_ms']:.1f} ms")
+        for package in limits.get("forbidden", []):
+            if package in profile["packages_ms"]:
+                regressions.append(f"{target} imports {package} ({profile['packages_ms'][package]:.1f} ms), "
+                                   f"which it must defer")
+    return regressions
+
+
+class ImportTimePipeline:
+    """
+    This class profiles the cold-start import time of the package entry points.
+
+    Every target is imported in fresh interpreters under `python -X importtime`. The median
+    time of each target is reported, with the time spent per top-level package and the
+    slowest modules. The committed budget lists the packages each target must not load at
+    import time (e.g. torch for the helpers the pages load on every rerun). Time limits depend
+    on the machine, so they are kept in a local budget measured with update_budget. A target
+    over its limit or loading a forbidden package is a regression.
+    """
+
+    def __init__(self, import_time_config: ImportTimeConfig):
+        """
+        Constructor for the ImportTimePipeline class.
+
+        :param import_time_config: Targets, runs and budget file of the profile.
+        """
+        self.config = import_time_config
+
+
+    def _import_once(self, target: str) -> Dict[str, Tuple[int, int]]:
+        """
+        Imports a target in a fresh interpreter.
+
+        :return: (self, cumulative) microseconds by module.
+        :raises Exception: If the import fails.
+        """
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                                 capture_output=True, text=True, cwd=os.getcwd())
+        if process.returncode != 0:
+            raise Exception(f"Importing {target} failed: {process.stderr.strip().splitlines()[-1:]}")
+        return parse_importtime(process.stderr)
+
+
+    def profile(self, target: str) -> dict:
+        """
+        Profiles the import of one target.
+
+        :param target: Dotted module name.
+        :return: Median, per-run times in milliseconds, time per top-level package and slowest modules.
+        """
+        self._import_once(target) # Untimed: writes the bytecode caches
+        runs = [self._import_once(target) for _ in range(self.config.runs)]
+
+        # Medians per module across runs
+        modules = {name: (median(run.get(name, (0, 0))[0] for run in runs) / 1000,
+                          median(run.get(name, (0, 0))[1] for run in runs) / 1000)
+                   for name in runs[0]}
+        packages = {}
+        for name, (self_ms, _) in modules.items():
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + self_ms
+
+        slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:self.config.top_modules]
+        runs_ms = [round(run.get(target, (0, 0))[1] / 1000, 2) for run in runs]
+        return {"median_ms": round(median(runs_ms), 2),
+                "runs_ms": runs_ms,
+                "heavy_packages": [package for package in IMPORT_TIME_HEAVY_PACKAGES if package in packages],
+                "packages_ms": {package: round(ms, 2) for package, ms in
+                                sorted(packages.items(), key=lambda item: item[1], reverse=True)},
+                "slowest_modules": [{"module": name, "self_ms": round(self_ms, 2),
+                                     "cumulative_ms": round(cumulative_ms, 2)}
+                                    for name, (self_ms, cumulative_ms) in slowest]}
+
+
+    @staticmethod
+    def _read_targets(path: str) -> dict:
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            return json.load(f).get("targets", {})
+
+
+    def load_budget(self) -> dict:
+        """
+        Merges the forbidden packages of the committed budget with the time limits of the local one.
+
+        :return: Budget entries ("max_ms" and "forbidden") by target.
+        """
+        budget = {target: {"forbidden": limits.get("forbidden", [])}
+                  for target, limits in self._read_targets(self.config.budget_file_path).items()}
+        for target, limits in self._read_targets(self.config.local_budget_file_path).items():
+            if "max_ms" in limits:
+                budget.setdefault(target, {})["max_ms"] = limits["max_ms"]
+        return budget
+
+
+    def run(self) -> ImportTimeArtifact:
+        """
+        Profiles every target and compares it with the stored budget.
+
+        :return: ImportTimeArtifact with the profiles and the budget violations.
+        :raises AppException: If a target cannot be imported.
+        """
+        logging.info("Entered the run method of ImportTimePipeline class")
+
+        try:
+            targets = {}
+            for target in self.config.targets:
+                targets[target] = self.profile(target)
+                logging.info(f"{target} imports in {targets[target]['median_ms']} ms "
+                             f"(heavy packages: {targets[target]['heavy_packages'] or 'none'})")
+
+            budget = self.load_budget()
+            regressions = compare_to_budget(targets, budget)
+            if not budget:
+                logging.info(f"No import budget at {self.config.budget_file_path}, nothing to compare against")
+
+            report = {"created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                      "environment": {"platform": platform.platform(), "python": platform.python_version()},
+                      "runs": self.config.runs,
+                      "targets": targets,
+                      "regressions": regressions}
+            os.makedirs(os.path.dirname(self.config.output_file_path), exist_ok=True)
+            with open(self.config.output_file_path, "w") as f:
+                json.dump(report, f, indent=2)
+
+            logging.info("Exited the run method of ImportTimePipeline class")
+            return ImportTimeArtifact(output_file_path=self.config.output_file_path,
+                                      targets=targets,
+                                      regressions=regressions)
+
+        except Exception as e:
+            raise AppException(e, sys)
+
+
+    def update_budget(self) -> None:
+        """
+        Writes the local budget from the last profile: the measured time plus the headroom.
+        Targets new to the committed budget are forbidden the heavy packages they do not load
+        today, so a deferred import that becomes eager again is caught; existing forbidden
+        lists are kept.
+
+        :raises AppException: If there is no profile to build the budget from.
+        """
+        try:
+            with open(self.config.output_file_path, "r") as f:
+                report = json.load(f)
+
+            shared = self._read_targets(self.config.budget_file_path)
+            local = self._read_targets(self.config.local_budget_file_path)
+            for target, profile in report["targets"].items():
+                if target not in shared:
+                    shared[target] = {"forbidden": [package for package in IMPORT_TIME_HEAVY_PACKAGES
+                                                    if package not in profile["heavy_packages"]]}
+                headroom_ms = max(profile["median_ms"] * self.config.headroom, self.config.min_headroom_ms)
+                local[target] = {"max_ms": round(profile["median_ms"] + headroom_ms, 1)}
+
+            for path, budget in ((self.config.budget_file_path, {"targets": shared}),
+                                 (self.config.local_budget_file_path, {"environment": report["environment"],
+                                                                       "targets": local})):
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(path, "w") as f:
+                    json.dump(budget, f, indent=2)
+            logging.info(f"Stored the import time limits of {len(local)} targets in {self.config.local_budget_file_path}")
+
+        except Exception as e:
+            raise AppException(e, sys)
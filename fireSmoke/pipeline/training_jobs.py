@@ -0,0 +1,321 @@
+import sys
+import atexit
+import copy
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from fireSmoke.constant.application import TRAINING_JOB_CANCEL_GRACE
+from fireSmoke.exception import AppException
+from fireSmoke.logger import logging
+
+
+class TrainingCancelled(Exception):
+    """
+    Raised inside the training loop when its job was cancelled.
+    """
+
+
+@dataclass
+class TrainingJob:
+    """
+    State of one background training run.
+
+    Attributes:
+    - job_id: Unique id of the job.
+    - settings: Overrides of the training run (no_epochs, batch_size, img_size, force_stages).
+    - status: "queued", "running", "completed", "failed" or "cancelled".
+    - submitted_at / started_at / finished_at: Wall-clock timestamps of the job's life cycle.
+    - epochs_total: Number of epochs of the run, known once training starts.
+    - epochs: One dict of metrics per finished epoch, including epoch time and images/s.
+    - final_metrics: Validation metrics of the best model after training.
+    - summary: Stage summary of the pipeline run.
+    - trained_model_file_path: Path to best.pt once the job completed.
+    - error: Error message of a failed job.
+    """
+    job_id: str
+    settings: dict
+    status: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    epochs_total: int = 0
+    epochs: List[dict] = field(default_factory=list)
+    final_metrics: dict = field(default_factory=dict)
+    summary: str = ""
+    trained_model_file_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("queued", "running")
+
+
+def _metrics(values: dict) -> dict:
+    return {key: round(float(value), 5) for key, value in values.items()}
+
+
+def run_training_job(settings: dict, events, cancel_event) -> None:
+    """
+    Runs the training pipeline in a worker process and reports progress as events.
+
+    Events are (kind, payload) tuples: ("train_start", {"epochs"}), ("epoch", metrics),
+    ("completed", {"summary", "trained_model_file_path"}), ("failed", {"error"}) and
+    ("cancelled", {}).
+
+    :param settings: Overrides of the training run.
+    :param events: Queue the events are put on.
+    :param cancel_event: Set by the runner to stop the job at the next training batch.
+    """
+    from fireSmoke.pipeline.training_pipeline import TrainPipeline
+
+    epoch_start = {}
+
+    def on_train_start(trainer):
+        events.put(("train_start", {"epochs": trainer.epochs}))
+
+    def on_train_epoch_start(trainer):
+        epoch_start["time"] = time.perf_counter()
+
+    def on_train_batch_end(trainer):
+        if cancel_event.is_set():
+            raise TrainingCancelled()
+
+    def on_train_epoch_end(trainer):
+        epoch_start["seconds"] = time.perf_counter() - epoch_start.get("time", time.perf_counter())
+
+    def on_fit_epoch_end(trainer):
+        metrics = _metrics(trainer.metrics or {})
+        if trainer.epoch + 1 > trainer.epochs: # Final validation of best.pt after the last epoch
+            events.put(("final", metrics))
+            return
+        seconds = epoch_start.get("seconds", 0.0)
+        metrics.update(_metrics(trainer.label_loss_items(trainer.tloss, prefix="train")))
+        metrics.update(epoch=trainer.epoch + 1,
+                       epoch_time=round(seconds, 3),
+                       images_per_second=round(len(trainer.train_loader.dataset) / seconds, 2) if seconds else 0.0)
+        events.put(("epoch", metrics))
+
+    callbacks = {"on_train_start": on_train_start,
+                 "on_train_epoch_start": on_train_epoch_start,
+                 "on_train_batch_end": on_train_batch_end,
+                 "on_train_epoch_end": on_train_epoch_end,
+                 "on_fit_epoch_end": on_fit_epoch_end}
+
+    try:
+        pipeline = TrainPipeline(force_stages=settings.get("force_stages"), trainer_callbacks=callbacks)
+        for name in ("no_epochs", "batch_size", "img_size"):
+            if settings.get(name) is not None:
+                setattr(pipeline.model_trainer_config, name, settings[name])
+        if settings.get("img_size") is not None:
+            pipeline.data_sharding_config.img_size = settings["img_size"]
+            pipeline.model_optimizer_config.img_size = settings["img_size"]
+
+        pipeline.run_pipeline()
+        events.put(("completed", {"summary": pipeline.summary(),
+                                  "trained_model_file_path": pipeline.model_trainer_artifact.trained_model_file_path}))
+    except BaseException as e:
+        if cancel_event.is_set():
+            events.put(("cancelled", {}))
+        else:
+            events.put(("failed", {"error": str(e)}))
+
+
+class TrainingJobRunner:
+    """
+    Runs training jobs one after another in a separate process.
+
+    Jobs are queued in submission order. A supervisor thread starts the next job in a
+    fresh "spawn" process, so training never blocks the caller and a crash cannot take
+    the app down, and applies the progress events the job sends through a queue.
+    Callers read snapshots of the jobs with `jobs()`; the state itself is only changed
+    by the supervisor thread and `submit`/`cancel`.
+    """
+
+    def __init__(self, cancel_grace: float = TRAINING_JOB_CANCEL_GRACE):
+        """
+        Constructor for the TrainingJobRunner class.
+
+        :param cancel_grace: Seconds a cancelled job gets to stop before its process is terminated.
+        """
+        self.cancel_grace = cancel_grace
+        self._context = multiprocessing.get_context("spawn")
+        self._jobs: List[TrainingJob] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._cancel_event = None
+        self._cancel_requested_at: Optional[float] = None
+        self._process = None
+        self._closed = False
+        self._supervisor = threading.Thread(target=self._supervise, name="training-jobs", daemon=True)
+        self._supervisor.start()
+        # Job processes are not daemonic, so they are stopped explicitly when the app exits
+        atexit.register(self.shutdown)
+
+
+    def submit(self, epochs: Optional[int] = None, batch_size: Optional[int] = None,
+               img_size: Optional[int] = None, force_stages: Optional[List[str]] = None) -> str:
+        """
+        Queues a training job; unset settings keep the ModelTrainerConfig defaults.
+
+        :return: Id of the queued job.
+        """
+        job = TrainingJob(job_id=uuid.uuid4().hex[:8],
+                          settings={"no_epochs": epochs, "batch_size": batch_size,
+                                    "img_size": img_size, "force_stages": list(force_stages or [])})
+        with self._lock:
+            self._jobs.append(job)
+        self._wakeup.set()
+        logging.info(f"Queued training job {job.job_id} with {job.settings}")
+        return job.job_id
+
+
+    def cancel(self, job_id: str) -> None:
+        """
+        Cancels a queued job, or stops a running one at its next training batch.
+        """
+        with self._lock:
+            for job in self._jobs:
+                if job.job_id != job_id or not job.is_active:
+                    continue
+                if job.status == "queued":
+                    job.status, job.finished_at = "cancelled", time.time()
+                elif self._cancel_event is not None:
+                    self._cancel_event.set()
+                    self._cancel_requested_at = time.monotonic()
+        self._wakeup.set()
+
+
+    def jobs(self) -> List[TrainingJob]:
+        """
+        Snapshot of all jobs, most recent first.
+        """
+        with self._lock:
+            return copy.deepcopy(self._jobs[::-1])
+
+
+    def shutdown(self) -> None:
+        """
+        Stops the running job and starts no further ones; called when the app process exits.
+        """
+        with self._lock:
+            self._closed = True
+            process = self._process
+            if self._cancel_event is not None:
+                self._cancel_event.set()
+        if process is not None and process.is_alive():
+            logging.info(f"Stopping training process {process.pid} on exit")
+            process.terminate()
+            process.join()
+
+
+    def _next_job(self) -> Optional[TrainingJob]:
+        with self._lock:
+            if self._closed:
+                return None
+            return next((job for job in self._jobs if job.status == "queued"), None)
+
+
+    def _apply(self, job: TrainingJob, kind: str, payload: dict) -> None:
+        with self._lock:
+            if kind == "train_start":
+                job.epochs_total = payload["epochs"]
+            elif kind == "epoch":
+                job.epochs.append(payload)
+            elif kind == "final":
+                job.final_metrics = payload
+            elif kind == "completed":
+                job.status = "completed"
+                job.summary = payload["summary"]
+                job.trained_model_file_path = payload["trained_model_file_path"]
+            elif kind == "failed":
+                job.status, job.error = "failed", payload["error"]
+            elif kind == "cancelled":
+                job.status = "cancelled"
+
+
+    def _run(self, job: TrainingJob) -> None:
+        events = self._context.Queue()
+        with self._lock:
+            if self._closed:
+                return
+            self._cancel_event = self._context.Event()
+            self._cancel_requested_at = None
+            job.status, job.started_at = "running", time.time()
+            # Not daemonic: validation and the data loaders start child processes of their own
+            self._process = self._context.Process(target=run_training_job,
+                                                  args=(job.settings, events, self._cancel_event),
+                                                  name=f"training-job-{job.job_id}")
+            process = self._process
+            process.start()
+        logging.info(f"Started training job {job.job_id} in process {process.pid}")
+
+        while True:
+            try:
+                self._apply(job, *events.get(timeout=0.5))
+                continue
+            except queue.Empty:
+                pass
+            if not process.is_alive():
+                break
+            if (self._cancel_requested_at is not None
+                    and time.monotonic() - self._cancel_requested_at > self.cancel_grace):
+                logging.info(f"Training job {job.job_id} did not stop in time, terminating it")
+                process.terminate()
+                process.join()
+                self._apply(job, "cancelled", {})
+                break
+
+        # Events sent right before the process exited
+        while True:
+            try:
+                self._apply(job, *events.get_nowait())
+            except queue.Empty:
+                break
+
+        process.join()
+        with self._lock:
+            if job.status == "running":
+                job.status, job.error = "failed", f"Training process exited with code {process.exitcode}"
+            job.finished_at = time.time()
+            self._cancel_event = None
+            self._process = None
+        logging.info(f"Training job {job.job_id} {job.status}")
+
+
+    def _supervise(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            try:
+                self._run(job)
+            except Exception as e:
+                error = AppException(e, sys)
+                logging.error(f"Training job {job.job_id} could not be run: {error}")
+                with self._lock:
+                    job.status, job.error, job.finished_at = "failed", str(error), time.time()
+
+
+# Runner shared by every session of this process; created on first use so worker processes,
+# which import this module too, do not start one
+_training_runner: Optional[TrainingJobRunner] = None
+_training_runner_lock = threading.Lock()
+
+
+def get_training_runner() -> TrainingJobRunner:
+    """
+    Returns the process-wide training job runner.
+    """
+    global _training_runner
+    with _training_runner_lock:
+        if _training_runner is None:
+            _training_runner = TrainingJobRunner()
+        return _training_runner
@@ -1,31 +1,107 @@
 import sys, os
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
 from fireSmoke.logger import logging
 from fireSmoke.exception import AppException
-from fireSmoke.components.data_ingestion import DataIngestion
-from fireSmoke.components.data_validation import DataValidation
-from fireSmoke.components.model_trainer import ModelTrainer
+from fireSmoke.constant.training_pipeline import STAGE_FINGERPRINT_FILE
+from fireSmoke.utils.download_utils import remote_fingerprint
+from fireSmoke.utils.stage_utils import load_stage_record, save_stage_record, stage_fingerprint
 
 from fireSmoke.entity.config_entity import (DataIngestionConfig,
                                                DataValidationConfig,
-                                               ModelTrainerConfig)
+                                               DataShardingConfig,
+                                               ModelTrainerConfig,
+                                               ModelOptimizerConfig,
+                                               HyperparameterSweepConfig)
 
 from fireSmoke.entity.artifacts_entity import (DataIngestionArtifact,
                                                   DataValidationArtifact,
-                                                  ModelTrainerArtifact)
+                                                  DataShardingArtifact,
+                                                  ModelTrainerArtifact,
+                                                  ModelOptimizerArtifact,
+                                                  HyperparameterSweepArtifact)
+
+# Components are imported by the stage that runs them, so importing the pipeline (e.g. for STAGES)
+# does not load gdown, OpenCV, torch and ultralytics
+STAGES = ("data_ingestion", "data_validation", "data_sharding", "model_trainer", "model_optimizer")
+
 
 class TrainPipeline:
     """
     This class orchestrates the entire training pipeline, including data ingestion, 
     data validation, and model training.
+    
+    Every stage writes a fingerprint of its config and input artifacts next to its output.
+    A stage whose fingerprint is unchanged is skipped and its stored artifact reused, so
+    changing training settings does not repeat ingestion and validation.
     """
     
-    def __init__(self):
+    def __init__(self,
+                 force_stages: Optional[Iterable[str]] = None,
+                 trainer_callbacks: Optional[Dict[str, Callable]] = None):
         """
         Constructor to initialize configuration objects for each pipeline stage.
+        
+        :param force_stages: Stages to run even if their fingerprint is unchanged; "all" forces every stage.
+        :param trainer_callbacks: Ultralytics trainer callbacks by event name, passed to ModelTrainer.
         """
         self.data_ingestion_config = DataIngestionConfig() #  Configuration for data ingestion
         self.data_validation_config = DataValidationConfig() # Configuration for data validation
+        self.data_sharding_config = DataShardingConfig() # Configuration for training shards
         self.model_trainer_config = ModelTrainerConfig() # Configuration for model training
+        self.model_optimizer_config = ModelOptimizerConfig() # Configuration for quantization of the trained model
+        
+        force_stages = set(force_stages or [])
+        unknown = force_stages - set(STAGES) - {"all"}
+        if unknown:
+            raise AppException(Exception(f"Unknown stages {sorted(unknown)}, expected one of {STAGES}"), sys)
+        self.force_stages = set(STAGES) if "all" in force_stages else force_stages
+        self.stage_report = [] # (stage, "ran" or "skipped", seconds taken or saved)
+        self.trainer_callbacks = trainer_callbacks or {}
+        self.model_trainer_artifact: Optional[ModelTrainerArtifact] = None
+        self.model_optimizer_artifact: Optional[ModelOptimizerArtifact] = None
+        
+    
+    def _run_stage(self, stage: str, output_dir: str, config, inputs: tuple, artifact_cls, run: Callable):
+        """
+        Runs a stage, or reuses its stored artifact when its fingerprint is unchanged.
+
+        :param stage: Name of the stage.
+        :param output_dir: Directory of the stage's output; the fingerprint record is written there.
+        :param config: Config dataclass of the stage.
+        :param inputs: Input artifacts of the stage.
+        :param artifact_cls: Artifact dataclass the stage produces.
+        :param run: Runs the stage and returns its artifact.
+        :return: Artifact of the stage.
+        """
+        record_path = os.path.join(output_dir, STAGE_FINGERPRINT_FILE)
+        fingerprint = stage_fingerprint(config, *inputs)
+        
+        if stage not in self.force_stages:
+            stored = load_stage_record(record_path, fingerprint, artifact_cls)
+            if stored is not None:
+                artifact, seconds = stored
+                logging.info(f"Skipping {stage}: inputs unchanged, reusing {artifact}")
+                self.stage_report.append((stage, "skipped", seconds))
+                return artifact
+        
+        start = time.perf_counter()
+        artifact = run()
+        seconds = time.perf_counter() - start
+        save_stage_record(record_path, fingerprint, artifact, seconds)
+        self.stage_report.append((stage, "ran", seconds))
+        return artifact
+        
+        
+    def summary(self) -> str:
+        """
+        Human-readable summary of the last run: the stages that ran and the time saved by skipped ones.
+        """
+        lines = [f"{stage}: {status} ({seconds:.1f}s{' saved' if status == 'skipped' else ''})"
+                 for stage, status, seconds in self.stage_report]
+        saved = sum(seconds for _, status, seconds in self.stage_report if status == "skipped")
+        lines.append(f"Time saved by skipped stages: {saved:.1f}s")
+        return "\n".join(lines)
         
     
     def start_data_ingestion(self) -> DataIngestionArtifact:
@@ -35,6 +111,8 @@ class TrainPipeline:
         :return: DataIngestionArtifact containing paths to the downloaded and processed data.
         :raises AppException: If data ingestion fails.
         """
+        from fireSmoke.components.data_ingestion import DataIngestion
+
         try:
             logging.info("Entered the start_data_ingestion method of TrainPipeline class")
             logging.info("Getting the data from URL")
@@ -63,6 +141,8 @@ class TrainPipeline:
         :return: DataValidationArtifact containing validation status.
         :raises AppException: If data validation fails.
         """
+        from fireSmoke.components.data_validation import DataValidation
+
         logging.info("Entered the start_data_validation method of TrainPipeline class")
         
         try:
@@ -83,17 +163,54 @@ class TrainPipeline:
             raise AppException(e, sys)
             
     
-    def start_model_trainer(self) -> ModelTrainerArtifact:
+    def start_data_sharding(self, data_ingestion_artifact: DataIngestionArtifact) -> DataShardingArtifact:
+        """
+        Initiates the conversion of the feature store into memory-mapped training shards.
+
+        :param data_ingestion_artifact: Artifact pointing to the extracted feature store.
+        :return: DataShardingArtifact containing the data.yaml that points at the shards.
+        :raises AppException: If data sharding fails.
+        """
+        from fireSmoke.components.data_sharding import DataSharding
+
+        logging.info("Entered the start_data_sharding method of TrainPipeline class")
+        try:
+            # Create an instance of the DataSharding class
+            data_sharding = DataSharding(
+                data_sharding_config = self.data_sharding_config,
+                data_ingestion_artifact = data_ingestion_artifact
+            )
+            
+            # Execute data sharding and retrieve artifacts
+            data_sharding_artifact = data_sharding.initiate_data_sharding()
+            logging.info("Exit the start_data_sharding of TrainPipeline class")
+            
+            return data_sharding_artifact
+        
+        except Exception as e:
+            raise AppException(e, sys)
+            
+    
+    def start_model_trainer(self,
+                            data_ingestion_artifact: DataIngestionArtifact,
+                            data_sharding_artifact: DataShardingArtifact = None) -> ModelTrainerArtifact:
         """
         Initiates the model training process.
 
+        :param data_ingestion_artifact: Artifact pointing to the extracted feature store.
+        :param data_sharding_artifact: Artifact pointing to the training shards, if they were built.
         :return: ModelTrainerArtifact containing the path to the trained model.
         :raises AppException: If model training fails.
         """
+        from fireSmoke.components.model_trainer import ModelTrainer
+
         try:
             # Create an instance of the ModelTrainer class
             model_trainer = ModelTrainer(
-                model_trainer_config = self.model_trainer_config
+                model_trainer_config = self.model_trainer_config,
+                data_ingestion_artifact = data_ingestion_artifact,
+                data_sharding_artifact = data_sharding_artifact,
+                callbacks = self.trainer_callbacks
             )
             
             # Execute model training and retrieve artifacts
@@ -105,29 +222,150 @@ class TrainPipeline:
             raise AppException(e, sys)
        
      
+    def start_model_optimizer(self,
+                              data_ingestion_artifact: DataIngestionArtifact,
+                              model_trainer_artifact: ModelTrainerArtifact) -> ModelOptimizerArtifact:
+        """
+        Initiates the quantization of the trained model and the selection of the variant to deploy.
+
+        :param data_ingestion_artifact: Artifact pointing to the extracted feature store.
+        :param model_trainer_artifact: Artifact pointing to the trained model.
+        :return: ModelOptimizerArtifact naming the deployed variant.
+        :raises AppException: If model optimization fails.
+        """
+        from fireSmoke.components.model_optimizer import ModelOptimizer
+
+        logging.info("Entered the start_model_optimizer method of TrainPipeline class")
+        try:
+            # Create an instance of the ModelOptimizer class
+            model_optimizer = ModelOptimizer(
+                model_optimizer_config = self.model_optimizer_config,
+                data_ingestion_artifact = data_ingestion_artifact,
+                model_trainer_artifact = model_trainer_artifact
+            )
+            
+            # Execute model optimization and retrieve artifacts
+            model_optimizer_artifact = model_optimizer.initiate_model_optimizer()
+            logging.info("Exit the start_model_optimizer of TrainPipeline class")
+            
+            return model_optimizer_artifact
+        
+        except Exception as e:
+            raise AppException(e, sys)
+       
+     
+    def prepare_data(self) -> Tuple[DataIngestionArtifact, Optional[DataShardingArtifact]]:
+        """
+        Runs the stages that prepare the dataset for training:
+        - Data ingestion
+        - Data validation
+        - Data sharding (if enabled)
+
+        :return: Ingestion artifact and sharding artifact (None when sharding is disabled).
+        :raises AppException: If a stage fails or the data is not valid.
+        """
+        try:
+            # Step 1: Data Ingestion; the source's ETag (or size and mtime) is an input, so a
+            # dataset republished at the same URL is fetched again
+            dataset_url = self.data_ingestion_config.data_download_url
+            source = {"url": dataset_url,
+                      "fingerprint": None if "drive.google.com" in dataset_url else remote_fingerprint(dataset_url)}
+            data_ingestion_artifact = self._run_stage(
+                "data_ingestion", self.data_ingestion_config.data_ingestion_dir,
+                self.data_ingestion_config, (source,), DataIngestionArtifact,
+                self.start_data_ingestion
+            )
+            
+            # Step 2: Data Validation
+            data_validation_artifact = self._run_stage(
+                "data_validation", self.data_validation_config.data_validation_dir,
+                self.data_validation_config, (data_ingestion_artifact,), DataValidationArtifact,
+                lambda: self.start_data_validation(data_ingestion_artifact = data_ingestion_artifact)
+            )
+            if data_validation_artifact.validation_status != True:
+                raise Exception("Your data is not in correct format")
+            
+            # Step 3: Data Sharding, so training reads pre-resized images instead of decoding JPEGs
+            data_sharding_artifact = None
+            if self.data_sharding_config.enabled:
+                data_sharding_artifact = self._run_stage(
+                    "data_sharding", self.data_sharding_config.data_sharding_dir,
+                    self.data_sharding_config, (data_ingestion_artifact,), DataShardingArtifact,
+                    lambda: self.start_data_sharding(data_ingestion_artifact = data_ingestion_artifact)
+                )
+            
+            return data_ingestion_artifact, data_sharding_artifact
+        
+        except Exception as e:
+            raise AppException(e, sys)
+       
+     
     def run_pipeline(self) -> None:
         """
         Runs the entire training pipeline, including:
         - Data ingestion
         - Data validation
+        - Data sharding (if enabled)
         - Model training (if validation is successful)
+        - Model optimization (if enabled)
+        
+        Stages whose config and input artifacts are unchanged since their last run are skipped.
 
         :raises AppException: If any stage of the pipeline fails.
         """
         try:
-            # Step 1: Data Ingestion
-            data_ingestion_artifact = self.start_data_ingestion()
+            self.stage_report = []
+            data_ingestion_artifact, data_sharding_artifact = self.prepare_data()
             
-            # Step 2: Data Validation
-            data_validation_artifact = self.start_data_validation(
-                data_ingestion_artifact = data_ingestion_artifact
+            # Step 4: Model Training
+            self.model_trainer_artifact = self._run_stage(
+                "model_trainer", self.model_trainer_config.model_trainer_dir,
+                self.model_trainer_config, (data_ingestion_artifact, data_sharding_artifact), ModelTrainerArtifact,
+                lambda: self.start_model_trainer(
+                    data_ingestion_artifact = data_ingestion_artifact,
+                    data_sharding_artifact = data_sharding_artifact
+                )
             )
             
-            # Step 3: Model Training (if validation is successful)
-            if data_validation_artifact.validation_status == True:
-                model_trainer_artifact = self.start_model_trainer()
-            else:
-                raise Exception("Your data is not in correct format")
+            # Step 5: Model Optimization, quantizing the trained model for CPU deployment
+            if self.model_optimizer_config.enabled:
+                self.model_optimizer_artifact = self._run_stage(
+                    "model_optimizer", self.model_optimizer_config.model_optimizer_dir,
+                    self.model_optimizer_config, (data_ingestion_artifact, self.model_trainer_artifact), ModelOptimizerArtifact,
+                    lambda: self.start_model_optimizer(
+                        data_ingestion_artifact = data_ingestion_artifact,
+                        model_trainer_artifact = self.model_trainer_artifact
+                    )
+                )
+            
+            logging.info(f"Training pipeline finished:\n{self.summary()}")
         
         except Exception as e:
-            raise AppException(e, sys)
\ No newline at end of file
+            raise AppException(e, sys)
+       
+     
+    def run_sweep(self, sweep_config: HyperparameterSweepConfig) -> HyperparameterSweepArtifact:
+        """
+        Prepares the dataset like run_pipeline and then searches training settings
+        with a hyperparameter sweep instead of training once.
+
+        :param sweep_config: Configuration of the sweep; trials override self.model_trainer_config.
+        :return: HyperparameterSweepArtifact with the leaderboard and the best trial.
+        :raises AppException: If data preparation or the sweep fails.
+        """
+        from fireSmoke.components.hyperparameter_sweep import HyperparameterSweep
+
+        try:
+            self.stage_report = []
+            data_ingestion_artifact, data_sharding_artifact = self.prepare_data()
+            
+            hyperparameter_sweep = HyperparameterSweep(
+                sweep_config = sweep_config,
+                model_trainer_config = self.model_trainer_config,
+                data_ingestion_artifact = data_ingestion_artifact,
+                data_sharding_artifact = data_sharding_artifact
+            )
+            return hyperparameter_sweep.initiate_sweep()
+        
+        except Exception as e:
+            raise AppException(e, sys)
@@ -0,0 +1,190 @@
+import hashlib
+import http.client
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from fireSmoke.exception import AppException
+from fireSmoke.logger import logging
+
+
+def sha256_file(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Computes the SHA-256 hex digest of a file in chunks.
+
+    :param file_path: Path to the file.
+    :param chunk_size: Bytes read per chunk.
+    :return: Hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_path_from_url(url: str) -> Optional[str]:
+    """
+    Returns the local path of a file:// URL, or None for any other URL.
+    """
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme != "file":
+        return None
+    return urllib.request.url2pathname(parsed.path)
+
+
+def remote_fingerprint(url: str, timeout: float = 30.0) -> Optional[str]:
+    """
+    Cheap identity of the remote content, used to tell whether a cached download is stale.
+
+    :param url: http(s):// or file:// URL.
+    :param timeout: Seconds to wait for the server.
+    :return: ETag / Last-Modified + length for HTTP, size + mtime for files,
+             or None when the source does not expose one.
+    """
+    local_path = local_path_from_url(url)
+    if local_path is not None:
+        stat = os.stat(local_path)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    try:
+        request = urllib.request.Request(url, method="HEAD")
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            etag = response.headers.get("ETag")
+            if etag:
+                return etag
+            last_modified = response.headers.get("Last-Modified")
+            length = response.headers.get("Content-Length")
+            return f"{length}-{last_modified}" if last_modified else None
+    except (urllib.error.URLError, OSError) as e:
+        logging.info(f"Could not fingerprint {url}: {e}")
+        return None
+
+
+def _download_range(url: str, partial_path: str, chunk_size: int, timeout: float) -> None:
+    """
+    Appends the missing bytes of `url` to `partial_path`, starting from its current size.
+    """
+    offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+
+    local_path = local_path_from_url(url)
+    if local_path is not None:
+        with open(local_path, "rb") as src, open(partial_path, "ab") as dst:
+            src.seek(offset)
+            while chunk := src.read(chunk_size):
+                dst.write(chunk)
+        return
+
+    request = urllib.request.Request(url)
+    if offset:
+        request.add_header("Range", f"bytes={offset}-")
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 416: # Requested range starts at the end: the file is already complete
+            return
+        raise
+
+    with response:
+        # 200 instead of 206 means the server ignored the range; start over
+        resumed = offset and response.status == 206
+        length = response.headers.get("Content-Length")
+        expected = (offset if resumed else 0) + int(length) if length is not None else None
+        with open(partial_path, "ab" if resumed else "wb") as dst:
+            while chunk := response.read(chunk_size):
+                dst.write(chunk)
+
+    # A dropped connection can look like a normal end of stream
+    received = os.path.getsize(partial_path)
+    if expected is not None and received < expected:
+        raise ConnectionError(f"Connection closed after {received} of {expected} bytes")
+
+
+def download_with_resume(url: str,
+                         partial_path: str,
+                         chunk_size: int = 1 << 20,
+                         retries: int = 3,
+                         timeout: float = 60.0) -> str:
+    """
+    Downloads a URL into `partial_path`, resuming from whatever is already there.
+
+    http(s) sources are fetched with Range requests and file:// sources by seeking, in
+    chunks, so an interrupted download continues where it stopped, across retries and
+    across runs.
+
+    :param url: http(s):// or file:// URL.
+    :param partial_path: File the bytes are appended to; kept on failure for the next attempt.
+    :param chunk_size: Bytes read per chunk.
+    :param retries: Attempts before giving up.
+    :param timeout: Seconds to wait for the server per request.
+    :return: `partial_path`, holding the complete download.
+    :raises AppException: If every attempt fails.
+    """
+    try:
+        os.makedirs(os.path.dirname(partial_path) or ".", exist_ok=True)
+        for attempt in range(1, retries + 1):
+            try:
+                _download_range(url, partial_path, chunk_size, timeout)
+                return partial_path
+            except (urllib.error.URLError, http.client.HTTPException, ConnectionError, TimeoutError) as e:
+                # Client errors (404, 403, ...) will not go away by retrying
+                if attempt == retries or (isinstance(e, urllib.error.HTTPError) and e.code < 500):
+                    raise
+                received = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+                logging.info(f"Download of {url} interrupted at {received} bytes ({e}); "
+                             f"resuming, attempt {attempt + 1}/{retries}")
+                time.sleep(attempt)
+
+    except Exception as e:
+        raise AppException(e, sys) from e
+
+
+def _safe_member_dir(output_dir: str, member_name: str) -> str:
+    """
+    Parent directory a zip member is extracted to, sanitised the way zipfile does.
+    """
+    parts = os.path.splitdrive(member_name.replace("/", os.path.sep))[1].split(os.path.sep)
+    parts = [part for part in parts if part not in ("", os.path.curdir, os.path.pardir)]
+    return os.path.join(output_dir, *parts[:-1])
+
+
+def extract_zip_parallel(zip_file_path: str, output_dir: str, workers: int = 4) -> int:
+    """
+    Extracts a zip archive with several threads, each reading its own handle.
+
+    :param zip_file_path: Path to the archive.
+    :param output_dir: Directory to extract into.
+    :param workers: Number of extraction threads.
+    :return: Number of extracted files.
+    :raises AppException: If extraction fails.
+    """
+    try:
+        with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
+            members = [member for member in zip_ref.infolist() if not member.is_dir()]
+
+        # Directories are created up front so threads never race on makedirs
+        for directory in {_safe_member_dir(output_dir, member.filename) for member in members}:
+            os.makedirs(directory, exist_ok=True)
+
+        # Largest members first, dealt round-robin so every thread gets a similar number of bytes
+        members.sort(key=lambda member: member.file_size, reverse=True)
+        groups: List[list] = [members[i::workers] for i in range(workers)]
+
+        def extract(group: list) -> None:
+            with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
+                for member in group:
+                    zip_ref.extract(member, output_dir)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(extract, [group for group in groups if group]))
+
+        return len(members)
+
+    except Exception as e:
+        raise AppException(e, sys) from e
@@ -2,9 +2,6 @@ import os.path
 import sys
 import yaml
 import base64
-import cv2
-import cvzone
-import math
 import time
 
 from fireSmoke.exception import AppException
@@ -51,6 +48,52 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
         raise AppException(e, sys)
     
 
+def resolve_dataset_split(feature_store_path: str, split_path: str) -> str:
+    """
+    Resolves a split entry of a dataset's data.yaml to an absolute path in the feature store.
+    Roboflow exports use paths such as "../train/images" relative to the training directory.
+
+    :param feature_store_path: Directory the dataset was extracted to.
+    :param split_path: train/val/test entry of the dataset's data.yaml.
+    :return: Absolute path of the split's image directory.
+    """
+    parts = [part for part in split_path.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    candidate = os.path.join(feature_store_path, *parts)
+    if not os.path.exists(candidate):
+        candidate = os.path.join(feature_store_path, split_path)
+    return os.path.abspath(os.path.normpath(candidate))
+
+
+def write_feature_store_data_yaml(feature_store_path: str, data_yaml_file_path: str) -> str:
+    """
+    Writes a data.yaml whose splits point at the feature store with absolute paths,
+    so the extracted dataset is used in place instead of being copied.
+
+    :param feature_store_path: Directory the dataset was extracted to.
+    :param data_yaml_file_path: Path of the data.yaml to write.
+    :return: Path to the generated data.yaml.
+    :raises AppException: If the dataset's data.yaml is missing or lacks a required split.
+    """
+    try:
+        data_config = read_yaml_file(os.path.join(feature_store_path, "data.yaml"))
+
+        for split in ("train", "val", "test"):
+            if split not in data_config:
+                continue
+            data_config[split] = resolve_dataset_split(feature_store_path, data_config[split])
+            if split != "test" and not os.path.isdir(data_config[split]):
+                raise Exception(f"{split} split {data_config[split]} not found in the feature store")
+        data_config["path"] = os.path.abspath(feature_store_path)
+
+        write_yaml_file(data_yaml_file_path, data_config, replace=True)
+        logging.info(f"Generated {data_yaml_file_path} for {feature_store_path}")
+
+        return data_yaml_file_path
+
+    except Exception as e:
+        raise AppException(e, sys)
+
+
 def decodeImage(imgstring, fileName):
     """
     Decodes a base64-encoded image string and writes it to a file.
@@ -79,53 +122,62 @@ def gen_frames(model, classNames, videoSource):
     """
     Generates frames from a video source, performs object detection, and annotates the frames.
 
-    :param model: The object detection model.
+    :param model: The InferenceEngine (or YOLO model) used for detection.
     :param classNames: List of class names for object detection.
     :param videoSource: Video source (integer for webcam or string for IP camera).
     :yield: Annotated video frames in JPEG format for streaming.
     """
-    # Initialize video capture with the specified source
-    cap = cv2.VideoCapture(videoSource, cv2.CAP_DSHOW if isinstance(videoSource, int) else cv2.CAP_FFMPEG) # CAP_DSHOW: To specify video source, 0: Default camera; 1 and later: External camera
-    cap.set(3, 1280) # Set video width
-    cap.set(4, 720) # Set video height
-    cap.set(cv2.CAP_PROP_FOURCC, 0x32595559) # CAP_PROP_FOURCC: 4-character code of codec
-    cap.set(cv2.CAP_PROP_FPS, 30)            # CAP_PROP_FPS: Frame rate
+    # Imported here so the YAML and path helpers of this module do not load OpenCV, torch and ultralytics
+    import cv2
+    from fireSmoke.constant.application import KEYFRAME_ENABLED
+    from fireSmoke.inference.annotator import FrameAnnotator, draw_fps
+    from fireSmoke.inference.capture import LatestFrameCapture
+    from fireSmoke.inference.keyframe import KeyframePropagator
+    from fireSmoke.inference.metrics import get_stage_metrics
+    from fireSmoke.inference.motion import MotionGate
+    from fireSmoke.inference.stream import StreamProcessor
+
+    # Initialize a threaded capture that always holds the newest frame of the video source
+    cap = LatestFrameCapture(videoSource, width=1280, height=720,
+                             fourcc=0x32595559, # CAP_PROP_FOURCC: 4-character code of codec
+                             fps=30)            # CAP_PROP_FPS: Frame rate
+    cap.start()
+    
+    names = classNames if isinstance(classNames, dict) else dict(enumerate(classNames))
+    # Frames of an unchanged scene reuse the previous detections and frames between keyframes
+    # get them propagated instead of running the model
+    camera = str(videoSource)
+    processor = StreamProcessor(model, annotator=FrameAnnotator(names=names), track=False,
+                                motion_gate=MotionGate(), camera=camera,
+                                keyframes=KeyframePropagator() if KEYFRAME_ENABLED else None)
+    metrics = get_stage_metrics()
     
     prev_frame_time = 0
     new_frame_time = 0
     
-    while True:
-        success, img = cap.read() # Read a frame from the video feed
-        if not success:
-            break
+    try:
+        while cap.is_running:
+            success, img = cap.read() # Read the newest frame from the video feed
+            if not success:
+                continue
         
-        # Perform object detection
-        results = model(img, stream=True)
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                # Extract bounding box coordinates and class information
-                x1, y1, x2, y2 = int(box.xyxy[0][0]), int(box.xyxy[0][1]), int(box.xyxy[0][2]), int(box.xyxy[0][3])
-                cls = int(box.cls[0])
-                conf = math.ceil((box.conf[0] * 100)) / 100
-                currentClass = classNames[cls]
-
-                # Draw bounding box and label
-                cvzone.putTextRect(img, f'{currentClass} {conf}', 
-                                   (max(0, x1) + 5, max(35, y1) - 7), scale=1, thickness=1, 
-                                   colorT=(255, 255, 255), colorR=(48, 25, 52), offset=5)
-                cv2.rectangle(img, (x1, y1), (x2, y2), (48, 25, 52), 2)
-
-        # Calculate FPS
-        new_frame_time = time.time()
-        fps = 1 / (new_frame_time - prev_frame_time)
-        prev_frame_time = new_frame_time
-        cv2.putText(img, f"FPS: {int(fps)}", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-        # Encode the frame as JPEG
-        (flag, encodedImage) = cv2.imencode('.jpg', img)
-        if not flag:
-            continue
-        # Yield the frame for the streaming response
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + bytearray(encodedImage) + b'\r\n')
\ No newline at end of file
+            # Perform object detection and draw masks, boxes and labels in place
+            img, _ = processor.process(img)
+
+            # Rolling frame rate of the encoded frames; instantaneous when instrumentation is off
+            new_frame_time = time.time()
+            fps = metrics.rate(camera, "encode") or 1 / (new_frame_time - prev_frame_time)
+            prev_frame_time = new_frame_time
+            draw_fps(img, fps)
+
+            # Encode the frame as JPEG
+            with metrics.span(camera, "encode"):
+                (flag, encodedImage) = cv2.imencode('.jpg', img)
+            if not flag:
+                continue
+            # Yield the frame for the streaming response
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + bytearray(encodedImage) + b'\r\n')
+
+    finally:
+        cap.stop()
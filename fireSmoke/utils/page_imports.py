@@ -0,0 +1,16 @@
+"""
+Package imports pages/detection_app.py runs on every rerun and page switch.
+
+The page takes them from this module so the "fireSmoke.utils.page_imports" target of the
+import-time budget covers exactly what the page loads up front. OpenCV, torch and
+ultralytics belong in the feature branches of the page, not here.
+"""
+from fireSmoke.entity.config_entity import ModelTrainerConfig
+from fireSmoke.exception import AppException
+from fireSmoke.inference.metrics import get_stage_metrics
+from fireSmoke.logger import log_throttled, logging
+from fireSmoke.pipeline.training_jobs import get_training_runner
+from fireSmoke.pipeline.training_pipeline import STAGES
+
+__all__ = ["AppException", "ModelTrainerConfig", "STAGES", "get_stage_metrics", "get_training_runner",
+           "log_throttled", "logging"]
@@ -0,0 +1,200 @@
+import json
+import os
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.segment import SegmentationTrainer
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import unwrap_model
+
+from fireSmoke.constant.training_pipeline import (DATA_SHARDING_INDEX_FILE,
+                                                  DATA_SHARDING_LABELS_FILE)
+
+
+def letterbox(image: np.ndarray, size: int, color: int = 114) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resizes an image so its long side is `size` and pads it to a centred size x size square.
+
+    :param image: BGR image.
+    :param size: Side of the output square.
+    :param color: Gray level of the padding.
+    :return: (letterboxed image, scale ratio, (pad_x, pad_y) in pixels).
+    """
+    height, width = image.shape[:2]
+    ratio = size / max(height, width)
+    new_width, new_height = min(size, round(width * ratio)), min(size, round(height * ratio))
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height),
+                           interpolation=cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+    output = np.full((size, size, 3), color, dtype=np.uint8)
+    output[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = image
+    return output, ratio, (pad_x, pad_y)
+
+
+def is_shard_dir(path) -> bool:
+    """
+    Whether a path is a split directory written by the DataSharding stage.
+    """
+    return isinstance(path, str) and os.path.isfile(os.path.join(path, DATA_SHARDING_INDEX_FILE))
+
+
+class ShardReader:
+    """
+    Read access to the shards of one split.
+
+    Images are stored letterboxed in `.npy` arrays of shape (images_per_shard, size, size, 3)
+    and opened as read-only memory maps, so reading an image is a page-cache copy instead
+    of a JPEG decode. Polygons of all images are kept in flat arrays addressed by offsets.
+    Memory maps are opened lazily so the reader can be pickled into dataloader workers.
+    """
+
+    def __init__(self, split_dir: str):
+        """
+        Constructor for the ShardReader class.
+
+        :param split_dir: Directory holding index.json, labels.npz and the shard files.
+        """
+        self.split_dir = split_dir
+        with open(os.path.join(split_dir, DATA_SHARDING_INDEX_FILE), "r") as f:
+            self.index = json.load(f)
+        with np.load(os.path.join(split_dir, DATA_SHARDING_LABELS_FILE)) as labels:
+            self.image_offsets = labels["image_offsets"]
+            self.classes = labels["classes"]
+            self.point_offsets = labels["point_offsets"]
+            self.points = labels["points"]
+        self.img_size = self.index["img_size"]
+        self.images_per_shard = self.index["images_per_shard"]
+        self._shards = {}
+
+
+    def __len__(self) -> int:
+        return self.index["num_images"]
+
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
+
+
+    @property
+    def files(self) -> List[str]:
+        """
+        Original image file names, in shard order.
+        """
+        return self.index["files"]
+
+
+    def image(self, i: int) -> np.ndarray:
+        """
+        Letterboxed image `i` as a writable array.
+        """
+        shard_id, row = divmod(i, self.images_per_shard)
+        shard = self._shards.get(shard_id)
+        if shard is None:
+            shard = np.load(os.path.join(self.split_dir, self.index["shards"][shard_id]), mmap_mode="r")
+            self._shards[shard_id] = shard
+        # Augmentations modify images in place, so the read-only map is copied
+        return np.array(shard[row])
+
+
+    def polygons(self, i: int) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """
+        Class ids and normalised polygons of image `i` in letterboxed coordinates.
+        """
+        first, last = self.image_offsets[i], self.image_offsets[i + 1]
+        segments = [self.points[self.point_offsets[j]:self.point_offsets[j + 1]] for j in range(first, last)]
+        return self.classes[first:last], segments
+
+
+class ShardedYOLODataset(YOLODataset):
+    """
+    YOLODataset that reads images and labels from a split written by the DataSharding stage.
+
+    Only image and label loading differ; augmentation, collation and evaluation are those of
+    YOLODataset. Shard images are already letterboxed to a square, so they are the dataset's
+    original images and boxes are taken from the polygon extents.
+    """
+
+    def get_img_files(self, img_path: str) -> List[str]:
+        self.reader = ShardReader(img_path)
+        files = [os.path.join(img_path, name) for name in self.reader.files]
+        count = self.fraction if isinstance(self.fraction, int) else max(1, round(len(files) * self.fraction))
+        return files[:count]
+
+
+    def get_labels(self) -> List[dict]:
+        size = self.reader.img_size
+        labels = []
+        for i, im_file in enumerate(self.im_files):
+            classes, segments = self.reader.polygons(i)
+            if segments:
+                mins = np.stack([segment.min(0) for segment in segments])
+                maxs = np.stack([segment.max(0) for segment in segments])
+                bboxes = np.concatenate([(mins + maxs) / 2, maxs - mins], axis=1).astype(np.float32)
+            else:
+                bboxes = np.zeros((0, 4), dtype=np.float32)
+            labels.append({
+                "im_file": im_file,
+                "shape": (size, size),
+                "cls": classes.astype(np.float32).reshape(-1, 1),
+                "bboxes": bboxes,
+                "segments": segments,
+                "keypoints": None,
+                "normalized": True,
+                "bbox_format": "xywh",
+            })
+        self.verify_labels(labels, self.img_path)
+        return labels
+
+
+    def load_image(self, i: int, rect_mode: bool = True,
+                   resize_short: bool = False) -> Tuple[np.ndarray, Tuple[int, int], Tuple[int, int]]:
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+
+        image = self.reader.image(i)
+        size = image.shape[0]
+        if size != self.imgsz: # Shards written for another image size
+            image = cv2.resize(image, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+
+        # Mosaic picks its extra images from the buffer of recently loaded ones
+        if self.augment and self.cache != "ram":
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = image, (size, size), image.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return image, (size, size), image.shape[:2]
+
+
+class ShardedSegmentationTrainer(SegmentationTrainer):
+    """
+    SegmentationTrainer whose training and validation datasets read from shard directories
+    when data.yaml points at them, and from image folders otherwise.
+    """
+
+    def build_dataset(self, img_path, mode: str = "train", batch: Optional[int] = None):
+        if not is_shard_dir(img_path):
+            return super().build_dataset(img_path, mode=mode, batch=batch)
+
+        return ShardedYOLODataset(
+            img_path=img_path,
+            imgsz=self.args.imgsz,
+            batch_size=batch,
+            augment=mode == "train",
+            hyp=self.args,
+            rect=self.args.rect or mode == "val",
+            cache=self.args.cache or None,
+            single_cls=self.args.single_cls or False,
+            stride=max(int(unwrap_model(self.model).stride.max()), 32),
+            pad=0.0 if mode == "train" else 0.5,
+            prefix=colorstr(f"{mode}: "),
+            task=self.args.task,
+            classes=self.args.classes,
+            data=self.data,
+            fraction=self.args.fraction if mode == "train" else 1.0,
+        )
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, fields, is_dataclass
+from typing import Optional
+
+from fireSmoke.logger import logging
+
+
+def _directory_state(directory: str) -> str:
+    """
+    Digest of the relative path, size and mtime of every file below a directory; a directory's
+    own mtime does not change when a file inside it is edited.
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue # Removed while walking
+            digest.update(f"{os.path.relpath(path, directory)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _path_state(value, states: dict) -> None:
+    """
+    Collects the state of every existing path found in a (nested) artifact value: size and
+    mtime for files, a digest of the files they contain for directories.
+    """
+    if isinstance(value, dict):
+        for item in value.values():
+            _path_state(item, states)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _path_state(item, states)
+    elif isinstance(value, str) and value and os.path.exists(value):
+        if os.path.isdir(value):
+            states[value] = _directory_state(value)
+        else:
+            stat = os.stat(value)
+            states[value] = [stat.st_size, stat.st_mtime_ns]
+
+
+def stage_fingerprint(config, *artifacts) -> str:
+    """
+    Fingerprint of a pipeline stage's inputs.
+
+    It covers every config field except those marked `metadata={"fingerprint": False}`
+    (worker counts, chunk sizes and other settings that do not change the output),
+    plus the input artifacts together with the size and mtime of the files they point
+    at, and of every file inside the directories they point at. A re-extracted feature
+    store, an edited label or a new archive therefore changes the fingerprint of every
+    stage that consumes it.
+
+    :param config: Config dataclass of the stage.
+    :param artifacts: Input artifacts of the stage; None for stages that were not run.
+    :return: Hex digest.
+    """
+    settings = {item.name: getattr(config, item.name) for item in fields(config)
+                if item.metadata.get("fingerprint", True)}
+    inputs = [asdict(artifact) if is_dataclass(artifact) else artifact for artifact in artifacts]
+    states = {}
+    _path_state(inputs, states)
+    payload = json.dumps({"config": settings, "inputs": inputs, "paths": states}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_stage_record(record_path: str, fingerprint: str, artifact_cls) -> Optional[tuple]:
+    """
+    Returns the stored artifact of a stage if it was produced from the same inputs and
+    every file it points at still exists.
+
+    :param record_path: Path to the stage's fingerprint record.
+    :param fingerprint: Fingerprint of the stage's current inputs.
+    :param artifact_cls: Artifact dataclass of the stage.
+    :return: (artifact, seconds the stage took when it ran), or None if the stage must run.
+    """
+    if not os.path.exists(record_path):
+        return None
+    try:
+        with open(record_path, "r") as f:
+            record = json.load(f)
+        if record.get("fingerprint") != fingerprint:
+            return None
+        if not all(os.path.exists(path) for path in record.get("outputs", [])):
+            logging.info(f"Outputs recorded in {record_path} are missing")
+            return None
+        return artifact_cls(**record["artifact"]), record.get("seconds", 0.0)
+    except (ValueError, KeyError, TypeError) as e:
+        logging.info(f"Ignoring unreadable stage record {record_path}: {e}")
+        return None
+
+
+def save_stage_record(record_path: str, fingerprint: str, artifact, seconds: float) -> None:
+    """
+    Atomically writes the fingerprint record of a stage next to its output.
+
+    :param record_path: Path to the stage's fingerprint record.
+    :param fingerprint: Fingerprint of the inputs the artifact was produced from.
+    :param artifact: Artifact produced by the stage.
+    :param seconds: Time the stage took.
+    """
+    outputs = {}
+    _path_state(asdict(artifact), outputs)
+    os.makedirs(os.path.dirname(record_path) or ".", exist_ok=True)
+    tmp_path = f"{record_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"fingerprint": fingerprint,
+                   "artifact": asdict(artifact),
+                   "outputs": sorted(outputs),
+                   "seconds": seconds,
+                   "created": time.strftime("%Y-%m-%d %H:%M:%S")}, f, indent=2)
+    os.replace(tmp_path, record_path)
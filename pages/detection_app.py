@@ -1,13 +1,18 @@
-import io
-import cv2
 import time
 import sys
 import streamlit as st
-import supervision as sv
-from ultralytics import YOLO
-from PIL import Image, ImageOps
-from fireSmoke.exception import AppException
-from fireSmoke.pipeline.training_pipeline import TrainPipeline
+from fireSmoke.constant.application import (BATCH_INFERENCE_SIZE,
+                                            IMAGE_GRID_COLUMNS,
+                                            IMAGE_GRID_PAGE_SIZE,
+                                            INSTRUMENTATION_PANEL_EVERY,
+                                            KEYFRAME_ENABLED,
+                                            TILING_LATENCY_BUDGET,
+                                            TRAINING_JOB_POLL_INTERVAL)
+# Covered by the import-time budget; OpenCV, torch and ultralytics are imported by the feature
+# that needs them, so opening the page or the training form does not pay for them
+from fireSmoke.utils.page_imports import (STAGES, AppException, ModelTrainerConfig,
+                                          get_stage_metrics, get_training_runner,
+                                          log_throttled, logging)
 
 
 # Title of the application
@@ -16,54 +21,243 @@ st.title("🔥:orange[Fire Smoke Segmentation Application]🔥")
 # Sidebar menu for app features
 menu = st.sidebar.radio("Choose a feature:", ["Train Model", "Image Detection", "Webcam Detection", "IP Webcam Detection"])
 
+# Per-stage latency spans of the live pages; switched off, the spans record nothing
+stage_metrics = get_stage_metrics()
+stage_metrics.enabled = st.sidebar.toggle("Latency stats", value=stage_metrics.enabled,
+                                          help="Time capture, inference, annotation and display of every frame")
+# Optionally, live pages run the model on keyframes only and propagate the masks over the frames in between
+keyframe_mode = st.sidebar.checkbox("Keyframe mode", value=KEYFRAME_ENABLED,
+                                    help="Run the model on keyframes only; in between, masks follow the "
+                                         "smoke with optical flow. Faster, slightly less precise")
+
+@st.fragment(run_every=TRAINING_JOB_POLL_INTERVAL)
+def training_jobs_panel():
+    """
+    Shows the training jobs and the live metrics of the running one; refreshed on its own
+    so the rest of the page stays responsive while a job runs.
+    """
+    runner = get_training_runner()
+    jobs = runner.jobs()
+    if not jobs:
+        st.info("No training jobs yet.")
+        return
+
+    for job in jobs:
+        with st.container(border=True):
+            header, action = st.columns([4, 1])
+            header.markdown(f"**Job {job.job_id}** — {job.status} | "
+                            f"epochs: {job.settings['no_epochs'] or 'default'}, "
+                            f"batch: {job.settings['batch_size'] or 'default'}, "
+                            f"image size: {job.settings['img_size'] or 'default'}")
+            if job.is_active and action.button("Cancel", key=f"cancel_{job.job_id}"):
+                runner.cancel(job.job_id)
+
+            if job.status == "running":
+                done = len(job.epochs)
+                if job.epochs_total:
+                    st.progress(done / job.epochs_total, text=f"Epoch {done}/{job.epochs_total}")
+                else:
+                    st.progress(0.0, text="Preparing data...")
+            if job.epochs:
+                last = job.epochs[-1]
+                time_col, throughput_col, map_col = st.columns(3)
+                time_col.metric("Epoch time", f"{last['epoch_time']:.1f} s")
+                throughput_col.metric("Throughput", f"{last['images_per_second']:.1f} images/s")
+                map_col.metric("Mask mAP50", f"{last.get('metrics/mAP50(M)', 0.0):.3f}")
+                losses = [{key: epoch[key] for key in epoch if key.startswith("train/")} for epoch in job.epochs]
+                st.line_chart(losses)
+            if job.status == "completed":
+                st.success(f"Model saved to {job.trained_model_file_path}")
+                st.text(job.summary)
+            elif job.status == "failed":
+                st.error(job.error)
+
+
+def stage_stats_panel(placeholder, camera: str) -> None:
+    """
+    Shows the rolling latency of each stage of a live stream, from capture to display.
+    """
+    if not stage_metrics.enabled:
+        placeholder.empty()
+        return
+    rows = [{"stage": row["stage"], "p50 (ms)": row["p50"], "p95 (ms)": row["p95"],
+             "mean (ms)": row["mean"], "per second": row["per_second"]}
+            for row in stage_metrics.snapshot() if row["camera"] == camera]
+    placeholder.dataframe(rows, hide_index=True, width="stretch")
+
+
 # Model Training Pipeline
 if menu == "Train Model":
     st.header("Train the Fire Smoke Segmentation Model", divider="green")
-    if st.button("Start Training"):
-        st.info("Training in progress. Please wait...")
-        obj = TrainPipeline() # Instantiate the training pipeline object
-        obj.run_pipeline()  # Run the training pipeline
-        st.success("Model training and export completed successfully!")
+    defaults = ModelTrainerConfig()
+    with st.form("training_job"):
+        epochs_col, batch_col, size_col = st.columns(3)
+        epochs = epochs_col.number_input("Epochs", min_value=1, value=defaults.no_epochs)
+        batch_size = batch_col.number_input("Batch size", min_value=1, value=defaults.batch_size)
+        img_size = size_col.number_input("Image size", min_value=32, value=defaults.img_size, step=32)
+        force_stages = st.multiselect("Force stages", STAGES,
+                                      help="Run these stages even if their settings and inputs are unchanged")
+        # Jobs run one at a time in a background process; further submissions are queued
+        if st.form_submit_button("Start Training"):
+            get_training_runner().submit(epochs=int(epochs), batch_size=int(batch_size),
+                                         img_size=int(img_size), force_stages=force_stages)
+    training_jobs_panel()
         
 # Image Detection
 elif menu == "Image Detection":
-    model = YOLO("yolo_seg_train/yolo12n-seg.pt")
-    st.header("📱 Upload an Image for Fire Smoke Segmentation", divider="green")
-    uploaded_file = st.file_uploader("Choose an image file", type=["jpg", "png", "jpeg"])
+    import cv2
+    import json
+    import math
+    from fireSmoke.inference.annotator import FrameAnnotator
+    from fireSmoke.inference.batch import BatchDetector, decode_image
+    from fireSmoke.inference.detections import FrameDetections
+    from fireSmoke.inference.engine import InferenceEngine, deployed_model_path
+    from fireSmoke.inference.result_cache import (CachedResult, get_result_cache,
+                                                  make_key, model_fingerprint)
+    from fireSmoke.inference.tiling import TiledDetector
+
+    engine = InferenceEngine(deployed_model_path()) # Model is loaded once per process and shared across reruns; on CPU the deployed INT8/ONNX variant is used
+    result_cache = get_result_cache() # Shared across reruns and sessions, backed by a directory on disk
+    st.header("📱 Upload Images for Fire Smoke Segmentation", divider="green")
+    uploaded_files = st.file_uploader("Choose image files", type=["jpg", "png", "jpeg"], accept_multiple_files=True)
+    batch_size = st.sidebar.slider("Batch size", min_value=1, max_value=32, value=BATCH_INFERENCE_SIZE)
+    tiled = st.sidebar.checkbox("Tiled inference (high-resolution images)",
+                                help="Split large images into overlapping tiles so small, distant smoke is not shrunk away")
+    latency_budget = st.sidebar.number_input("Tiling latency budget (s)", min_value=1.0, value=TILING_LATENCY_BUDGET,
+                                             step=1.0, disabled=not tiled)
     
-    if uploaded_file is not None:
-        # Display uploaded image and results side by side
-        col1, col2 = st.columns(2)
-
-        # Convert uploaded file to PIL image and transpose for correct display
-        pil_img = Image.open(io.BytesIO(uploaded_file.read()))
-        pil_img = ImageOps.exif_transpose(pil_img)     
-        pil_img = pil_img.convert("RGB") 
-
-        with col1:
-            st.image(pil_img, caption="Uploaded Image", width="stretch", channels="BGR")
-
-       # Perform detection
-        with st.spinner("Detecting objects..."):
-            results = model.predict(pil_img, conf=0.25)[0]
-            print(results)
-            detections = sv.Detections.from_ultralytics(results)
-            mask_annotator = sv.MaskAnnotator()
-            label_annotator = sv.LabelAnnotator(text_color=sv.Color.BLACK, text_position=sv.Position.CENTER)
-
-            annotated_image = pil_img.copy()
-            annotated_image = mask_annotator.annotate(annotated_image, detections=detections)
-            annotated_image = label_annotator.annotate(annotated_image, detections=detections)
-              
-        with col2:
-            st.image(annotated_image, caption="Detection Results", width="stretch", channels="BGR")
+    if uploaded_files:
+        # Only re-run detection when the uploads or the detection settings change, not on every widget interaction
+        upload_key = (tuple((f.name, f.size) for f in uploaded_files), batch_size, tiled, latency_budget)
+        if st.session_state.get("image_detection_key") != upload_key:
+            # Images already detected with this model and these settings come from the result cache
+            fingerprint = model_fingerprint(engine)
+            mode = f"tiled:{latency_budget}" if tiled else "full"
+            keys = [make_key(f.getvalue(), fingerprint, conf=0.25, mode=mode) for f in uploaded_files]
+            results = {key: result_cache.get(key) for key in keys}
+            missing = [(f, key) for f, key in zip(uploaded_files, keys) if results[key] is None]
+            missing = list({key: (f, key) for f, key in missing}.values()) # Same image uploaded twice
+            
+            annotator = FrameAnnotator()
+            batch_stats = [] # Per-image tiling or per-batch throughput readout
+            errors = {} # Key of each upload that could not be decoded, with the reason
+            progress = st.progress(0.0, text="Detecting objects...")
+            
+            if missing and tiled:
+                detector = TiledDetector(engine, latency_budget=latency_budget, batch_size=batch_size, conf=0.25)
+                
+                # Perform sliced detection image by image; tiles are batched through the model
+                for i, (uploaded_file, key) in enumerate(missing):
+                    try:
+                        image = decode_image(uploaded_file.getvalue())
+                    except Exception as e:
+                        errors[key] = str(e)
+                        continue
+                    tiled_result = detector.detect(image)
+                    detections = tiled_result.detections
+                    _, jpeg = cv2.imencode(".jpg", annotator.annotate(image, detections))
+                    results[key] = CachedResult(jpeg=jpeg.tobytes(), records=detections.to_records(mask_format="rle"))
+                    if not tiled_result.budget_exceeded: # Partial results are not kept
+                        result_cache.put(key, results[key])
+                    
+                    batch_stats.append({
+                        "Image": uploaded_file.name,
+                        "Tiles": f"{tiled_result.tiles_processed}/{tiled_result.tiles_total}",
+                        "Seconds": round(tiled_result.seconds, 3),
+                        "Budget exceeded": tiled_result.budget_exceeded,
+                    })
+                    progress.progress((i + 1) / len(missing),
+                                      text=f"Detecting objects... {i + 1}/{len(missing)}")
+                
+            elif missing:
+                detector = BatchDetector(engine, batch_size=batch_size, conf=0.25)
+                done = 0
+                
+                # Perform batched detection; decoding and letterboxing run in a thread pool ahead of the model
+                for batch in detector.run([(key, f.getvalue()) for f, key in missing]):
+                    for item, result in zip(batch.images, batch.results):
+                        detections = FrameDetections.from_ultralytics(result)
+                        annotated_image = annotator.annotate(item.image, detections, copy=True)
+                        _, jpeg = cv2.imencode(".jpg", item.crop(annotated_image))
+                        
+                        # Keep detections in original image coordinates with RLE-encoded masks, never dense arrays
+                        records = item.restore(detections).to_records(mask_format="rle")
+                        results[item.name] = CachedResult(jpeg=jpeg.tobytes(), records=records)
+                        result_cache.put(item.name, results[item.name])
+                    errors.update(batch.failed)
+                        
+                    done += len(batch.images) + len(batch.failed)
+                    if not batch.images:
+                        continue
+                    batch_stats.append({
+                        "Batch": batch.index + 1,
+                        "Images": len(batch.images),
+                        "Seconds": round(batch.seconds, 3),
+                        "Images/s": round(batch.images_per_second, 1),
+                    })
+                    progress.progress(done / len(missing), text=f"Detecting objects... {done}/{len(missing)}")
+            progress.empty()
+            
+            st.session_state["image_detection_key"] = upload_key
+            # (file name, annotated JPEG bytes, number of detections) of the readable uploads
+            st.session_state["image_detection_results"] = [(f.name, results[key].jpeg, results[key].n_detections)
+                                                           for f, key in zip(uploaded_files, keys) if key not in errors]
+            st.session_state["image_detection_failed"] = [(f.name, errors[key])
+                                                          for f, key in zip(uploaded_files, keys) if key in errors]
+            st.session_state["image_detection_batches"] = batch_stats
+            st.session_state["image_detection_inferred"] = len(missing) - len(errors)
+            # One JSON line of compact detections per image; unreadable images are listed with an error
+            st.session_state["image_detection_records"] = "\n".join(
+                json.dumps({"source": f.name, "error": "Unreadable image"} if key in errors
+                           else {"source": f.name, "detections": results[key].records})
+                for f, key in zip(uploaded_files, keys)) + "\n"
+            
+        annotated_images = st.session_state["image_detection_results"]
+        failed_images = st.session_state["image_detection_failed"]
+        batch_stats = st.session_state["image_detection_batches"]
+        if failed_images:
+            st.warning(f"⚠️ {len(failed_images)} image(s) could not be read and were skipped: "
+                       + ", ".join(name for name, _ in failed_images))
+        
+        # Throughput of the images that went through the model, and how many came from the cache
+        total_seconds = sum(stat["Seconds"] for stat in batch_stats)
+        inferred = st.session_state["image_detection_inferred"]
+        throughput_col, cache_col = st.columns(2)
+        throughput_col.metric("Throughput", f"{inferred / total_seconds:.1f} images/s" if total_seconds else "-")
+        cache_stats = result_cache.stats()
+        cache_col.metric("From cache", f"{len(annotated_images) - inferred}/{len(annotated_images)}",
+                         help=f"Result cache: {cache_stats['memory_hits']} memory hits, {cache_stats['disk_hits']} "
+                              f"disk hits, {cache_stats['misses']} misses, {cache_stats['disk_entries']} results "
+                              f"({cache_stats['disk_bytes'] / 2**20:.1f} MB) on disk")
+        with st.expander("Per-image tiling" if tiled else "Per-batch throughput"):
+            st.dataframe(batch_stats, hide_index=True)
+        st.download_button("⬇️ Download detections (JSONL)", st.session_state["image_detection_records"],
+                           file_name="detections.jsonl", mime="application/jsonl")
+            
+        # Paginated results grid
+        n_pages = math.ceil(len(annotated_images) / IMAGE_GRID_PAGE_SIZE)
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1) if n_pages > 1 else 1
+        page_images = annotated_images[(page - 1) * IMAGE_GRID_PAGE_SIZE : page * IMAGE_GRID_PAGE_SIZE]
+        
+        columns = st.columns(IMAGE_GRID_COLUMNS)
+        for i, (name, jpeg, n_detections) in enumerate(page_images):
+            columns[i % IMAGE_GRID_COLUMNS].image(jpeg, caption=f"{name} ({n_detections} detections)", width="stretch")
         st.success("Detection complete!")
     else:
-        st.warning("⚠️ Please upload an image file to proceed.")
+        st.warning("⚠️ Please upload image files to proceed.")
         
 # Webcam Detection
 elif menu == "Webcam Detection":
-    model = YOLO("yolo_seg_train/yolo12n-seg.pt")
+    from fireSmoke.inference.capture import LatestFrameCapture
+    from fireSmoke.inference.engine import InferenceEngine, deployed_model_path
+    from fireSmoke.inference.keyframe import KeyframePropagator
+    from fireSmoke.inference.motion import MotionGate
+    from fireSmoke.inference.stream import StreamProcessor
+
+    engine = InferenceEngine(deployed_model_path()) # Model is loaded once per process and shared across reruns; on CPU the deployed INT8/ONNX variant is used
+    # Detection/tracking plus in-place annotation; unchanged frames reuse the previous detections
+    processor = StreamProcessor(engine, track=True, motion_gate=MotionGate(), camera="webcam",
+                                keyframes=KeyframePropagator() if keyframe_mode else None)
     st.header("🎥 Real-Time Detection from Webcam", divider="green")
     
     # Create two columns for Start and Stop Buttons
@@ -74,17 +268,20 @@ elif menu == "Webcam Detection":
     if start_button:
         video_placeholder = st.empty()  # Placeholder for displaying video frames
         fps_placeholder = st.empty()  # Placeholder for displaying FPS value
+        stats_placeholder = st.empty()  # Placeholder for the per-stage latency table
 
-        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW) # Open default webcam
-        cap.set(3, 1280)  # Set frame width
-        cap.set(4, 720)   # Set frame height
-        cap.set(cv2.CAP_PROP_FOURCC, 0x32595559) # CAP_PROP_FOURCC: 4-character code of codec
-        cap.set(cv2.CAP_PROP_FPS, 30)            # CAP_PROP_FPS: Frame rate
+        # Open default webcam on a capture thread that always keeps only the newest frame
+        cap = LatestFrameCapture(0, width=1280, height=720,
+                                 fourcc=0x32595559, # CAP_PROP_FOURCC: 4-character code of codec
+                                 fps=30,            # CAP_PROP_FPS: Frame rate
+                                 metrics_label="webcam")
         
         prev_frame_time = 0 # Previous frame time
+        frame_count = 0
         
         try:
-            while cap.isOpened():
+            cap.start()
+            while cap.is_running:
                 if stop_button: # Check if Stop button is pressed
                     st.info("Webcam stopped")
                     break
@@ -94,32 +291,46 @@ elif menu == "Webcam Detection":
                     break
             
                 # Perform detection/tracking using YOLO model
-                results =model.track(source=frame, verbose=False, device="cuda", stream=True, persist=True)
-                for res in results:
-                    annotated_frame = res.plot() # Annotate the frame with detection results
+                annotated_frame, _ = processor.process(frame) # Annotate the frame in place with detection results
                     
-                # Calculate FPS
+                # Rolling FPS of the displayed frames; instantaneous when latency stats are off
                 new_frame_time = time.time()
-                fps = 1 / (new_frame_time - prev_frame_time) if prev_frame_time != 0 else 0
+                fps = stage_metrics.rate("webcam", "display") or (1 / (new_frame_time - prev_frame_time) if prev_frame_time != 0 else 0)
                 prev_frame_time = new_frame_time
             
                 # Update the video placeholder with the annotated frame
-                video_placeholder.image(annotated_frame, width="stretch", channels="BGR")
+                with stage_metrics.span("webcam", "display"):
+                    video_placeholder.image(annotated_frame, width="stretch", channels="BGR")
                 
                 # Update the FPS placeholder with the current FPS value
-                fps_placeholder.markdown(f"**FPS:** {int(fps)}")
+                fps_placeholder.markdown(f"**FPS:** {int(fps)} | **Dropped frames:** {cap.frames_dropped} "
+                                         f"| **Reused frames:** {processor.motion_gate.frames_skipped}"
+                                         + (f" | **Propagated:** {processor.keyframes.propagated_ratio:.0%}"
+                                            if processor.keyframes else ""))
+                frame_count += 1
+                if frame_count % INSTRUMENTATION_PANEL_EVERY == 0:
+                    stage_stats_panel(stats_placeholder, "webcam")
                 
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
             raise AppException(e, sys)
         
         finally:
-            cap.release() # Release webcam resource when done
+            cap.stop() # Release webcam resource when done
             st.info("Webcam stopped")
             
 # IP Webcam Detection
 elif menu == "IP Webcam Detection":
-    model = YOLO("yolo_seg_train/yolo12n-seg.pt")
+    from fireSmoke.inference.capture import LatestFrameCapture
+    from fireSmoke.inference.engine import InferenceEngine, deployed_model_path
+    from fireSmoke.inference.keyframe import KeyframePropagator
+    from fireSmoke.inference.motion import MotionGate
+    from fireSmoke.inference.stream import StreamProcessor
+
+    engine = InferenceEngine(deployed_model_path()) # Model is loaded once per process and shared across reruns; on CPU the deployed INT8/ONNX variant is used
+    # Detection/tracking plus in-place annotation; unchanged frames reuse the previous detections
+    processor = StreamProcessor(engine, track=True, motion_gate=MotionGate(), camera="ip_webcam",
+                                keyframes=KeyframePropagator() if keyframe_mode else None)
     st.header("🧿 Real-Time Detection from IP Webcam", divider="green")
 
     # Create two columns for Start and Stop Buttons
@@ -132,55 +343,62 @@ elif menu == "IP Webcam Detection":
     if start_button and ip_url:
         video_placeholder = st.empty()  # Placeholder for displaying video frames
         fps_placeholder = st.empty()  # Placeholder for displaying FPS value
+        stats_placeholder = st.empty()  # Placeholder for the per-stage latency table
         
-        cap = cv2.VideoCapture(ip_url, cv2.CAP_FFMPEG)  # Open IP webcam feed
-        cap.set(3, 640)  # Reduce resolution to 640x480 for performance
-        cap.set(4, 480)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 2)  # Increase buffer size
-        cap.set(cv2.CAP_PROP_FPS, 30)  # Limit FPS
+        # Open IP webcam feed on a capture thread; stale frames are dropped instead of queued
+        cap = LatestFrameCapture(ip_url, width=640, height=480, # Reduce resolution to 640x480 for performance
+                                 buffer_size=1, # Keep the backend buffer minimal
+                                 fps=30,        # Limit FPS
+                                 metrics_label="ip_webcam")
         
         prev_frame_time = 0 # Previous frame time
+        frame_count = 0
 
         try:
-            while cap.isOpened():
+            cap.start()
+            while cap.is_running:
                 if stop_button:  # Check if Stop button is pressed
                     st.info("IP Webcam stopped")
                     break
 
                 ret, frame = cap.read()
                 if not ret:
-                    st.warning("Failed to read from IP webcam. Skipping frame...")
-                    continue  # Skip bad frames instead of breaking the loop
+                    st.warning("No new frame from IP webcam. Waiting...")
+                    log_throttled("ip-webcam-no-frame", f"No new frame from IP webcam {ip_url}", logging.WARNING)
+                    continue  # Keep waiting instead of breaking the loop
 
                 # Perform detection using YOLO model
                 try:
-                    results = model.track(source=frame, verbose=False, device="cuda", stream=True, persist=True)
-                    for res in results:
-                        annotated_frame = res.plot()  # Annotate the frame with detection results
+                    annotated_frame, _ = processor.process(frame)  # Annotate the frame in place with detection results
                         
-                    # Calculate FPS
+                    # Rolling FPS of the displayed frames; instantaneous when latency stats are off
                     new_frame_time = time.time()
-                    fps = 1 / (new_frame_time - prev_frame_time) if prev_frame_time != 0 else 0
+                    fps = stage_metrics.rate("ip_webcam", "display") or (1 / (new_frame_time - prev_frame_time) if prev_frame_time != 0 else 0)
                     prev_frame_time = new_frame_time   
 
                     # Update the video placeholder with the annotated frame
-                    video_placeholder.image(annotated_frame, width="stretch", channels="BGR")
+                    with stage_metrics.span("ip_webcam", "display"):
+                        video_placeholder.image(annotated_frame, width="stretch", channels="BGR")
                     
                     # Update the FPS placeholder with the current FPS value
-                    fps_placeholder.markdown(f"**FPS:** {int(fps)}")
+                    fps_placeholder.markdown(f"**FPS:** {int(fps)} | **Dropped frames:** {cap.frames_dropped} "
+                                             f"| **Reused frames:** {processor.motion_gate.frames_skipped}"
+                                             + (f" | **Propagated:** {processor.keyframes.propagated_ratio:.0%}"
+                                                if processor.keyframes else ""))
+                    frame_count += 1
+                    if frame_count % INSTRUMENTATION_PANEL_EVERY == 0:
+                        stage_stats_panel(stats_placeholder, "ip_webcam")
                     
                 except Exception as e:
                     st.warning(f"Error during YOLO detection: {str(e)}. Skipping this frame...")
-
-                # Add delay for stability
-                time.sleep(0.05)  # Add a 50 ms delay to reduce system load
+                    log_throttled("ip-webcam-detection-error", f"Error during YOLO detection: {e}", logging.WARNING)
 
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
             raise AppException(e, sys)
 
         finally:
-            cap.release()  # Release IP webcam resource when done
+            cap.stop()  # Release IP webcam resource when done
             st.info("IP Webcam stopped")
 
     elif start_button and not ip_url:
@@ -1,6 +1,8 @@
 from ultralytics import YOLO
 import supervision as sv
 from PIL import Image
+from fireSmoke.inference.detections import FrameDetections
+from fireSmoke.inference.mask_codec import encode_rle, decode_rle
 
 
 # Testing with YOLO Segmentation
@@ -17,4 +19,11 @@ label_annotator = sv.LabelAnnotator(text_color=sv.Color.BLACK, text_position=sv.
 annotated_image = image.copy()
 annotated_image = mask_annotator.annotate(annotated_image, detections=detections)
 annotated_image = label_annotator.annotate(annotated_image, detections=detections)
-sv.plot_image(annotated_image, size=(10, 10))
\ No newline at end of file
+sv.plot_image(annotated_image, size=(10, 10))
+
+# Compact mask encoding: RLE payload vs dense boolean masks
+frame_detections = FrameDetections.from_ultralytics(result)
+if frame_detections.masks is not None:
+    rles = encode_rle(frame_detections.masks)
+    assert (decode_rle(rles) == frame_detections.masks).all()
+    print(f"Dense masks: {frame_detections.masks.nbytes} bytes, RLE: {sum(len(r['counts']) for r in rles)} bytes")